@@ -0,0 +1,213 @@
+import time
+import functools
+import importlib.util
+
+# NumPy é opcional: sem ele, o motor 'numpy' fica indisponível. Só é importado no primeiro uso
+# do motor (a rota usa 'tabela'/'streaming'), pois a importação pesa na inicialização do app.
+NUMPY_DISPONIVEL = importlib.util.find_spec('numpy') is not None
+
+# --- Tarefa 1: Analisador de vogal ---
+# Regra: a primeira vogal que vem logo após uma sequência VOGAL-CONSOANTE (letras contínuas)
+# e que não se repete na string inteira (sem diferenciar maiúsculas de minúsculas).
+#
+# Motores disponíveis (todos retornam a vogal na capitalização original, ou "" se não houver):
+# - 'referencia': a implementação original da rota (contagem prévia + máquina de estados).
+# - 'streaming': uma única passagem em blocos, sem guardar a entrada (AnalisadorStreaming).
+# - 'tabela': para texto ASCII; contagem e classificação feitas por operações em C de bytes.
+# - 'numpy': para texto ASCII; tabelas de consulta e bincount sobre os bytes (opcional).
+# O motor 'auto' escolhe o mais rápido que se aplica à entrada.
+
+VOGAIS = "aeiou"
+CONSOANTES = "bcdfghjklmnpqrstvwxyz"
+SEM_RESULTADO = "Nenhuma vogal encontrada com os critérios."
+
+VOGAL, CONSOANTE, OUTRO = 0, 1, 2
+
+def analisar_referencia(input_string):
+    # Definindo vogais e consoantes para a lógica
+    # As vogais e consoantes são tratadas em minúsculas para a lógica de comparação
+    vogais = "aeiou"
+    consoantes = "bcdfghjklmnpqrstvwxyz"
+
+    found_vowel = ""
+    # Mapeia caracteres para suas contagens na string original (case-insensitive)
+    char_counts_lower = {}
+    for char_orig in input_string:
+        lower_char = char_orig.lower()
+        char_counts_lower[lower_char] = char_counts_lower.get(lower_char, 0) + 1
+
+    # --- Lógica Principal da Tarefa 1 ---
+    # Premissa: Não será possível reiniciar o fluxo de leitura da string.
+    
+    # Variáveis de controle de estado:
+    # last_char_was_vowel: True se o caractere ANTERIOR era uma vogal.
+    # found_consonant_after_vowel: True se já encontramos uma sequência VOGAL-CONSOANTE.
+    
+    last_char_was_vowel = False 
+    found_consonant_after_vowel = False
+
+    for char_orig in input_string:
+        char_lower = char_orig.lower() # Converte para minúscula para a lógica
+        
+        is_current_vowel = (char_lower in vogais)
+        is_current_consonant = (char_lower in consoantes)
+
+        if not (is_current_vowel or is_current_consonant): # Ignora caracteres que não são letras
+            # Resetamos o estado se encontramos algo que não é letra,
+            # pois a sequência VOGAL-CONSOANTE-VOGAL precisa ser contínua em letras.
+            last_char_was_vowel = False 
+            found_consonant_after_vowel = False 
+            continue 
+
+        if is_current_vowel: # Se o caractere atual é uma vogal
+            if found_consonant_after_vowel: # E já estávamos no estado "VOGAL-CONSOANTE"
+                # Significa que encontramos a sequência VOGAL-CONSOANTE-VOGAL
+                # Agora, verificamos a condição "que não se repete na string inteira"
+                if char_counts_lower.get(char_lower, 0) == 1:
+                    found_vowel = char_orig # Guarda a vogal na sua capitalização original
+                    break # Encontramos a *primeira* que atende aos critérios, podemos parar
+            
+            last_char_was_vowel = True # O caractere atual é uma vogal, então o próximo pode vir depois de uma vogal
+            found_consonant_after_vowel = False # Reinicia a busca por uma nova sequência VOGAL-CONSOANTE
+        
+        elif is_current_consonant: # Se o caractere atual é uma consoante
+            if last_char_was_vowel: # E o caractere ANTERIOR era uma vogal
+                found_consonant_after_vowel = True # Marcamos que encontramos "VOGAL-CONSOANTE"
+            else: # Se o anterior não era vogal
+                found_consonant_after_vowel = False # Reinicia a busca
+            
+            last_char_was_vowel = False # O caractere atual não é uma vogal
+        
+    # --- Fim da Lógica da Tarefa 1 ---
+
+    return found_vowel
+
+# Streaming: a versão de referência precisa da string inteira (primeiro conta os caracteres e
+# depois roda a máquina de estados). Aqui é uma única passagem, em blocos: para cada vogal
+# guardamos a sua contagem e a primeira posição em que ela apareceu como candidata (após
+# VOGAL-CONSOANTE). No fim do fluxo, a resposta é a candidata de menor posição entre as vogais
+# com contagem 1 (uma vogal que aparece uma única vez só pode ter sido candidata nessa ocorrência).
+class AnalisadorStreaming:
+    def __init__(self):
+        self.contagens = dict.fromkeys(VOGAIS, 0)
+        self.candidatas = {} # vogal minúscula -> (posição, caractere original)
+        self.posicao = 0
+        self.ultimo_era_vogal = False
+        self.consoante_apos_vogal = False
+        self._classes = {} # caractere -> (classe, minúscula), calculado uma vez por caractere distinto
+
+    def _classificar(self, char):
+        minuscula = char.lower() # Um único lower() por caractere distinto
+        if minuscula in VOGAIS and len(minuscula) == 1:
+            classe = (VOGAL, minuscula)
+        elif minuscula in CONSOANTES and len(minuscula) == 1:
+            classe = (CONSOANTE, minuscula)
+        else:
+            classe = (OUTRO, minuscula)
+        self._classes[char] = classe
+        return classe
+
+    def alimentar(self, bloco):
+        classes = self._classes
+        contagens = self.contagens
+        candidatas = self.candidatas
+        posicao = self.posicao
+        ultimo_era_vogal = self.ultimo_era_vogal
+        consoante_apos_vogal = self.consoante_apos_vogal
+
+        for char in bloco:
+            classe, minuscula = classes.get(char) or self._classificar(char)
+            if classe == VOGAL:
+                contagens[minuscula] += 1
+                if consoante_apos_vogal and minuscula not in candidatas:
+                    candidatas[minuscula] = (posicao, char)
+                ultimo_era_vogal = True
+                consoante_apos_vogal = False
+            elif classe == CONSOANTE:
+                consoante_apos_vogal = ultimo_era_vogal
+                ultimo_era_vogal = False
+            else: # Não é letra: a sequência VOGAL-CONSOANTE-VOGAL precisa ser contínua
+                ultimo_era_vogal = False
+                consoante_apos_vogal = False
+            posicao += 1
+
+        self.posicao = posicao
+        self.ultimo_era_vogal = ultimo_era_vogal
+        self.consoante_apos_vogal = consoante_apos_vogal
+
+    def resultado(self):
+        # Retorna a vogal encontrada (na capitalização original) ou "" se nenhuma atender aos critérios
+        validas = [candidata for vogal, candidata in self.candidatas.items() if self.contagens[vogal] == 1]
+        return min(validas)[1] if validas else ""
+
+# Motores para texto ASCII: como só interessam vogais que aparecem UMA vez, basta contar as
+# cinco vogais e, para cada uma com contagem 1, olhar os dois caracteres anteriores à sua
+# única ocorrência (precisam ser VOGAL e CONSOANTE). Em ASCII, lower() preserva as posições.
+TABELA_CLASSES = bytes(
+    ord('v') if chr(b).lower() in VOGAIS else ord('c') if chr(b).lower() in CONSOANTES else ord('.')
+    for b in range(256)
+)
+
+def analisar_tabela(texto):
+    dados = texto.encode('ascii')
+    minusculas = dados.lower()
+    classes = dados.translate(TABELA_CLASSES)
+    melhor = -1
+    for vogal in b"aeiou":
+        if minusculas.count(vogal) == 1:
+            posicao = minusculas.index(vogal)
+            if posicao >= 2 and classes[posicao - 2:posicao] == b"vc" and (melhor < 0 or posicao < melhor):
+                melhor = posicao
+    return texto[melhor] if melhor >= 0 else ""
+
+@functools.cache
+def tabelas_numpy():
+    import numpy as np # type: ignore
+    minusculas = np.array([ord(chr(b).lower()) if b < 128 else b for b in range(256)], dtype=np.uint8)
+    return np, minusculas, np.frombuffer(TABELA_CLASSES, dtype=np.uint8)
+
+def analisar_numpy(texto):
+    np, minusculas_np, classes_np = tabelas_numpy()
+    dados = np.frombuffer(texto.encode('ascii'), dtype=np.uint8)
+    minusculas = minusculas_np[dados]
+    contagens = np.bincount(minusculas, minlength=256)
+    melhor = -1
+    for vogal in b"aeiou":
+        if contagens[vogal] == 1:
+            posicao = int(np.flatnonzero(minusculas == vogal)[0])
+            if posicao >= 2 and classes_np[dados[posicao - 2]] == ord('v') and classes_np[dados[posicao - 1]] == ord('c') \
+                    and (melhor < 0 or posicao < melhor):
+                melhor = posicao
+    return texto[melhor] if melhor >= 0 else ""
+
+def analisar_streaming(texto):
+    analisador = AnalisadorStreaming()
+    analisador.alimentar(texto)
+    return analisador.resultado()
+
+MOTORES = {
+    'referencia': analisar_referencia,
+    'streaming': analisar_streaming,
+    'tabela': analisar_tabela,
+}
+if NUMPY_DISPONIVEL:
+    MOTORES['numpy'] = analisar_numpy
+
+def analisar_texto(texto, motor='auto'):
+    if motor == 'auto':
+        # Os motores rápidos só valem para ASCII (fora dele, lower() pode mudar o tamanho do texto)
+        motor = 'tabela' if texto.isascii() else 'streaming'
+    elif motor in ('tabela', 'numpy') and not texto.isascii():
+        motor = 'streaming'
+    return MOTORES[motor](texto)
+
+def analisar_com_tempo(texto):
+    # Resultado no mesmo formato da rota /api/analisar-string (executado também nos processos do lote)
+    inicio = time.perf_counter()
+    vogal = analisar_texto(texto)
+    total_ms = round((time.perf_counter() - inicio) * 1000, 2)
+    return {
+        "string": texto,
+        "vogal": vogal if vogal else SEM_RESULTADO,
+        "tempoTotal": f"{total_ms}ms"
+    }
@@ -1,23 +1,68 @@
 import os
+import io
+import re
+import csv
 import time
-from flask import Flask, request, jsonify # type: ignore
+import uuid
+import random
+import secrets
+import hashlib
+import json
+import codecs
+import functools
+import click # type: ignore
+from datetime import datetime, timedelta, timezone
+from flask import Flask, Blueprint, current_app, request, jsonify, abort, Response, stream_with_context, make_response # type: ignore
 from flask_sqlalchemy import SQLAlchemy # type: ignore
+from sqlalchemy.dialects import sqlite # type: ignore
 from flask_cors import CORS  # type: ignore
+from migracoes import aplicar_migracoes, INDICES_BUSCA
+from banco import uri_banco, opcoes_engine, registrar_pragmas, repetir_se_ocupado, banco_ocupado
+from cache import criar_cache, CacheLRU
+from analisador import AnalisadorStreaming, analisar_texto, analisar_com_tempo, SEM_RESULTADO
+from metricas import registrar_metricas
+from serializacao import ProvedorJSON
+from esquemas import pedido_resposta, pedido_pendente_resposta, projetar
 
 # --- Configuração do Flask ---
-app = Flask(__name__)
-CORS(app) # Habilita CORS para todas as rotas por padrão (permite frontend React acessar)
+# As rotas ficam no blueprint 'api' e o app é montado por create_app() (fábrica WSGI, usada
+# pelo gunicorn e pelo asgi.py). O módulo ainda expõe uma instância padrão em 'app', criada
+# sob demanda (ver app_padrao no fim do arquivo), para 'python app.py', 'flask --app app ...'
+# e 'gunicorn app:app'.
+db = SQLAlchemy()
+api = Blueprint('api', __name__, cli_group=None) # cli_group=None: comandos direto em 'flask --app app <comando>'
 
-# Configuração do SQLAlchemy para usar SQLite
-# O banco de dados será criado no diretório 'instance'
-basedir = os.path.abspath(os.path.dirname(__file__))
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(basedir, 'instance', 'database.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False # Recomendado para não consumir muita memória
-db = SQLAlchemy(app)
+def create_app(config=None):
+    app = Flask(__name__)
+    app.json = ProvedorJSON(app) # jsonify com orjson/msgspec quando instalados (ver serializacao.py)
+    CORS(app, expose_headers=['X-Next-After', 'ETag']) # Habilita CORS para todas as rotas por padrão (permite frontend React acessar)
 
-# Cria a pasta 'instance'
-if not os.path.exists(os.path.join(basedir, 'instance')):
-    os.makedirs(os.path.join(basedir, 'instance'))
+    # Configuração do SQLAlchemy para usar SQLite
+    # O banco de dados será criado no diretório 'instance' (ou outro banco, via DATABASE_URL)
+    app.config.update(config or {})
+    if 'SQLALCHEMY_DATABASE_URI' not in app.config:
+        padrao = 'sqlite:///' + os.path.join(app.instance_path, 'database.db')
+        app.config['SQLALCHEMY_DATABASE_URI'] = uri_banco(padrao)
+        if app.config['SQLALCHEMY_DATABASE_URI'] == padrao:
+            os.makedirs(app.instance_path, exist_ok=True) # Cria a pasta 'instance' só quando usa o SQLite padrão
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', opcoes_engine(app.config['SQLALCHEMY_DATABASE_URI'])) # Perfil de pool (ver banco.py)
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False # Recomendado para não consumir muita memória
+    db.init_app(app)
+    with app.app_context():
+        registrar_pragmas(db.engine) # WAL, synchronous, busy_timeout, mmap e cache (somente SQLite)
+        # Métricas por requisição e GET /metrics (somente com METRICAS=1, ver metricas.py)
+        app.extensions['metricas'] = registrar_metricas(app, db.engine)
+    # Cache read-through de clientes e produtos por id (ver cache.py e obter_registros).
+    # Criado aqui, e não na importação: o backend 'sqlite' cria a pasta e o arquivo do cache.
+    app.extensions['cache_registros'] = criar_cache(app.instance_path)
+    # Corpos memorizados por ETag (ver condicional), por app: cada app tem o seu banco
+    app.extensions['respostas_memorizadas'] = CacheLRU(capacidade=CAPACIDADE_MEMO_RELATORIOS, ttl=3600)
+
+    app.register_blueprint(api)
+    return app
+
+# Rotas de escrita repetem a transação se o SQLite estiver ocupado ("database is locked")
+escrita = repetir_se_ocupado(db.session)
 
 # --- Modelos de Banco de Dados (Para Tarefa 2) ---
 class Cliente(db.Model):
@@ -33,153 +78,354 @@ class Produto(db.Model):
     preco = db.Column(db.Float, nullable=False)
     itens_pedido = db.relationship('ItemPedido', backref='produto', lazy='dynamic') # Usar 'dynamic' para queries eficientes
 
+# No SQLite, DATETIME é texto e o CURRENT_TIMESTAMP das rotas grava 'AAAA-MM-DD HH:MM:SS'. Datas
+# enviadas pelo Python (ex.: carga sintética) são gravadas no mesmo formato, sem microssegundos,
+# para que as comparações de texto de coluna_data_pedido valham para todas as linhas.
+FORMATO_DATA_SQLITE = '%Y-%m-%d %H:%M:%S'
+DataHoraPedido = db.DateTime().with_variant(sqlite.DATETIME(
+    storage_format='%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d'), 'sqlite')
+
 class Pedido(db.Model):
+    # Índice composto para filtros por status ordenados/filtrados por data (ex.: pedidos pendentes).
+    # Ele também atende filtros só por status, por isso não há um índice separado para 'status'.
+    __table_args__ = (db.Index('ix_pedido_status_data_pedido', 'status', 'data_pedido'),)
+
     id = db.Column(db.Integer, primary_key=True)
-    cliente_id = db.Column(db.Integer, db.ForeignKey('cliente.id'), nullable=False)
-    data_pedido = db.Column(db.DateTime, default=db.func.current_timestamp())
+    cliente_id = db.Column(db.Integer, db.ForeignKey('cliente.id'), nullable=False, index=True)
+    data_pedido = db.Column(DataHoraPedido, default=db.func.current_timestamp(), index=True)
     status = db.Column(db.String(50), default="Em andamento", nullable=False) # Ex: "Em andamento", "Finalizado", "Cancelado"
-    valor_total = db.Column(db.Float, default=0.0, nullable=False)
+    valor_total = db.Column(db.Float, default=0.0, nullable=False, index=True)
     # cascate="all, delete-orphan" garante que itens do pedido sejam deletados junto com o pedido
     itens = db.relationship('ItemPedido', backref='pedido', lazy='dynamic', cascade="all, delete-orphan")
 
 class ItemPedido(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    pedido_id = db.Column(db.Integer, db.ForeignKey('pedido.id'), nullable=False)
-    produto_id = db.Column(db.Integer, db.ForeignKey('produto.id'), nullable=False)
+    pedido_id = db.Column(db.Integer, db.ForeignKey('pedido.id'), nullable=False, index=True)
+    produto_id = db.Column(db.Integer, db.ForeignKey('produto.id'), nullable=False, index=True)
     quantidade = db.Column(db.Integer, nullable=False)
     preco_unitario = db.Column(db.Float, nullable=False) # Preço do produto no momento do pedido
 
-# --- Função de Inicialização do Banco de Dados com Dados de Exemplo ---
-# Esta função será executada UMA VEZ quando o servidor Flask iniciar
-def initialize_database():
-    with app.app_context(): 
-        db.create_all() # Cria todas as tabelas se não existirem
-        
-        # Adicionar dados de exemplo APENAS se o banco estiver vazio
-        if Cliente.query.count() == 0:
-            print("Criando dados de exemplo...")
-            
-            # Clientes
-            cliente1 = Cliente(nome="Maria Silva", email="maria@example.com")
-            cliente2 = Cliente(nome="João Souza", email="joao@example.com")
-            db.session.add_all([cliente1, cliente2])
-            db.session.commit() 
-
-            # Produtos
-            produto1 = Produto(nome="Notebook Super", preco=4500.00)
-            produto2 = Produto(nome="Mouse Gamer", preco=150.00)
-            produto3 = Produto(nome="Teclado Mecânico", preco=300.00)
-            produto4 = Produto(nome="Webcam Full HD", preco=250.00)
-            db.session.add_all([produto1, produto2, produto3, produto4])
-            db.session.commit() 
-
-            # Pedido 1 (Em andamento)
-            pedido1 = Pedido(cliente_id=cliente1.id, status="Em andamento")
-            db.session.add(pedido1)
-            db.session.flush() # Para que o ID do pedido seja gerado
-
-            item1_p1 = ItemPedido(pedido_id=pedido1.id, produto_id=produto1.id, quantidade=1, preco_unitario=produto1.preco)
-            item2_p1 = ItemPedido(pedido_id=pedido1.id, produto_id=produto2.id, quantidade=2, preco_unitario=produto2.preco)
-            db.session.add_all([item1_p1, item2_p1])
-            db.session.commit()
-            pedido1.valor_total = sum(item.quantidade * item.preco_unitario for item in pedido1.itens)
-            db.session.add(pedido1) # Atualiza o pedido com o valor total calculado
-            db.session.commit()
-
-            # Pedido 2 (Finalizado)
-            pedido2 = Pedido(cliente_id=cliente2.id, status="Finalizado")
-            db.session.add(pedido2)
-            db.session.flush()
-
-            item1_p2 = ItemPedido(pedido_id=pedido2.id, produto_id=produto3.id, quantidade=1, preco_unitario=produto3.preco)
-            db.session.add(item1_p2)
-            db.session.commit()
-            pedido2.valor_total = sum(item.quantidade * item.preco_unitario for item in pedido2.itens)
-            db.session.add(pedido2)
-            db.session.commit()
-
-            # Pedido 3 (Em andamento, do Cliente 1)
-            pedido3 = Pedido(cliente_id=cliente1.id, status="Em andamento")
-            db.session.add(pedido3)
-            db.session.flush()
-
-            item1_p3 = ItemPedido(pedido_id=pedido3.id, produto_id=produto4.id, quantidade=3, preco_unitario=produto4.preco)
-            db.session.add(item1_p3)
-            db.session.commit()
-            pedido3.valor_total = sum(item.quantidade * item.preco_unitario for item in pedido3.itens)
-            db.session.add(pedido3)
-            db.session.commit()
-            
-            print("Dados de exemplo criados.")
+# Tabela de linha única com os totais do relatório "Resumo das Vendas".
+# É atualizada incrementalmente (na mesma transação) pelas rotas que escrevem pedidos,
+# então o relatório é lido em O(1) em vez de agregar as tabelas inteiras a cada chamada.
+class ResumoVendas(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    total_pedidos = db.Column(db.Integer, default=0, nullable=False)
+    valor_total_faturado = db.Column(db.Float, default=0.0, nullable=False)
+    quantidade_total_produtos = db.Column(db.Integer, default=0, nullable=False)
+
+# Vendas pré-agregadas por (dia, produto, cliente), base das séries temporais dos relatórios.
+# Mantida incrementalmente na mesma transação das escritas de pedidos (ver ajustar_vendas_diarias);
+# semanas e meses são agregados a partir dos dias, sem varrer item_pedido.
+class VendasDiarias(db.Model):
+    dia = db.Column(db.Date, primary_key=True)
+    produto_id = db.Column(db.Integer, primary_key=True, index=True)
+    cliente_id = db.Column(db.Integer, primary_key=True, index=True)
+    receita = db.Column(db.Float, default=0.0, nullable=False)
+    quantidade = db.Column(db.Integer, default=0, nullable=False)
+
+# Versão dos dados de cada tabela, incrementada na mesma transação de toda escrita.
+# É a base dos ETags das listagens e relatórios (ver @condicional).
+class VersaoDados(db.Model):
+    tabela = db.Column(db.String(50), primary_key=True)
+    versao = db.Column(db.Integer, default=0, nullable=False)
+
+# Registro de alterações (change feed): uma linha por cliente, produto ou pedido criado, alterado
+# ou removido, gravada na mesma transação da escrita (ver registrar_alteracoes). 'dados' guarda o
+# registro já em JSON, no formato da API, como ficou após a escrita (vazio nas remoções).
+# AUTOINCREMENT: o seq nunca é reaproveitado, nem depois de limpar as linhas antigas.
+class Alteracao(db.Model):
+    __table_args__ = {'sqlite_autoincrement': True}
+    seq = db.Column(db.Integer, primary_key=True)
+    tabela = db.Column(db.String(20)) # Nula em 'recarga'
+    registro_id = db.Column(db.Integer)
+    operacao = db.Column(db.String(10), nullable=False) # 'criado', 'alterado', 'removido' ou 'recarga'
+    dados = db.Column(db.Text)
+    momento = db.Column(db.DateTime, default=db.func.current_timestamp(), nullable=False, index=True)
+
+# --- Manutenção do Resumo de Vendas ---
+RESUMO_ID = 1
+
+def calcular_totais_vendas():
+    # Recalcula os totais do zero (varredura completa), usado na reconstrução e na verificação
+    total_pedidos = db.session.query(Pedido.id).count()
+    valor_total_faturado = db.session.query(db.func.sum(Pedido.valor_total)).scalar() or 0.0
+    quantidade_total_produtos = db.session.query(db.func.sum(ItemPedido.quantidade)).scalar() or 0
+    return total_pedidos, valor_total_faturado, quantidade_total_produtos
+
+def recalcular_resumo_vendas():
+    # Reconstrói a linha do resumo e retorna (resumo_anterior, resumo_recalculado); não faz commit
+    resumo = db.session.get(ResumoVendas, RESUMO_ID)
+    anterior = None
+    if resumo is None:
+        resumo = ResumoVendas(id=RESUMO_ID)
+        db.session.add(resumo)
+    else:
+        anterior = (resumo.total_pedidos, resumo.valor_total_faturado, resumo.quantidade_total_produtos)
+    totais = calcular_totais_vendas()
+    resumo.total_pedidos, resumo.valor_total_faturado, resumo.quantidade_total_produtos = totais
+    return anterior, totais
+
+def ajustar_resumo_vendas(pedidos=0, valor=0.0, quantidade=0):
+    # UPDATE atômico com incrementos, executado na transação da rota que alterou os pedidos
+    atualizados = db.session.query(ResumoVendas).filter_by(id=RESUMO_ID).update({
+        ResumoVendas.total_pedidos: ResumoVendas.total_pedidos + pedidos,
+        ResumoVendas.valor_total_faturado: ResumoVendas.valor_total_faturado + valor,
+        ResumoVendas.quantidade_total_produtos: ResumoVendas.quantidade_total_produtos + quantidade
+    }, synchronize_session=False)
+    if atualizados == 0: # Banco antigo sem a linha do resumo: reconstrói do zero
+        recalcular_resumo_vendas()
+
+# --- Manutenção das Vendas Diárias (séries temporais) ---
+def vendas_dos_pedidos(criterio, sinal=1):
+    # Agregação (dia, produto, cliente) dos itens dos pedidos que atendem ao critério
+    return db.select(
+        db.func.date(Pedido.data_pedido), ItemPedido.produto_id, Pedido.cliente_id,
+        sinal * db.func.sum(ItemPedido.quantidade * ItemPedido.preco_unitario),
+        sinal * db.func.sum(ItemPedido.quantidade)
+    ).join(Pedido, Pedido.id == ItemPedido.pedido_id).where(criterio).group_by(
+        db.func.date(Pedido.data_pedido), ItemPedido.produto_id, Pedido.cliente_id)
+
+def ajustar_vendas_diarias(criterio, sinal=1):
+    # Soma (sinal=1) ou subtrai (sinal=-1) as vendas dos pedidos do critério com um único
+    # INSERT ... SELECT ... ON CONFLICT DO UPDATE. O dia vem do próprio banco, pois data_pedido
+    # é preenchida por CURRENT_TIMESTAMP. Deve rodar com os itens já gravados (flush) e, ao
+    # remover, antes de apagar os pedidos/itens. Linhas zeradas são ignoradas nas consultas (HAVING)
+    # e somem na reconstrução.
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert # type: ignore
+    else:
+        from sqlalchemy.dialects.sqlite import insert # type: ignore
+    db.session.flush()
+    comando = insert(VendasDiarias).from_select(
+        ['dia', 'produto_id', 'cliente_id', 'receita', 'quantidade'], vendas_dos_pedidos(criterio, sinal))
+    db.session.execute(comando.on_conflict_do_update(
+        index_elements=['dia', 'produto_id', 'cliente_id'],
+        set_={'receita': VendasDiarias.receita + comando.excluded.receita,
+              'quantidade': VendasDiarias.quantidade + comando.excluded.quantidade}))
+
+def recalcular_vendas_diarias():
+    # Reconstrói a tabela inteira a partir de pedidos e itens; não faz commit
+    db.session.query(VendasDiarias).delete(synchronize_session=False)
+    db.session.execute(db.insert(VendasDiarias).from_select(
+        ['dia', 'produto_id', 'cliente_id', 'receita', 'quantidade'], vendas_dos_pedidos(db.true())))
+    return db.session.query(VendasDiarias).count()
+
+def quantidade_itens_pedido(pedido_id):
+    return db.session.query(db.func.sum(ItemPedido.quantidade)).filter(ItemPedido.pedido_id == pedido_id).scalar() or 0
+
+@api.cli.command('migrar')
+def migrar():
+    """Cria as tabelas que faltam e aplica as migrações pendentes do schema."""
+    aplicadas = preparar_banco()
+    if aplicadas:
+        print(f"Migrações aplicadas: {', '.join(str(v) for v in aplicadas)}")
+    else:
+        print("Schema já está atualizado.")
+
+@api.cli.command('verificar-resumo')
+@click.option('--apenas-verificar', is_flag=True, help='Apenas reporta a divergência, sem gravar os totais recalculados.')
+def verificar_resumo(apenas_verificar):
+    """Recalcula o resumo de vendas do zero e reporta divergências."""
+    anterior, totais = recalcular_resumo_vendas()
+    nomes = ('total_pedidos', 'valor_total_faturado', 'quantidade_total_produtos')
+    if anterior is None:
+        print("Resumo de vendas inexistente; será criado.")
+        divergente = True
+    else:
+        divergente = False
+        for nome, valor_anterior, valor_recalculado in zip(nomes, anterior, totais):
+            if round(valor_anterior - valor_recalculado, 2) != 0:
+                divergente = True
+                print(f"Divergência em {nome}: armazenado={valor_anterior} recalculado={valor_recalculado}")
+        if not divergente:
+            print("Resumo de vendas consistente.")
+    if apenas_verificar:
+        db.session.rollback()
+    else:
+        if divergente:
+            incrementar_versao('pedido') # Invalida os relatórios memorizados/ETags
+        db.session.commit()
+        if divergente:
+            print("Resumo de vendas reconstruído.")
+
+@api.cli.command('recalcular-series')
+def recalcular_series():
+    """Reconstrói do zero a tabela de vendas diárias usada pelas séries temporais."""
+    linhas = recalcular_vendas_diarias()
+    incrementar_versao('pedido') # Invalida os relatórios memorizados/ETags
+    db.session.commit()
+    print(f"Vendas diárias reconstruídas: {linhas} linhas.")
+
+# --- Inicialização do banco e carga de dados ---
+# flask --app app init-db: cria as tabelas e aplica as migrações, sem gravar dados.
+# flask --app app seed: grava os dados de exemplo (banco vazio) ou, com --clientes/--produtos/
+# --pedidos, dados sintéticos para testes de carga. A carga usa INSERTs em lote (executemany)
+# com ids atribuídos aqui, numa única transação; o resumo e as vendas diárias são
+# reconstruídos uma vez no fim, em vez de ajustados a cada pedido.
+LOTE_CARGA = 10000 # Pedidos por lote de INSERTs
+
+DADOS_EXEMPLO = {
+    'clientes': [("Maria Silva", "maria@example.com"), ("João Souza", "joao@example.com")],
+    'produtos': [("Notebook Super", 4500.00), ("Mouse Gamer", 150.00), ("Teclado Mecânico", 300.00), ("Webcam Full HD", 250.00)],
+    # (cliente, status, data_pedido, [(produto, quantidade)]), com índices das listas acima
+    'pedidos': [
+        (0, "Em andamento", None, [(0, 1), (1, 2)]),
+        (1, "Finalizado", None, [(2, 1)]),
+        (0, "Em andamento", None, [(3, 3)]),
+    ],
+}
+
+NOMES_SINTETICOS = ("Ana", "Bruno", "Carla", "Diego", "Elisa", "Fábio", "Gabriela", "Heitor", "Isabela", "João",
+                    "Larissa", "Marcos", "Natália", "Otávio", "Paula", "Rafael", "Sofia", "Tiago", "Vitória", "Yuri")
+SOBRENOMES_SINTETICOS = ("Silva", "Souza", "Oliveira", "Santos", "Lima", "Pereira", "Costa", "Rodrigues", "Almeida",
+                         "Nascimento", "Carvalho", "Ribeiro", "Gomes", "Martins", "Araújo", "Barbosa")
+STATUS_SINTETICOS = (("Em andamento", "Finalizado", "Cancelado"), (3, 6, 1)) # Status e pesos
+
+def preparar_banco():
+    # Tabelas, migrações pendentes, identificador do banco e a linha do resumo de vendas;
+    # retorna as migrações aplicadas
+    db.create_all() # Cria todas as tabelas se não existirem
+    aplicadas = aplicar_migracoes(db.engine) # Atualiza bancos existentes (ex.: índices) que o create_all não altera
+    registrar_identificador_banco()
+    # Garante que o resumo de vendas exista e reflita os dados atuais
+    if db.session.get(ResumoVendas, RESUMO_ID) is None:
+        recalcular_resumo_vendas()
+    db.session.commit()
+    return aplicadas
+
+def proximo_id(modelo):
+    return (db.session.query(db.func.max(modelo.id)).scalar() or 0) + 1
+
+def gravar_carga(clientes, produtos, pedidos, lote=LOTE_CARGA):
+    # clientes: [(nome, email)]; produtos: [(nome, preco)]; pedidos: iterável (pode ser um gerador)
+    # de (cliente, status, data_pedido ou None, [(produto, quantidade)]), com índices de clientes
+    # e produtos. Retorna as quantidades gravadas; não faz commit. Os INSERTs são de Core (tabela),
+    # sem o caminho de bulk do ORM, que aqui custava ~4x o tempo do próprio executemany.
+    id_cliente, id_produto, id_pedido, id_item = (proximo_id(modelo) for modelo in (Cliente, Produto, Pedido, ItemPedido))
+    if clientes:
+        db.session.execute(Cliente.__table__.insert(), [{'id': id_cliente + i, 'nome': nome, 'email': email}
+                                                for i, (nome, email) in enumerate(clientes)])
+    if produtos:
+        db.session.execute(Produto.__table__.insert(), [{'id': id_produto + i, 'nome': nome, 'preco': preco}
+                                                for i, (nome, preco) in enumerate(produtos)])
+    precos = [preco for _, preco in produtos]
+
+    totais = {'clientes': len(clientes), 'produtos': len(produtos), 'pedidos': 0, 'itens': 0}
+    pedidos_rows, itens_rows = [], []
+    def gravar_lote():
+        db.session.execute(Pedido.__table__.insert(), pedidos_rows)
+        if itens_rows:
+            db.session.execute(ItemPedido.__table__.insert(), itens_rows)
+        totais['pedidos'] += len(pedidos_rows)
+        totais['itens'] += len(itens_rows)
+        pedidos_rows.clear()
+        itens_rows.clear()
+
+    for cliente, status, data_pedido, itens in pedidos:
+        valor_total = 0.0
+        for produto, quantidade in itens:
+            itens_rows.append({'id': id_item, 'pedido_id': id_pedido, 'produto_id': id_produto + produto,
+                               'quantidade': quantidade, 'preco_unitario': precos[produto]})
+            valor_total += quantidade * precos[produto]
+            id_item += 1
+        linha = {'id': id_pedido, 'cliente_id': id_cliente + cliente, 'status': status, 'valor_total': valor_total}
+        if data_pedido is not None: # Sem data: CURRENT_TIMESTAMP do banco, como nas rotas
+            linha['data_pedido'] = data_pedido
+        pedidos_rows.append(linha)
+        id_pedido += 1
+        if len(pedidos_rows) >= lote:
+            gravar_lote()
+    if pedidos_rows:
+        gravar_lote()
+
+    if db.engine.dialect.name == 'postgresql': # Ids explícitos não avançam as sequences
+        for tabela in ('cliente', 'produto', 'pedido', 'item_pedido'):
+            db.session.execute(db.text(f"SELECT setval(pg_get_serial_sequence('{tabela}', 'id'), "
+                                       f"(SELECT coalesce(max(id), 1) FROM {tabela}))"))
+    recalcular_vendas_diarias()
+    recalcular_resumo_vendas()
+    incrementar_versao('cliente', 'produto', 'pedido')
+    registrar_recarga() # Carga em massa: um único aviso para os clientes recarregarem tudo
+    return totais
+
+def dados_sinteticos(clientes, produtos, pedidos, itens_por_pedido=3, dias=365, semente=42):
+    # Dados reprodutíveis pela semente (exceto o sufixo dos e-mails, único por carga).
+    # Os pedidos são gerados sob demanda, para cargas grandes não ficarem inteiras em memória.
+    aleatorio = random.Random(semente)
+    sufixo = uuid.uuid4().hex[:8]
+    linhas_clientes = [(f"{aleatorio.choice(NOMES_SINTETICOS)} {aleatorio.choice(SOBRENOMES_SINTETICOS)}",
+                        f"cliente{i + 1}.{sufixo}@exemplo.com") for i in range(clientes)]
+    linhas_produtos = [(f"Produto {i + 1}", round(aleatorio.uniform(5, 5000), 2)) for i in range(produtos)]
+    agora = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0) # UTC, como o CURRENT_TIMESTAMP dos pedidos da API
+    sortear = aleatorio.random # int(sortear() * n) em vez de randrange/randint: o gerador pesa mais que os INSERTs
+    maximo_itens = min(produtos, max(1, 2 * itens_por_pedido - 1))
+    def gerar_pedidos():
+        for _ in range(pedidos):
+            itens = [(produto, 1 + int(sortear() * 5)) for produto in aleatorio.sample(range(produtos), 1 + int(sortear() * maximo_itens))]
+            yield (int(sortear() * clientes), aleatorio.choices(*STATUS_SINTETICOS)[0],
+                   agora - timedelta(seconds=int(sortear() * dias * 86400)), itens)
+    return linhas_clientes, linhas_produtos, gerar_pedidos()
+
+def criar_dados_exemplo():
+    # Grava os dados de exemplo APENAS se o banco não tiver clientes; retorna True se gravou
+    if db.session.query(Cliente.id).first() is not None:
+        return False
+    print("Criando dados de exemplo...")
+    gravar_carga(DADOS_EXEMPLO['clientes'], DADOS_EXEMPLO['produtos'], DADOS_EXEMPLO['pedidos'])
+    db.session.commit()
+    print("Dados de exemplo criados.")
+    return True
+
+@api.cli.command('init-db')
+def init_db():
+    """Cria as tabelas e aplica as migrações pendentes, sem gravar dados."""
+    aplicadas = preparar_banco()
+    print(f"Banco inicializado (migrações aplicadas: {', '.join(str(v) for v in aplicadas) or 'nenhuma'}).")
+
+@api.cli.command('seed')
+@click.option('--clientes', type=int, default=0, help='Clientes sintéticos a criar.')
+@click.option('--produtos', type=int, default=0, help='Produtos sintéticos a criar.')
+@click.option('--pedidos', type=int, default=0, help='Pedidos sintéticos (entre os clientes e produtos criados).')
+@click.option('--itens', type=int, default=3, show_default=True, help='Média de itens por pedido.')
+@click.option('--dias', type=int, default=365, show_default=True, help='Período das datas dos pedidos (dias até hoje).')
+@click.option('--semente', type=int, default=42, show_default=True, help='Semente do gerador aleatório.')
+@click.option('--lote', type=int, default=LOTE_CARGA, show_default=True, help='Pedidos por lote de INSERTs.')
+def seed(clientes, produtos, pedidos, itens, dias, semente, lote):
+    """Grava os dados de exemplo (banco vazio) ou, com --clientes/--produtos/--pedidos, dados sintéticos."""
+    preparar_banco()
+    if not (clientes or produtos or pedidos):
+        if not criar_dados_exemplo():
+            print("O banco já tem dados; nada foi gravado.")
+        return
+    if min(clientes, produtos, pedidos, itens, dias, lote) < 0 or (pedidos and not (clientes and produtos and itens and dias and lote)):
+        raise click.UsageError("Pedidos sintéticos precisam de --clientes, --produtos, --itens, --dias e --lote positivos")
+    inicio = time.perf_counter()
+    totais = gravar_carga(*dados_sinteticos(clientes, produtos, pedidos, itens, dias, semente), lote=lote)
+    db.session.commit()
+    print(f"Gravados {totais['clientes']} clientes, {totais['produtos']} produtos, {totais['pedidos']} pedidos "
+          f"e {totais['itens']} itens em {time.perf_counter() - inicio:.1f}s.")
+
+# Usada por 'python app.py': prepara o banco e grava os dados de exemplo se ele estiver vazio
+def initialize_database(aplicacao=None):
+    with (aplicacao or app_padrao()).app_context():
+        preparar_banco()
+        criar_dados_exemplo()
 
 # --- (apenas para verificar se o backend está rodando) ---
-@app.route('/')
+@api.route('/')
 def hello_world():
     return 'Backend da Aplicação Web LogAp rodando!'
 
 # --- Tarefa 1: API de Análise de String ---
-@app.route('/api/analisar-string', methods=['POST'])
+@api.route('/api/analisar-string', methods=['POST'])
 def analisar_string():
     data = request.get_json()
     input_string = data.get('string', '')
 
     start_time = time.perf_counter() # Início da contagem de tempo
 
-    # Definindo vogais e consoantes para a lógica
-    # As vogais e consoantes são tratadas em minúsculas para a lógica de comparação
-    vogais = "aeiou"
-    consoantes = "bcdfghjklmnpqrstvwxyz"
-
-    found_vowel = ""
-    # Mapeia caracteres para suas contagens na string original (case-insensitive)
-    char_counts_lower = {}
-    for char_orig in input_string:
-        lower_char = char_orig.lower()
-        char_counts_lower[lower_char] = char_counts_lower.get(lower_char, 0) + 1
-
-    # --- Lógica Principal da Tarefa 1 ---
-    # Premissa: Não será possível reiniciar o fluxo de leitura da string.
-    
-    # Variáveis de controle de estado:
-    # last_char_was_vowel: True se o caractere ANTERIOR era uma vogal.
-    # found_consonant_after_vowel: True se já encontramos uma sequência VOGAL-CONSOANTE.
-    
-    last_char_was_vowel = False 
-    found_consonant_after_vowel = False
-
-    for char_orig in input_string:
-        char_lower = char_orig.lower() # Converte para minúscula para a lógica
-        
-        is_current_vowel = (char_lower in vogais)
-        is_current_consonant = (char_lower in consoantes)
-
-        if not (is_current_vowel or is_current_consonant): # Ignora caracteres que não são letras
-            # Resetamos o estado se encontramos algo que não é letra,
-            # pois a sequência VOGAL-CONSOANTE-VOGAL precisa ser contínua em letras.
-            last_char_was_vowel = False 
-            found_consonant_after_vowel = False 
-            continue 
-
-        if is_current_vowel: # Se o caractere atual é uma vogal
-            if found_consonant_after_vowel: # E já estávamos no estado "VOGAL-CONSOANTE"
-                # Significa que encontramos a sequência VOGAL-CONSOANTE-VOGAL
-                # Agora, verificamos a condição "que não se repete na string inteira"
-                if char_counts_lower.get(char_lower, 0) == 1:
-                    found_vowel = char_orig # Guarda a vogal na sua capitalização original
-                    break # Encontramos a *primeira* que atende aos critérios, podemos parar
-            
-            last_char_was_vowel = True # O caractere atual é uma vogal, então o próximo pode vir depois de uma vogal
-            found_consonant_after_vowel = False # Reinicia a busca por uma nova sequência VOGAL-CONSOANTE
-        
-        elif is_current_consonant: # Se o caractere atual é uma consoante
-            if last_char_was_vowel: # E o caractere ANTERIOR era uma vogal
-                found_consonant_after_vowel = True # Marcamos que encontramos "VOGAL-CONSOANTE"
-            else: # Se o anterior não era vogal
-                found_consonant_after_vowel = False # Reinicia a busca
-            
-            last_char_was_vowel = False # O caractere atual não é uma vogal
-        
-    # --- Fim da Lógica da Tarefa 1 ---
+    found_vowel = analisar_texto(input_string) # Motor escolhido automaticamente (ver analisador.py)
 
     end_time = time.perf_counter() # Fim da contagem de tempo
     total_time_ms = round((end_time - start_time) * 1000, 2) # Converte para milissegundos
@@ -191,15 +437,270 @@ def analisar_string():
         "tempoTotal": f"{total_time_ms}ms"
     })
 
+# --- Tarefa 1: análise em streaming e em lote ---
+# /stream: o corpo da requisição (texto puro) é lido e analisado em blocos numa única passagem,
+# sem guardar a string em memória (a resposta traz o tamanho no lugar da string).
+# /lote: várias strings (array JSON, {"strings": [...]} ou NDJSON), distribuídas entre processos.
+BLOCO_STREAMING = 64 * 1024
+LOTE_MINIMO_PARALELO = 256 * 1024 # Abaixo deste total de caracteres, analisa no próprio processo
+PROCESSOS_ANALISADOR = int(os.environ.get('ANALISADOR_PROCESSOS', os.cpu_count() or 1))
+_pool_analisador = None
+
+def pool_analisador():
+    global _pool_analisador
+    if _pool_analisador is None: # Criado sob demanda: só quem usa o lote paga pelos processos
+        from concurrent.futures import ProcessPoolExecutor # Importação sob demanda (multiprocessing pesa na inicialização)
+        _pool_analisador = ProcessPoolExecutor(max_workers=PROCESSOS_ANALISADOR)
+    return _pool_analisador
+
+def decodificador_corpo():
+    # Decodificador incremental do charset do Content-Type (padrão UTF-8). Charset desconhecido,
+    # ou codec que não é de texto (ex.: 'hex', 'zlib', que decodificam bytes em bytes), vira 400.
+    charset = request.mimetype_params.get('charset', 'utf-8')
+    try:
+        codec = codecs.lookup(charset)
+    except LookupError:
+        raise ParametroInvalido(f"Charset não suportado: {charset}")
+    if not getattr(codec, '_is_text_encoding', True):
+        raise ParametroInvalido(f"Charset não suportado: {charset}")
+    return codec.incrementaldecoder(errors='replace')
+
+@api.route('/api/analisar-string/stream', methods=['POST'])
+def analisar_string_stream():
+    start_time = time.perf_counter()
+
+    analisador = AnalisadorStreaming()
+    decodificador = decodificador_corpo()
+    while True:
+        bloco = request.stream.read(BLOCO_STREAMING)
+        if not bloco:
+            break
+        analisador.alimentar(decodificador.decode(bloco))
+    analisador.alimentar(decodificador.decode(b'', final=True))
+    found_vowel = analisador.resultado()
+
+    total_time_ms = round((time.perf_counter() - start_time) * 1000, 2)
+    return jsonify({
+        "tamanho": analisador.posicao,
+        "vogal": found_vowel if found_vowel else SEM_RESULTADO,
+        "tempoTotal": f"{total_time_ms}ms"
+    })
+
+def ler_strings_lote():
+    if request.mimetype == 'application/x-ndjson':
+        strings = []
+        for linha in request.stream:
+            if linha.strip():
+                item = json.loads(linha)
+                strings.append(item.get('string') if isinstance(item, dict) else item)
+    else:
+        data = request.get_json()
+        strings = data.get('strings') if isinstance(data, dict) else data
+    if not isinstance(strings, list) or not all(isinstance(s, str) for s in strings):
+        raise ParametroInvalido("Envie uma lista de strings (array JSON, {\"strings\": [...]} ou NDJSON)")
+    return strings
+
+@api.route('/api/analisar-string/lote', methods=['POST'])
+def analisar_string_lote():
+    try:
+        strings = ler_strings_lote()
+    except json.JSONDecodeError: # JSON inválido numa linha do NDJSON
+        raise ParametroInvalido("NDJSON inválido")
+
+    if sum(len(s) for s in strings) < LOTE_MINIMO_PARALELO:
+        resultados = [analisar_com_tempo(s) for s in strings]
+    else:
+        blocos = max(1, len(strings) // (PROCESSOS_ANALISADOR * 4))
+        resultados = list(pool_analisador().map(analisar_com_tempo, strings, chunksize=blocos))
+    return jsonify(resultados)
+
 # --- Tarefa 2: APIs de Gestão de Vendas (CRUD e Relatórios) ---
 
+# --- Versões de dados e requisições condicionais (ETag / If-None-Match) ---
+# O ETag é derivado da URL e das versões das tabelas de que a resposta depende. Se o cliente
+# enviar o mesmo ETag em If-None-Match, responde 304 sem executar a rota (nem suas consultas).
+# Com memorizar=True, o corpo serializado fica guardado por ETag: como toda escrita muda a
+# versão (e portanto o ETag), o corpo guardado nunca fica desatualizado.
+# Todo ETag inclui também o identificador do banco: um número aleatório gravado em versao_dados
+# (linha CHAVE_BANCO) quando o banco é preparado. Assim dois bancos com as mesmas versões, ou um
+# banco recriado (cujas versões recomeçam), nunca repetem um ETag nem um corpo memorizado.
+CAPACIDADE_MEMO_RELATORIOS = int(os.environ.get('MEMO_RELATORIOS_CAPACIDADE', 64))
+CHAVE_BANCO = '_banco'
+
+def respostas_memorizadas():
+    return current_app.extensions['respostas_memorizadas']
+
+def registrar_identificador_banco():
+    # Cria o identificador do banco, se ainda não existir; não faz commit
+    if db.session.get(VersaoDados, CHAVE_BANCO) is None:
+        db.session.add(VersaoDados(tabela=CHAVE_BANCO, versao=1 + secrets.randbelow(2 ** 31 - 1)))
+
+def incrementar_versao(*tabelas):
+    # Executado na transação da rota de escrita, antes do commit
+    atualizadas = db.session.query(VersaoDados).filter(VersaoDados.tabela.in_(tabelas)).update(
+        {VersaoDados.versao: VersaoDados.versao + 1}, synchronize_session=False)
+    if atualizadas < len(tabelas): # Primeira escrita da tabela: cria a linha da versão
+        existentes = {t for (t,) in db.session.query(VersaoDados.tabela).filter(VersaoDados.tabela.in_(tabelas))}
+        db.session.add_all(VersaoDados(tabela=t, versao=1) for t in tabelas if t not in existentes)
+
+def consulta_versoes(tabelas):
+    return db.select(VersaoDados.tabela, VersaoDados.versao).where(VersaoDados.tabela.in_((CHAVE_BANCO, *tabelas)))
+
+def versoes_de(linhas, tabelas):
+    # (identificador do banco, versões das tabelas); 0 quando ainda não há a linha
+    versoes = dict(linhas)
+    return tuple(versoes.get(t, 0) for t in (CHAVE_BANCO, *tabelas))
+
+def versoes_dados(tabelas):
+    return versoes_de(db.session.execute(consulta_versoes(tabelas)).all(), tabelas)
+
+def gerar_etag(caminho_completo, versoes):
+    # caminho_completo no formato de request.full_path ('/rota?query'); também usado pelo asgi.py
+    return hashlib.sha1(f"{caminho_completo}|{versoes}".encode()).hexdigest()
+
+def condicional(*tabelas, memorizar=False):
+    def decorador(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            versoes = versoes_dados(tabelas) # Lidas antes dos dados: na dúvida, o ETag fica "mais antigo"
+            etag = gerar_etag(request.full_path, versoes)
+            if request.if_none_match.contains(etag):
+                resposta = Response(status=304)
+            else:
+                corpo = respostas_memorizadas().obter(etag) if memorizar else None
+                if corpo is not None:
+                    resposta = Response(corpo, mimetype='application/json')
+                else:
+                    resposta = make_response(view(*args, **kwargs))
+                    if resposta.status_code != 200:
+                        return resposta
+                    if memorizar:
+                        respostas_memorizadas().definir(etag, resposta.get_data())
+            resposta.set_etag(etag)
+            resposta.headers['Cache-Control'] = 'no-cache' # O navegador guarda, mas sempre revalida pelo ETag
+            return resposta
+        return wrapper
+    return decorador
+
+# --- Leitura de clientes e produtos via cache ---
+# Cache read-through por id, usado pelas rotas GET de cliente/produto e pelas escritas de pedidos
+# (existência do cliente, produtos e preços dos itens). A chave leva o identificador do banco e a
+# versão da tabela (versao_dados, como nos ETags), lidos antes do registro: um banco recriado não
+# reaproveita o cache 'sqlite' antigo, e toda escrita em clientes/produtos incrementa a versão
+# na mesma transação, então, após o commit, nenhum worker (nem o backend 'memoria' dos outros
+# processos) encontra mais as entradas antigas, que saem pelo LRU/TTL. Uma leitura concorrente
+# com a escrita guarda, no máximo, o registro sob a versão anterior, que ninguém mais consulta.
+# Os valores são dicionários com os campos do registro; registros inexistentes não são guardados.
+CAMPOS_CLIENTE = ('id', 'nome', 'email')
+CAMPOS_PRODUTO = ('id', 'nome', 'preco')
+CAMPOS_CACHE = {'cliente': CAMPOS_CLIENTE, 'produto': CAMPOS_PRODUTO}
+
+def cache_registros():
+    return current_app.extensions['cache_registros']
+
+def obter_registros(modelo, ids, lote=None):
+    # {id: dados} dos registros existentes entre 'ids': 1 consulta das versões e, para os que não
+    # estiverem no cache, consultas IN em lotes
+    tabela = modelo.__tablename__
+    campos = CAMPOS_CACHE[tabela]
+    versao = '.'.join(map(str, versoes_dados((tabela,))))
+    cache = cache_registros()
+    encontrados, faltantes = {}, []
+    for registro_id in dict.fromkeys(ids):
+        dados = cache.obter(f'{tabela}:{versao}:{registro_id}')
+        if dados is None:
+            faltantes.append(registro_id)
+        else:
+            encontrados[registro_id] = dados
+    if faltantes:
+        colunas = [getattr(modelo, campo) for campo in campos[1:]]
+        for registro_id, linha in buscar_por_ids(modelo, faltantes, lote or LOTE_BULK_PADRAO, *colunas).items():
+            dados = dict(zip(campos, linha))
+            cache.definir(f'{tabela}:{versao}:{registro_id}', dados)
+            encontrados[registro_id] = dados
+    return encontrados
+
+def obter_cliente(cliente_id):
+    return obter_registros(Cliente, [cliente_id]).get(cliente_id)
+
+def obter_produto(produto_id):
+    return obter_registros(Produto, [produto_id]).get(produto_id)
+
+@api.route('/api/cache/estatisticas', methods=['GET'])
+def estatisticas_cache():
+    # Contadores de acertos/faltas/remoções, para dimensionar CACHE_CAPACIDADE e CACHE_TTL
+    return jsonify(cache_registros().estatisticas())
+
+# --- Paginação por cursor (keyset) e projeção de campos ---
+# As listagens aceitam ?after=<id>&limit=<n>&fields=a,b,c.
+# A página é buscada com "WHERE id > after ORDER BY id LIMIT n", usando a chave primária,
+# então o custo de cada página é o mesmo independentemente da profundidade do cursor.
+# Quando pode haver mais registros, o cabeçalho X-Next-After traz o cursor da próxima página.
+PAGINA_PADRAO = 100
+PAGINA_MAXIMA = 1000
+
+CAMPOS_PEDIDO = ('id', 'cliente_id', 'cliente_nome', 'data_pedido', 'status', 'valor_total', 'itens')
+
+class ParametroInvalido(ValueError):
+    pass
+
+@api.app_errorhandler(ParametroInvalido)
+def parametro_invalido(e):
+    return jsonify({"error": str(e)}), 400
+
+def ler_limite():
+    try:
+        limite = int(request.args.get('limit', PAGINA_PADRAO))
+    except ValueError:
+        raise ParametroInvalido("Parâmetros 'after' e 'limit' devem ser inteiros")
+    if limite <= 0:
+        raise ParametroInvalido("Parâmetros 'after' e 'limit' devem ser positivos")
+    return min(limite, PAGINA_MAXIMA)
+
+def ler_paginacao():
+    limite = ler_limite()
+    try:
+        after = int(request.args.get('after', 0))
+    except ValueError:
+        raise ParametroInvalido("Parâmetros 'after' e 'limit' devem ser inteiros")
+    if after < 0:
+        raise ParametroInvalido("Parâmetros 'after' e 'limit' devem ser positivos")
+    return after, limite
+
+def ler_campos(permitidos):
+    campos_raw = request.args.get('fields')
+    if not campos_raw:
+        return list(permitidos)
+    campos = [c.strip() for c in campos_raw.split(',') if c.strip()]
+    invalidos = [c for c in campos if c not in permitidos]
+    if invalidos:
+        raise ParametroInvalido(f"Campos inválidos: {', '.join(invalidos)}")
+    return campos
+
+def responder_pagina(dados, ultimo_id, total_linhas, limite):
+    resposta = jsonify(dados)
+    # Página cheia: pode haver mais registros após o último id retornado
+    if total_linhas == limite:
+        resposta.headers['X-Next-After'] = str(ultimo_id)
+    return resposta
+
+def listar_pagina(modelo, permitidos):
+    after, limite = ler_paginacao()
+    campos = ler_campos(permitidos)
+    # Seleciona apenas as colunas pedidas (o id é sempre lido, pois é o cursor)
+    colunas = [getattr(modelo, c) for c in campos if c != 'id']
+    linhas = db.session.query(modelo.id, *colunas).filter(modelo.id > after).order_by(modelo.id).limit(limite).all()
+    dados = [{c: getattr(linha, c) for c in campos} for linha in linhas]
+    return responder_pagina(dados, linhas[-1].id if linhas else None, len(linhas), limite)
+
 # --- Rotas de Clientes ---
-@app.route('/api/clientes', methods=['GET'])
+@api.route('/api/clientes', methods=['GET'])
+@condicional('cliente')
 def get_clientes():
-    clientes = Cliente.query.all()
-    return jsonify([{'id': c.id, 'nome': c.nome, 'email': c.email} for c in clientes])
+    return listar_pagina(Cliente, CAMPOS_CLIENTE)
 
-@app.route('/api/clientes', methods=['POST'])
+@api.route('/api/clientes', methods=['POST'])
+@escrita
 def add_cliente():
     data = request.get_json() 
     if not data or 'nome' not in data or 'email' not in data:
@@ -211,15 +712,22 @@ def add_cliente():
 
     new_cliente = Cliente(nome=data['nome'], email=data['email'])
     db.session.add(new_cliente)
+    db.session.flush() # Gera o id para o registro de alterações
+    dados = {'id': new_cliente.id, 'nome': new_cliente.nome, 'email': new_cliente.email}
+    registrar_alteracoes('cliente', 'criado', [dados])
+    incrementar_versao('cliente')
     db.session.commit()
-    return jsonify({'id': new_cliente.id, 'nome': new_cliente.nome, 'email': new_cliente.email}), 201
+    return jsonify(dados), 201
 
-@app.route('/api/clientes/<int:cliente_id>', methods=['GET'])
+@api.route('/api/clientes/<int:cliente_id>', methods=['GET'])
 def get_cliente(cliente_id):
-    cliente = Cliente.query.get_or_404(cliente_id) 
-    return jsonify({'id': cliente.id, 'nome': cliente.nome, 'email': cliente.email})
+    cliente = obter_cliente(cliente_id)
+    if cliente is None:
+        abort(404)
+    return jsonify(cliente)
 
-@app.route('/api/clientes/<int:cliente_id>', methods=['PUT'])
+@api.route('/api/clientes/<int:cliente_id>', methods=['PUT'])
+@escrita
 def update_cliente(cliente_id):
     cliente = Cliente.query.get_or_404(cliente_id)
     data = request.get_json()
@@ -232,10 +740,13 @@ def update_cliente(cliente_id):
             return jsonify({"error": "Email já cadastrado para outro cliente"}), 409
         cliente.email = data['email']
     
+    registrar_alteracoes('cliente', 'alterado', [{'id': cliente.id, 'nome': cliente.nome, 'email': cliente.email}])
+    incrementar_versao('cliente') # Também invalida o cache de clientes (ver obter_registros)
     db.session.commit()
     return jsonify({'message': 'Cliente atualizado com sucesso!'})
 
-@app.route('/api/clientes/<int:cliente_id>', methods=['DELETE'])
+@api.route('/api/clientes/<int:cliente_id>', methods=['DELETE'])
+@escrita
 def delete_cliente(cliente_id):
     cliente = Cliente.query.get_or_404(cliente_id)
     
@@ -249,12 +760,25 @@ def delete_cliente(cliente_id):
     # if cliente.pedidos.first() is not None: 
     #     return jsonify({"error": "Não é possível deletar cliente com pedidos associados."}), 400
     
+    # Totais dos pedidos do cliente, que serão removidos em cascata
+    pedidos_cliente = db.session.query(db.func.count(Pedido.id), db.func.sum(Pedido.valor_total)).filter(Pedido.cliente_id == cliente_id).one()
+    quantidade_cliente = db.session.query(db.func.sum(ItemPedido.quantidade)).join(Pedido).filter(Pedido.cliente_id == cliente_id).scalar() or 0
+    ids_pedidos = db.session.scalars(db.select(Pedido.id).where(Pedido.cliente_id == cliente_id)).all()
+
     try:
-        db.session.delete(cliente) 
+        ajustar_vendas_diarias(Pedido.cliente_id == cliente_id, -1)
+        db.session.delete(cliente)
+        db.session.flush() # Pedidos removidos antes do ajuste (ou da reconstrução) do resumo
+        ajustar_resumo_vendas(-pedidos_cliente[0], -(pedidos_cliente[1] or 0.0), -quantidade_cliente)
+        registrar_alteracoes('pedido', 'removido', ids_pedidos)
+        registrar_alteracoes('cliente', 'removido', [cliente_id])
+        incrementar_versao('cliente', 'pedido') # Também invalida o cache de clientes (ver obter_registros)
         db.session.commit()
         return jsonify({'message': 'Cliente deletado com sucesso!'}), 200 
     except Exception as e:
         db.session.rollback()
+        if banco_ocupado(e): # Deixa o decorador @escrita repetir a transação
+            raise
         # Captura e retorna o erro, útil para depuração
         if "FOREIGN KEY constraint failed" in str(e):
             return jsonify({'error': 'Não é possível deletar cliente com pedidos associados (restrição de integridade).'}), 400
@@ -262,12 +786,13 @@ def delete_cliente(cliente_id):
 
 
 # --- Rotas de Produtos ---
-@app.route('/api/produtos', methods=['GET'])
+@api.route('/api/produtos', methods=['GET'])
+@condicional('produto')
 def get_produtos():
-    produtos = Produto.query.all()
-    return jsonify([{'id': p.id, 'nome': p.nome, 'preco': p.preco} for p in produtos])
+    return listar_pagina(Produto, CAMPOS_PRODUTO)
 
-@app.route('/api/produtos', methods=['POST'])
+@api.route('/api/produtos', methods=['POST'])
+@escrita
 def add_produto():
     data = request.get_json()
     if not data or 'nome' not in data: # 'preco' pode ser None, então não verificamos se 'preco' está em data aqui.
@@ -289,15 +814,22 @@ def add_produto():
 
     new_produto = Produto(nome=data['nome'], preco=preco)
     db.session.add(new_produto)
+    db.session.flush() # Gera o id para o registro de alterações
+    dados = {'id': new_produto.id, 'nome': new_produto.nome, 'preco': new_produto.preco}
+    registrar_alteracoes('produto', 'criado', [dados])
+    incrementar_versao('produto')
     db.session.commit()
-    return jsonify({'id': new_produto.id, 'nome': new_produto.nome, 'preco': new_produto.preco}), 201
+    return jsonify(dados), 201
 
-@app.route('/api/produtos/<int:produto_id>', methods=['GET'])
+@api.route('/api/produtos/<int:produto_id>', methods=['GET'])
 def get_produto(produto_id):
-    produto = Produto.query.get_or_404(produto_id)
-    return jsonify({'id': produto.id, 'nome': produto.nome, 'preco': produto.preco})
+    produto = obter_produto(produto_id)
+    if produto is None:
+        abort(404)
+    return jsonify(produto)
 
-@app.route('/api/produtos/<int:produto_id>', methods=['PUT'])
+@api.route('/api/produtos/<int:produto_id>', methods=['PUT'])
+@escrita
 def update_produto(produto_id):
     produto = Produto.query.get_or_404(produto_id)
     data = request.get_json()
@@ -317,10 +849,13 @@ def update_produto(produto_id):
         except (ValueError, TypeError):
             return jsonify({"error": "Preço deve ser um número válido"}), 400
     
+    registrar_alteracoes('produto', 'alterado', [{'id': produto.id, 'nome': produto.nome, 'preco': produto.preco}])
+    incrementar_versao('produto') # Também invalida o cache de produtos (ver obter_registros)
     db.session.commit()
     return jsonify({'message': 'Produto atualizado com sucesso!'})
 
-@app.route('/api/produtos/<int:produto_id>', methods=['DELETE'])
+@api.route('/api/produtos/<int:produto_id>', methods=['DELETE'])
+@escrita
 def delete_produto(produto_id):
     produto = Produto.query.get_or_404(produto_id)
     # Verifica se há itens de pedido associados a este produto antes de deletar
@@ -328,80 +863,386 @@ def delete_produto(produto_id):
         return jsonify({"error": "Não é possível deletar produto com pedidos associados."}), 400
     
     db.session.delete(produto)
+    registrar_alteracoes('produto', 'removido', [produto_id])
+    incrementar_versao('produto') # Também invalida o cache de produtos (ver obter_registros)
     db.session.commit()
     return jsonify({'message': 'Produto deletado com sucesso!'}), 204
 
+# --- Busca de clientes e produtos (type-ahead) ---
+# GET /api/clientes/search?q=<texto>&limit=<n> e GET /api/produtos/search?q=<texto>&limit=<n>
+# No SQLite, usa os índices FTS5 da migração 4 (mantidos por triggers, ver migracoes.py):
+# 1. Prefixo: cada palavra digitada vale como prefixo ("mar sil" encontra "Maria Silva"), sem
+#    diferenciar acentos e maiúsculas. Nomes que começam pelo texto digitado vêm primeiro; o
+#    restante segue o bm25 (o nome pesa mais que o e-mail).
+# 2. Aproximada: se o prefixo não preencher o limite, completa com a busca por trigramas, que
+#    tolera erros de digitação ("notbok" encontra "Notebook"), ordenada pelos trigramas em comum.
+# Em outros bancos, ou num SQLite sem FTS5/trigram (a migração 4 não cria os índices), faz só
+# a busca por prefixo com LIKE/ILIKE.
+BUSCA_PADRAO = 10
+BUSCA_MAXIMA = 50
+PALAVRAS_BUSCA_MAXIMAS = 8
+TRIGRAMAS_BUSCA_MAXIMOS = 32
+
+def ler_busca(args):
+    texto = (args.get('q') or '').strip()
+    if not texto:
+        raise ParametroInvalido("Parâmetro 'q' é obrigatório")
+    limite = ler_numero(args, 'limit', int)
+    if limite is None:
+        limite = BUSCA_PADRAO
+    elif limite <= 0:
+        raise ParametroInvalido("Parâmetro 'limit' deve ser positivo")
+    return texto, min(limite, BUSCA_MAXIMA)
+
+def expressao_prefixo(texto):
+    # Expressão MATCH do FTS5: cada palavra entre aspas (nada da sintaxe do FTS5 vem do usuário)
+    return ' AND '.join(f'"{palavra}"*' for palavra in re.findall(r'\w+', texto)[:PALAVRAS_BUSCA_MAXIMAS])
+
+def expressao_trigramas(texto):
+    # Trigramas de cada palavra (sem atravessar espaços, que casariam com qualquer nome composto)
+    palavras = re.findall(r'\w+', texto.lower())[:PALAVRAS_BUSCA_MAXIMAS]
+    trigramas = list(dict.fromkeys(palavra[i:i + 3] for palavra in palavras for i in range(len(palavra) - 2)))
+    trigramas = trigramas[:TRIGRAMAS_BUSCA_MAXIMOS]
+    return ' OR '.join(f'"{trigrama}"' for trigrama in trigramas)
+
+def consultar_indice_busca(tabela, campos, indice, expressao, ordem, limite, **parametros):
+    colunas = ', '.join(f'{tabela}.{campo}' for campo in campos)
+    return db.session.execute(db.text(
+        f"SELECT {colunas} FROM {indice} JOIN {tabela} ON {tabela}.id = {indice}.rowid "
+        f"WHERE {indice} MATCH :expressao ORDER BY {ordem} LIMIT :limite"
+    ), dict(parametros, expressao=expressao, limite=limite)).all()
+
+def indice_busca_existe(tabela):
+    if db.engine.dialect.name != 'sqlite':
+        return False
+    return db.session.execute(db.text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :nome"),
+                              {'nome': f'busca_{tabela}'}).first() is not None
+
+def buscar_registros(modelo, campos):
+    texto, limite = ler_busca(request.args)
+    tabela = modelo.__tablename__
+    colunas_busca = INDICES_BUSCA[tabela]
+    inicio = texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+    if not indice_busca_existe(tabela):
+        linhas = db.session.query(*(getattr(modelo, campo) for campo in campos)).filter(
+            db.or_(*(getattr(modelo, coluna).ilike(inicio, escape='\\') for coluna in colunas_busca))
+        ).order_by(modelo.nome, modelo.id).limit(limite).all()
+        return jsonify([dict(zip(campos, linha)) for linha in linhas])
+
+    linhas = []
+    prefixo = expressao_prefixo(texto)
+    if prefixo:
+        pesos = ', '.join('10.0' if i == 0 else '1.0' for i in range(len(colunas_busca)))
+        linhas = consultar_indice_busca(
+            tabela, campos, f'busca_{tabela}', prefixo,
+            f"({tabela}.nome LIKE :inicio ESCAPE '\\') DESC, bm25(busca_{tabela}, {pesos}), {tabela}.nome",
+            limite, inicio=inicio)
+    trigramas = expressao_trigramas(texto)
+    if len(linhas) < limite and trigramas:
+        encontrados = {linha.id for linha in linhas}
+        aproximadas = consultar_indice_busca(tabela, campos, f'busca_{tabela}_trigrama', trigramas,
+                                             f"bm25(busca_{tabela}_trigrama), {tabela}.nome", limite + len(encontrados))
+        linhas += [linha for linha in aproximadas if linha.id not in encontrados][:limite - len(linhas)]
+    return jsonify([dict(zip(campos, linha)) for linha in linhas])
+
+@api.route('/api/clientes/search', methods=['GET'])
+@condicional('cliente')
+def search_clientes():
+    return buscar_registros(Cliente, CAMPOS_CLIENTE)
+
+@api.route('/api/produtos/search', methods=['GET'])
+@condicional('produto')
+def search_produtos():
+    return buscar_registros(Produto, CAMPOS_PRODUTO)
+
 # --- Rotas de Pedidos ---
-@app.route('/api/pedidos', methods=['GET'])
+
+# Caminho de leitura de pedidos com número FIXO de consultas (evita o problema N+1):
+# 1 consulta para os pedidos (com o nome do cliente via JOIN) e, se pedido,
+# 1 consulta para os itens (com o nome do produto via JOIN) de todos os pedidos filtrados.
+# Os critérios são reaplicados numa subconsulta, então o IN não cresce com o número de pedidos.
+def selecao_pedidos(criterios, ordem, limite=None):
+    return db.select(
+        Pedido.id,
+        Pedido.cliente_id,
+        Pedido.data_pedido,
+        Pedido.status,
+        Pedido.valor_total,
+        Cliente.nome.label('cliente_nome')
+    ).outerjoin(Cliente, Cliente.id == Pedido.cliente_id).where(*criterios).order_by(*ordem).limit(limite)
+
+def consultar_pedidos(*criterios, com_itens=True, limite=None, ordem=None):
+    ordem = ordem if ordem is not None else [Pedido.id]
+    pedidos = db.session.execute(selecao_pedidos(criterios, ordem, limite)).all()
+
+    itens_por_pedido = {}
+    if com_itens and pedidos:
+        ids_pedidos = db.session.query(Pedido.id).filter(*criterios).order_by(*ordem).limit(limite)
+        itens = db.session.query(
+            ItemPedido.id,
+            ItemPedido.pedido_id,
+            ItemPedido.produto_id,
+            ItemPedido.quantidade,
+            ItemPedido.preco_unitario,
+            Produto.nome.label('produto_nome')
+        ).outerjoin(Produto, Produto.id == ItemPedido.produto_id).filter(
+            ItemPedido.pedido_id.in_(ids_pedidos.subquery().select())
+        ).order_by(ItemPedido.id).all()
+        for item in itens:
+            itens_por_pedido.setdefault(item.pedido_id, []).append(item)
+
+    return pedidos, itens_por_pedido
+
+def serializar_pedido(p, itens):
+    return pedido_resposta(p, itens) # Formato único da resposta de pedido (ver esquemas.py)
+
+# --- Filtros e ordenação de pedidos ---
+# Parâmetros aceitos por GET /api/pedidos (e pelos relatórios/exportação que reusam o construtor):
+# status (um ou vários, separados por vírgula), cliente_id, produto_id, data_de/data_ate
+# (data ou data-hora ISO 8601; data_ate só com a data inclui o dia inteiro), valor_min/valor_max
+# e sort=campo ou sort=-campo (id, data_pedido, valor_total).
+# Tudo vira WHERE/ORDER BY no SQL, atendido pelos índices de pedido e item_pedido.
+ORDENACOES_PEDIDO = {'id': Pedido.id, 'data_pedido': Pedido.data_pedido, 'valor_total': Pedido.valor_total}
+
+def ler_numero(args, nome, tipo):
+    valor = args.get(nome)
+    if valor is None or valor == '':
+        return None
+    try:
+        return tipo(valor)
+    except ValueError:
+        raise ParametroInvalido(f"Parâmetro '{nome}' inválido")
+
+def ler_data(args, nome):
+    valor = args.get(nome)
+    if not valor:
+        return None, False
+    try:
+        return datetime.fromisoformat(valor), len(valor) == 10 # (data, veio só a data?)
+    except ValueError:
+        raise ParametroInvalido(f"Parâmetro '{nome}' deve ser uma data ISO 8601 (AAAA-MM-DD)")
+
+def coluna_data_pedido(valor):
+    # No SQLite, DATETIME é texto e comparamos como texto (o SQL gerado é o mesmo e usa o índice).
+    # O CURRENT_TIMESTAMP grava 'AAAA-MM-DD HH:MM:SS', mas bancos carregados antes de
+    # FORMATO_DATA_SQLITE podem ter 'AAAA-MM-DD HH:MM:SS.000000' para o mesmo instante. Retorna
+    # (coluna, curto, longo): 'curto' <= qualquer das duas formas do instante <= 'longo', então
+    # limites inferiores (>=, <) usam 'curto' e superiores (<=, >) usam 'longo'.
+    if db.engine.dialect.name != 'sqlite':
+        return Pedido.data_pedido, valor, valor
+    if valor.microsecond:
+        texto = valor.strftime(FORMATO_DATA_SQLITE + '.%f')
+        return db.type_coerce(Pedido.data_pedido, db.String), texto, texto
+    texto = valor.strftime(FORMATO_DATA_SQLITE)
+    return db.type_coerce(Pedido.data_pedido, db.String), texto, texto + '.000000'
+
+def filtros_pedidos(args):
+    criterios = []
+    if args.get('status'):
+        criterios.append(Pedido.status.in_([s.strip() for s in args['status'].split(',')]))
+    cliente_id = ler_numero(args, 'cliente_id', int)
+    if cliente_id is not None:
+        criterios.append(Pedido.cliente_id == cliente_id)
+    produto_id = ler_numero(args, 'produto_id', int)
+    if produto_id is not None:
+        # Subconsulta no índice de item_pedido.produto_id, sem JOIN (que duplicaria os pedidos)
+        criterios.append(Pedido.id.in_(db.select(ItemPedido.pedido_id).where(ItemPedido.produto_id == produto_id)))
+    data_de, _ = ler_data(args, 'data_de')
+    if data_de is not None:
+        coluna, curto, _ = coluna_data_pedido(data_de)
+        criterios.append(coluna >= curto)
+    data_ate, somente_data = ler_data(args, 'data_ate')
+    if data_ate is not None:
+        if somente_data: # Inclui o dia inteiro
+            coluna, curto, _ = coluna_data_pedido(data_ate + timedelta(days=1))
+            criterios.append(coluna < curto)
+        else:
+            coluna, _, longo = coluna_data_pedido(data_ate)
+            criterios.append(coluna <= longo)
+    valor_min = ler_numero(args, 'valor_min', float)
+    if valor_min is not None:
+        criterios.append(Pedido.valor_total >= valor_min)
+    valor_max = ler_numero(args, 'valor_max', float)
+    if valor_max is not None:
+        criterios.append(Pedido.valor_total <= valor_max)
+    return criterios
+
+def ordenacao_pedidos(args):
+    sort = args.get('sort', 'id')
+    campo = sort.lstrip('-')
+    if campo not in ORDENACOES_PEDIDO:
+        raise ParametroInvalido(f"Ordenação inválida. Use: {', '.join(ORDENACOES_PEDIDO)} (com '-' para decrescente)")
+    return campo, sort.startswith('-')
+
+def paginar_pedidos(args, campo, decrescente):
+    # Cláusulas ORDER BY e critério do cursor (keyset) para a ordenação pedida.
+    # Ordenando por id, o cursor é o próprio id (compatível com a paginação original);
+    # nas demais ordenações, o cursor é '<valor>~<id>' (o id desempata valores iguais).
+    coluna = ORDENACOES_PEDIDO[campo]
+    if campo == 'id':
+        ordem = [Pedido.id.desc() if decrescente else Pedido.id]
+    else:
+        ordem = [coluna.desc(), Pedido.id.desc()] if decrescente else [coluna, Pedido.id]
+
+    cursor = args.get('after')
+    if not cursor or cursor == '0':
+        return ordem, []
+    try:
+        if campo == 'id':
+            return ordem, [Pedido.id < int(cursor) if decrescente else Pedido.id > int(cursor)]
+        valor_raw, id_raw = cursor.rsplit('~', 1)
+        cursor_id = int(id_raw)
+        if campo == 'data_pedido':
+            # Sem comparar tuplas: o mesmo instante pode estar gravado em duas formas (ver coluna_data_pedido)
+            coluna, curto, longo = coluna_data_pedido(datetime.fromisoformat(valor_raw))
+            if decrescente:
+                return ordem, [coluna <= longo, db.or_(coluna < curto, Pedido.id < cursor_id)]
+            return ordem, [coluna >= curto, db.or_(coluna > longo, Pedido.id > cursor_id)]
+        chave, cursor_chave = db.tuple_(coluna, Pedido.id), db.tuple_(float(valor_raw), cursor_id)
+        return ordem, [chave < cursor_chave if decrescente else chave > cursor_chave]
+    except ValueError:
+        raise ParametroInvalido("Parâmetro 'after' inválido para esta ordenação")
+
+def cursor_pedido(p, campo):
+    if campo == 'id':
+        return p.id
+    valor = p.data_pedido.isoformat() if campo == 'data_pedido' else repr(p.valor_total)
+    return f"{valor}~{p.id}"
+
+@api.route('/api/pedidos', methods=['GET'])
+@condicional('pedido', 'cliente', 'produto')
 def get_pedidos():
-    pedidos = Pedido.query.all()
-    pedidos_data = []
+    limite = ler_limite()
+    campos = ler_campos(CAMPOS_PEDIDO)
+    campo, decrescente = ordenacao_pedidos(request.args)
+    ordem, criterio_cursor = paginar_pedidos(request.args, campo, decrescente)
+    # Sem 'itens' na projeção, a consulta dos itens nem é executada
+    pedidos, itens_por_pedido = consultar_pedidos(*filtros_pedidos(request.args), *criterio_cursor,
+                                                  com_itens='itens' in campos, limite=limite, ordem=ordem)
+    dados = [projetar(serializar_pedido(p, itens_por_pedido.get(p.id, [])), campos) for p in pedidos]
+    return responder_pagina(dados, cursor_pedido(pedidos[-1], campo) if pedidos else None, len(pedidos), limite)
+
+# --- Exportação em streaming (NDJSON/CSV) ---
+# Para consumidores em lote (ETL): os pedidos são lidos em lotes (yield_per) e cada pedido
+# é enviado assim que serializado, sem montar o payload inteiro em memória.
+LOTE_EXPORTACAO = 1000
+
+CABECALHO_CSV = ['pedido_id', 'cliente_id', 'cliente_nome', 'data_pedido', 'status', 'valor_total',
+                 'item_id', 'produto_id', 'produto_nome', 'quantidade', 'preco_unitario']
+
+def iterar_pedidos(*criterios, lote=LOTE_EXPORTACAO):
+    # Dois cursores ordenados por pedido (pedidos e itens), percorridos em paralelo como um merge join
+    pedidos = db.session.query(
+        Pedido.id,
+        Pedido.cliente_id,
+        Pedido.data_pedido,
+        Pedido.status,
+        Pedido.valor_total,
+        Cliente.nome.label('cliente_nome')
+    ).outerjoin(Cliente, Cliente.id == Pedido.cliente_id).filter(*criterios).order_by(Pedido.id).yield_per(lote)
+
+    ids_pedidos = db.session.query(Pedido.id).filter(*criterios)
+    itens = iter(db.session.query(
+        ItemPedido.id,
+        ItemPedido.pedido_id,
+        ItemPedido.produto_id,
+        ItemPedido.quantidade,
+        ItemPedido.preco_unitario,
+        Produto.nome.label('produto_nome')
+    ).outerjoin(Produto, Produto.id == ItemPedido.produto_id).filter(
+        ItemPedido.pedido_id.in_(ids_pedidos.subquery().select())
+    ).order_by(ItemPedido.pedido_id, ItemPedido.id).yield_per(lote))
+
+    item = next(itens, None)
     for p in pedidos:
-        cliente = Cliente.query.get(p.cliente_id) # Busca o cliente relacionado
-        itens = []
-        # .all() é necessário com lazy='dynamic' para iterar sobre a coleção
-        for item in p.itens.all(): 
-            produto = Produto.query.get(item.produto_id) # Busca o produto de cada item
-            itens.append({
-                'id': item.id,
-                'produto_id': item.produto_id,
-                'produto_nome': produto.nome if produto else "Produto Desconhecido",
-                'quantidade': item.quantidade,
-                'preco_unitario': item.preco_unitario
-            })
-        pedidos_data.append({
-            'id': p.id,
-            'cliente_id': p.cliente_id,
-            'cliente_nome': cliente.nome if cliente else "Cliente Desconhecido",
-            'data_pedido': p.data_pedido.isoformat(), # Formata a data para ISO 8601
-            'status': p.status,
-            'valor_total': round(p.valor_total, 2), # Arredonda para 2 casas decimais
-            'itens': itens
-        })
-    return jsonify(pedidos_data)
-
-@app.route('/api/pedidos', methods=['POST'])
+        itens_pedido = []
+        while item is not None and item.pedido_id <= p.id:
+            if item.pedido_id == p.id:
+                itens_pedido.append(item)
+            item = next(itens, None)
+        yield p, itens_pedido
+
+def exportar_ndjson(pedidos):
+    for p, itens in pedidos:
+        yield current_app.json.dumps(serializar_pedido(p, itens)) + '\n'
+
+def exportar_csv(pedidos):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CABECALHO_CSV)
+    for p, itens in pedidos:
+        pedido = serializar_pedido(p, itens)
+        colunas_pedido = [pedido['id'], pedido['cliente_id'], pedido['cliente_nome'], pedido['data_pedido'],
+                          pedido['status'], pedido['valor_total']]
+        # Uma linha por item; pedidos sem itens geram uma linha com as colunas do item vazias
+        for item in pedido['itens'] or [None]:
+            if item is None:
+                writer.writerow(colunas_pedido + [''] * 5)
+            else:
+                writer.writerow(colunas_pedido + [item['id'], item['produto_id'], item['produto_nome'],
+                                                  item['quantidade'], item['preco_unitario']])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+@api.route('/api/pedidos/export', methods=['GET'])
+def exportar_pedidos():
+    formato = request.args.get('format', 'ndjson')
+    try:
+        after = int(request.args.get('after', 0)) # Permite retomar uma exportação interrompida
+    except ValueError:
+        raise ParametroInvalido("Parâmetro 'after' deve ser inteiro")
+
+    pedidos = iterar_pedidos(Pedido.id > after, *filtros_pedidos(request.args)) # Aceita os mesmos filtros de GET /api/pedidos
+    if formato == 'ndjson':
+        return Response(stream_with_context(exportar_ndjson(pedidos)), mimetype='application/x-ndjson')
+    if formato == 'csv':
+        return Response(stream_with_context(exportar_csv(pedidos)), mimetype='text/csv',
+                        headers={'Content-Disposition': 'attachment; filename=pedidos.csv'})
+    raise ParametroInvalido("Formato inválido. Use 'ndjson' ou 'csv'")
+
+@api.route('/api/pedidos', methods=['POST'])
+@escrita
 def add_pedido():
     data = request.get_json()
-    cliente_id = data.get('cliente_id')
+    erro = validar_pedido(data) # Mesmas regras (e mensagens) do PUT e da importação em lote
+    if erro:
+        return jsonify({"error": erro}), 400
+    cliente_id = data['cliente_id']
     status = data.get('status', 'Em andamento')
-    itens_data = data.get('itens', []) # Espera uma lista de itens: [{'produto_id': X, 'quantidade': Y}]
-
-    if not cliente_id or not itens_data:
-        return jsonify({"error": "ID do cliente e itens do pedido são obrigatórios"}), 400
+    itens_data = data['itens'] # Lista de itens: [{'produto_id': X, 'quantidade': Y}]
 
-    cliente = Cliente.query.get(cliente_id)
-    if not cliente:
+    if obter_cliente(cliente_id) is None:
         return jsonify({"error": "Cliente não encontrado"}), 404
+    # Valida os itens e lê os preços atuais com uma consulta IN, antes de qualquer escrita
+    precos, erro = precos_itens_pedido(itens_data)
+    if erro:
+        return jsonify({"error": erro[0]}), erro[1]
 
     new_pedido = Pedido(cliente_id=cliente_id, status=status)
     db.session.add(new_pedido)
     db.session.flush() # Importante: garante que new_pedido.id esteja disponível para os itens
 
     total_pedido = 0
+    quantidade_total = 0
     for item_data in itens_data:
-        produto_id = item_data.get('produto_id')
-        quantidade = item_data.get('quantidade')
-
-        if not produto_id or not quantidade or not isinstance(quantidade, int) or quantidade <= 0:
-            db.session.rollback()
-            return jsonify({"error": "Cada item do pedido deve ter produto_id e quantidade (inteiro > 0)"}), 400
-
-        produto = Produto.query.get(produto_id)
-        if not produto:
-            db.session.rollback()
-            return jsonify({"error": f"Produto com ID {produto_id} não encontrado"}), 404
-        
+        produto_id = item_data['produto_id']
+        quantidade = item_data['quantidade']
         item_pedido = ItemPedido(
             pedido_id=new_pedido.id,
             produto_id=produto_id,
             quantidade=quantidade,
-            preco_unitario=produto.preco # Pega o preço atual do produto
+            preco_unitario=precos[produto_id] # Pega o preço atual do produto
         )
         db.session.add(item_pedido)
-        total_pedido += quantidade * produto.preco
+        total_pedido += quantidade * precos[produto_id]
+        quantidade_total += quantidade
 
     new_pedido.valor_total = total_pedido # Atualiza o valor total do pedido
+    ajustar_resumo_vendas(1, total_pedido, quantidade_total)
+    ajustar_vendas_diarias(Pedido.id == new_pedido.id)
+    registrar_pedidos('criado', [new_pedido.id])
+    incrementar_versao('pedido')
     db.session.commit() # Salva tudo no banco
     
     return jsonify({
@@ -411,134 +1252,630 @@ def add_pedido():
         'status': new_pedido.status 
     }), 201
 
-@app.route('/api/pedidos/<int:pedido_id>', methods=['GET'])
-def get_pedido(pedido_id):
-    pedido = Pedido.query.get_or_404(pedido_id)
-    cliente = Cliente.query.get(pedido.cliente_id)
-    itens = []
-    for item in pedido.itens.all(): # .all() é necessário com lazy='dynamic' para iterar sobre a coleção
-        produto = Produto.query.get(item.produto_id)
-        itens.append({
-            'id': item.id,
-            'produto_id': item.produto_id,
-            'produto_nome': produto.nome if produto else "Produto Desconhecido",
-            'quantidade': item.quantidade,
-            'preco_unitario': item.preco_unitario
-        })
+# --- Importação de pedidos em lote ---
+# POST /api/pedidos/bulk?mode=atomic|partial&batch_size=N
+# Corpo: lista de pedidos (mesmo formato do POST /api/pedidos) ou {"pedidos": [...]}.
+# Clientes e produtos são resolvidos com poucas consultas IN (em lotes de batch_size),
+# os itens são inseridos com executemany e tudo é gravado numa única transação.
+# mode=atomic (padrão): qualquer pedido inválido cancela a importação inteira.
+# mode=partial: os pedidos válidos são gravados e os inválidos são reportados.
+LOTE_BULK_PADRAO = 500
+LOTE_BULK_MAXIMO = 5000 # Teto escolhido para o tamanho dos lotes (memória e duração de cada INSERT), não derivado do banco
+
+def buscar_por_ids(modelo, ids, lote, *colunas):
+    # Resolve vários ids com consultas IN de até 'lote' parâmetros. O LOTE_BULK_MAXIMO cabe no
+    # limite de parâmetros do SQLite 3.32+ (32766) e do PostgreSQL (65535); SQLite mais antigo
+    # (limite 999) precisa de batch_size <= 999.
+    ids = list(ids)
+    encontrados = {}
+    for inicio in range(0, len(ids), lote):
+        linhas = db.session.query(modelo.id, *colunas).filter(modelo.id.in_(ids[inicio:inicio + lote])).all()
+        encontrados.update((linha.id, linha) for linha in linhas)
+    return encontrados
+
+def inserir_pedidos_em_lote(linhas):
+    # Insere vários pedidos e retorna os ids gerados, na mesma ordem das linhas
+    if db.engine.dialect.name == 'sqlite':
+        # O SQLite não garante a ordem do RETURNING em INSERTs de várias linhas, então o ORM
+        # cairia para um INSERT por pedido. Em vez disso: um executemany e, ainda sob o lock
+        # de escrita desta transação, os N maiores ids são exatamente os recém-gerados.
+        db.session.execute(db.insert(Pedido), linhas)
+        ids = db.session.query(Pedido.id).order_by(Pedido.id.desc()).limit(len(linhas)).all()
+        return [linha.id for linha in reversed(ids)]
+    return db.session.scalars(db.insert(Pedido).returning(Pedido.id, sort_by_parameter_order=True), linhas).all()
+
+@api.route('/api/pedidos/bulk', methods=['POST'])
+@escrita
+def add_pedidos_bulk():
+    data = request.get_json()
+    pedidos_data = data.get('pedidos') if isinstance(data, dict) else data
+    if not isinstance(pedidos_data, list) or not pedidos_data:
+        return jsonify({"error": "Envie uma lista de pedidos"}), 400
+
+    modo = request.args.get('mode', 'atomic')
+    if modo not in ('atomic', 'partial'):
+        raise ParametroInvalido("Modo inválido. Use 'atomic' ou 'partial'")
+    try:
+        lote = int(request.args.get('batch_size', LOTE_BULK_PADRAO))
+    except ValueError:
+        raise ParametroInvalido("Parâmetro 'batch_size' deve ser inteiro")
+    if lote <= 0:
+        raise ParametroInvalido("Parâmetro 'batch_size' deve ser positivo")
+    lote = min(lote, LOTE_BULK_MAXIMO)
+
+    # 1. Validação estrutural de cada pedido
+    erros = {}
+    for indice, dados in enumerate(pedidos_data):
+        erro = validar_pedido(dados)
+        if erro:
+            erros[indice] = erro
+
+    # 2. Resolve todos os clientes e produtos referenciados com consultas IN
+    validos = [i for i in range(len(pedidos_data)) if i not in erros]
+    clientes = obter_registros(Cliente, (pedidos_data[i]['cliente_id'] for i in validos), lote)
+    produtos = obter_registros(Produto, (item['produto_id'] for i in validos for item in pedidos_data[i]['itens']), lote)
+    for indice in validos:
+        dados = pedidos_data[indice]
+        if dados['cliente_id'] not in clientes:
+            erros[indice] = "Cliente não encontrado"
+            continue
+        for item_data in dados['itens']:
+            if item_data['produto_id'] not in produtos:
+                erros[indice] = f"Produto com ID {item_data['produto_id']} não encontrado"
+                break
+
+    if erros and modo == 'atomic':
+        return jsonify({
+            "error": "Nenhum pedido foi importado: há pedidos inválidos",
+            "resultados": [{'indice': i, 'error': erro} for i, erro in sorted(erros.items())]
+        }), 400
+
+    # 3. Inserção em lotes dentro de uma única transação
+    resultados = {}
+    total_valor = 0.0
+    total_quantidade = 0
+    aceitos = [i for i in range(len(pedidos_data)) if i not in erros]
+    for inicio in range(0, len(aceitos), lote):
+        indices = aceitos[inicio:inicio + lote]
+        pedidos_rows = []
+        for indice in indices:
+            dados = pedidos_data[indice]
+            pedidos_rows.append({
+                'cliente_id': dados['cliente_id'],
+                'status': dados.get('status', 'Em andamento'),
+                'valor_total': sum(item['quantidade'] * produtos[item['produto_id']]['preco'] for item in dados['itens'])
+            })
+        ids_pedidos = inserir_pedidos_em_lote(pedidos_rows)
+
+        itens_rows = []
+        for indice, pedido_id, pedido in zip(indices, ids_pedidos, pedidos_rows):
+            for item_data in pedidos_data[indice]['itens']:
+                itens_rows.append({
+                    'pedido_id': pedido_id,
+                    'produto_id': item_data['produto_id'],
+                    'quantidade': item_data['quantidade'],
+                    'preco_unitario': produtos[item_data['produto_id']]['preco'] # Preço atual do produto
+                })
+                total_quantidade += item_data['quantidade']
+            total_valor += pedido['valor_total']
+            resultados[indice] = {'indice': indice, 'id': pedido_id, 'valor_total': round(pedido['valor_total'], 2), 'status': pedido['status']}
+        db.session.execute(db.insert(ItemPedido), itens_rows) # executemany
+        ajustar_vendas_diarias(Pedido.id.in_(ids_pedidos))
+        registrar_pedidos('criado', ids_pedidos)
+
+    ajustar_resumo_vendas(len(aceitos), total_valor, total_quantidade)
+    incrementar_versao('pedido')
+    db.session.commit()
+
+    resultados.update((i, {'indice': i, 'error': erro}) for i, erro in erros.items())
+    status_code = 207 if erros else 201 # 207: importação parcial, com pedidos rejeitados
     return jsonify({
-        'id': pedido.id,
-        'cliente_id': pedido.cliente_id,
-        'cliente_nome': cliente.nome if cliente else "Cliente Desconhecido",
-        'data_pedido': pedido.data_pedido.isoformat(),
-        'status': pedido.status,
-        'valor_total': round(pedido.valor_total, 2),
-        'itens': itens
-    })
+        'importados': len(aceitos),
+        'rejeitados': len(erros),
+        'resultados': [resultados[i] for i in range(len(pedidos_data))]
+    }), status_code
+
+@api.route('/api/pedidos/<int:pedido_id>', methods=['GET'])
+def get_pedido(pedido_id):
+    pedidos, itens_por_pedido = consultar_pedidos(Pedido.id == pedido_id)
+    if not pedidos:
+        abort(404)
+    return jsonify(serializar_pedido(pedidos[0], itens_por_pedido.get(pedido_id, [])))
+
+# --- Atualização dos itens de um pedido por diferença ---
+# Em vez de apagar e recriar todas as linhas, compara os itens gravados com a lista nova e grava
+# só o que mudou: um DELETE em lote das linhas removidas, um UPDATE (executemany) das quantidades
+# alteradas e um INSERT em lote das linhas novas. Os produtos são resolvidos com uma consulta IN
+# e o valor_total é recalculado pelo próprio banco. Linhas mantidas conservam o preco_unitario
+# gravado (preço do momento do pedido); só as linhas novas usam o preço atual do produto.
+ERRO_PEDIDO = "ID do cliente e itens do pedido são obrigatórios"
+ERRO_ITENS_PEDIDO = "Os itens do pedido devem ser uma lista"
+ERRO_ITEM_PEDIDO = "Cada item do pedido deve ter produto_id e quantidade (inteiro > 0)"
+ERRO_CLIENTE_PEDIDO = "ID do cliente deve ser inteiro"
+ERRO_STATUS_PEDIDO = "Status do pedido deve ser um texto de 1 a 50 caracteres"
+
+def inteiro(valor):
+    # bool é subclasse de int: True/False não valem como id nem como quantidade
+    return isinstance(valor, int) and not isinstance(valor, bool)
+
+def validar_itens_pedido(itens_data, quantidade_minima=1):
+    # Estrutura da lista de itens; retorna a mensagem de erro ou None
+    if not isinstance(itens_data, list):
+        return ERRO_ITENS_PEDIDO
+    for item_data in itens_data:
+        if not isinstance(item_data, dict):
+            return ERRO_ITEM_PEDIDO
+        quantidade = item_data.get('quantidade')
+        if not inteiro(item_data.get('produto_id')) or not inteiro(quantidade) or quantidade < quantidade_minima:
+            return ERRO_ITEM_PEDIDO
+    return None
+
+def validar_pedido(dados, parcial=False):
+    # Estrutura de um pedido (POST, importação em lote e, com parcial=True, PUT, em que cada
+    # campo é opcional); retorna a mensagem de erro ou None. Existência de clientes e produtos
+    # fica para quem chama, que a resolve com as próprias consultas.
+    if not isinstance(dados, dict):
+        return ERRO_PEDIDO
+    if not parcial and (dados.get('cliente_id') is None or not dados.get('itens')):
+        return ERRO_PEDIDO
+    if 'cliente_id' in dados and not inteiro(dados['cliente_id']):
+        return ERRO_CLIENTE_PEDIDO
+    status = dados.get('status', 'Em andamento')
+    if not isinstance(status, str) or not 0 < len(status.strip()) <= 50:
+        return ERRO_STATUS_PEDIDO
+    if 'itens' in dados:
+        return validar_itens_pedido(dados['itens'])
+    return None
+
+def precos_itens_pedido(itens_data, quantidade_minima=1):
+    # Valida a lista de itens e retorna (preços por produto_id, None) ou (None, (mensagem, status))
+    erro = validar_itens_pedido(itens_data, quantidade_minima)
+    if erro:
+        return None, (erro, 400)
+    produtos = obter_registros(Produto, (item['produto_id'] for item in itens_data))
+    for item_data in itens_data:
+        if item_data['produto_id'] not in produtos:
+            return None, (f"Produto com ID {item_data['produto_id']} não encontrado", 404)
+    return {produto_id: dados['preco'] for produto_id, dados in produtos.items()}, None
+
+def itens_atuais_pedido(pedido_id):
+    return db.session.query(ItemPedido.id, ItemPedido.produto_id, ItemPedido.quantidade).filter(
+        ItemPedido.pedido_id == pedido_id).order_by(ItemPedido.id).all()
+
+def substituir_itens_pedido(pedido, novos, precos, atuais=None):
+    # novos: lista de (produto_id, quantidade). Cada linha nova reaproveita, na ordem, uma linha
+    # gravada do mesmo produto; as que sobram são removidas. Ajusta o resumo de vendas; não faz commit.
+    if atuais is None:
+        atuais = itens_atuais_pedido(pedido.id)
+    linhas_por_produto = {}
+    for linha in atuais:
+        linhas_por_produto.setdefault(linha.produto_id, []).append(linha)
 
-@app.route('/api/pedidos/<int:pedido_id>', methods=['PUT'])
+    alterar, inserir = [], []
+    diferenca_quantidade = 0
+    for produto_id, quantidade in novos:
+        linhas = linhas_por_produto.get(produto_id)
+        if linhas:
+            linha = linhas.pop(0)
+            if linha.quantidade != quantidade:
+                alterar.append({'id': linha.id, 'quantidade': quantidade})
+            diferenca_quantidade += quantidade - linha.quantidade
+        else:
+            inserir.append({'pedido_id': pedido.id, 'produto_id': produto_id, 'quantidade': quantidade,
+                            'preco_unitario': precos[produto_id]}) # Preço atual do produto
+            diferenca_quantidade += quantidade
+    remover = [linha.id for linhas in linhas_por_produto.values() for linha in linhas]
+    diferenca_quantidade -= sum(linha.quantidade for linhas in linhas_por_produto.values() for linha in linhas)
+    if not (remover or alterar or inserir):
+        return
+
+    for inicio in range(0, len(remover), LOTE_BULK_PADRAO):
+        db.session.query(ItemPedido).filter(ItemPedido.id.in_(remover[inicio:inicio + LOTE_BULK_PADRAO])).delete(synchronize_session=False)
+    if alterar:
+        db.session.execute(db.update(ItemPedido), alterar) # UPDATE por chave primária, executemany
+    if inserir:
+        db.session.execute(db.insert(ItemPedido), inserir) # executemany
+
+    valor_anterior = pedido.valor_total
+    total_itens = db.select(db.func.coalesce(db.func.sum(ItemPedido.quantidade * ItemPedido.preco_unitario), 0.0)).where(
+        ItemPedido.pedido_id == Pedido.id).scalar_subquery()
+    db.session.execute(db.update(Pedido).where(Pedido.id == pedido.id).values(valor_total=total_itens),
+                       execution_options={'synchronize_session': False})
+    db.session.expire(pedido, ['valor_total']) # Próxima leitura traz o valor recalculado pelo banco
+    ajustar_resumo_vendas(0, pedido.valor_total - valor_anterior, diferenca_quantidade)
+
+@api.route('/api/pedidos/<int:pedido_id>', methods=['PUT'])
+@escrita
 def update_pedido(pedido_id):
     pedido = Pedido.query.get_or_404(pedido_id)
     data = request.get_json()
+    # Validação completa antes de qualquer escrita (menos tempo com o lock de escrita do SQLite)
+    erro = validar_pedido(data, parcial=True)
+    if erro:
+        return jsonify({"error": erro}), 400
+    if 'cliente_id' in data and obter_cliente(data['cliente_id']) is None:
+        return jsonify({"error": "Novo cliente não encontrado"}), 404
+    if 'itens' in data:
+        precos, erro = precos_itens_pedido(data['itens'])
+        if erro:
+            return jsonify({"error": erro[0]}), erro[1]
+
+    # Itens e cliente definem as vendas diárias do pedido: retira as antigas e soma as novas no fim
+    altera_vendas = 'itens' in data or 'cliente_id' in data
+    if altera_vendas:
+        ajustar_vendas_diarias(Pedido.id == pedido_id, -1)
     
     if 'status' in data:
         pedido.status = data['status']
     if 'cliente_id' in data: # Permitir mudar o cliente do pedido
-        cliente = Cliente.query.get(data['cliente_id'])
-        if not cliente:
-            return jsonify({"error": "Novo cliente não encontrado"}), 404
         pedido.cliente_id = data['cliente_id']
 
     # --- Lógica de atualização de itens do pedido  ---
     if 'itens' in data:
-        # 1. Deletar todos os ItemPedido antigos associados a este pedido
-        for item in pedido.itens.all(): # .all() é necessário com lazy='dynamic' para iterar sobre a coleção
-            db.session.delete(item)
-        db.session.flush() # Persiste as deleções antes de adicionar novos
-
-        total_pedido = 0
-        for item_data in data['itens']:
-            produto_id = item_data.get('produto_id')
-            quantidade = item_data.get('quantidade')
-
-            if not produto_id or not quantidade or not isinstance(quantidade, int) or quantidade <= 0:
-                db.session.rollback()
-                return jsonify({"error": "Cada item do pedido deve ter produto_id e quantidade (inteiro > 0)"}), 400
-
-            produto = Produto.query.get(produto_id)
-            if not produto:
-                db.session.rollback()
-                return jsonify({"error": f"Produto com ID {produto_id} não encontrado"}), 404
-            
-            item_pedido = ItemPedido(
-                pedido_id=pedido.id,
-                produto_id=produto_id,
-                quantidade=quantidade,
-                preco_unitario=produto.preco # Pega o preço atual do produto
-            )
-            db.session.add(item_pedido)
-            total_pedido += quantidade * produto.preco
-        
-        pedido.valor_total = total_pedido # Recalcula o valor total
+        substituir_itens_pedido(pedido, [(item['produto_id'], item['quantidade']) for item in data['itens']], precos)
     
+    if altera_vendas:
+        ajustar_vendas_diarias(Pedido.id == pedido_id)
+    registrar_pedidos('alterado', [pedido_id])
+    incrementar_versao('pedido')
     db.session.commit()
     return jsonify({'message': 'Pedido atualizado com sucesso!'})
 
-@app.route('/api/pedidos/<int:pedido_id>', methods=['DELETE'])
+# PATCH /api/pedidos/<id>/itens
+# Altera só as linhas informadas: {"itens": [{"produto_id": X, "quantidade": Y}, ...]} (ou a lista).
+# quantidade > 0 define a quantidade do produto no pedido (adicionando a linha se não existir);
+# quantidade 0 remove o produto. Os demais itens ficam como estão. Retorna o pedido atualizado.
+@api.route('/api/pedidos/<int:pedido_id>/itens', methods=['PATCH'])
+@escrita
+def patch_itens_pedido(pedido_id):
+    pedido = Pedido.query.get_or_404(pedido_id)
+    data = request.get_json()
+    itens_data = data.get('itens') if isinstance(data, dict) else data
+    if not itens_data:
+        return jsonify({"error": "Informe os itens a alterar"}), 400
+    precos, erro = precos_itens_pedido(itens_data, quantidade_minima=0)
+    if erro:
+        return jsonify({"error": erro[0]}), erro[1]
+
+    alteracoes = {item['produto_id']: item['quantidade'] for item in itens_data} # Produto repetido: vale o último
+    atuais = itens_atuais_pedido(pedido_id)
+    novos, presentes = [], set()
+    for linha in atuais:
+        if linha.produto_id not in alteracoes:
+            novos.append((linha.produto_id, linha.quantidade))
+        elif linha.produto_id not in presentes: # A primeira linha do produto recebe a nova quantidade
+            novos.append((linha.produto_id, alteracoes[linha.produto_id]))
+        presentes.add(linha.produto_id)
+    novos += [(produto_id, quantidade) for produto_id, quantidade in alteracoes.items() if produto_id not in presentes]
+    novos = [(produto_id, quantidade) for produto_id, quantidade in novos if quantidade > 0]
+
+    ajustar_vendas_diarias(Pedido.id == pedido_id, -1)
+    substituir_itens_pedido(pedido, novos, precos, atuais)
+    ajustar_vendas_diarias(Pedido.id == pedido_id)
+    dados = registrar_pedidos('alterado', [pedido_id]) # O pedido serializado também é a resposta
+    incrementar_versao('pedido')
+    db.session.commit()
+    return jsonify(dados[0])
+
+@api.route('/api/pedidos/<int:pedido_id>', methods=['DELETE'])
+@escrita
 def delete_pedido(pedido_id):
     pedido = Pedido.query.get_or_404(pedido_id)
     # Com cascade="all, delete-orphan" no relacionamento Pedido.itens,
     # deletar o pedido automaticamente deletará seus itens associados.
-    db.session.delete(pedido) 
+    valor, quantidade = pedido.valor_total, quantidade_itens_pedido(pedido.id)
+    ajustar_vendas_diarias(Pedido.id == pedido_id, -1) # Precisa dos itens: antes de apagá-los
+    db.session.delete(pedido)
+    db.session.flush() # Como em add_pedido: se o resumo for reconstruído, ele já não conta este pedido
+    ajustar_resumo_vendas(-1, -valor, -quantidade)
+    registrar_alteracoes('pedido', 'removido', [pedido_id])
+    incrementar_versao('pedido')
     db.session.commit()
     return jsonify({'message': 'Pedido deletado com sucesso!'}), 204
 
+# --- Registro de alterações (change feed) ---
+# Toda escrita de clientes, produtos e pedidos grava, na mesma transação, uma linha em
+# 'alteracao' por registro afetado, com um seq crescente. Em vez de recarregar as listas, o
+# frontend mantém cópias locais e pede só o que mudou depois do último seq que viu:
+#   GET /api/changes?since=<seq>&limit=<n>: alterações com seq > since, em ordem, e o seq até
+#     onde a resposta chegou ('mais': true se houver mais). Sem 'since', só o seq atual, para
+#     começar a acompanhar a partir de agora.
+#   GET /api/changes/stream?since=<seq>: as mesmas alterações como Server-Sent Events (id = seq;
+#     ao reconectar, o EventSource reenvia o último id em Last-Event-ID e continua dali). Só no
+#     modo ASGI; no WSGI responde 501 e o frontend passa a consultar GET /api/changes.
+# Cada alteração: {"seq", "tabela", "id", "operacao", "dados"}, com 'dados' no formato da rota
+# GET do registro (nulo em 'removido'). Os pedidos trazem cliente_nome/produto_nome do momento
+# da escrita: renomear um cliente ou produto gera só a alteração dele, que o frontend aplica às
+# cópias dos pedidos. 'recarga' (gravada por 'flask seed') e o 410 de um 'since' já descartado
+# por 'flask limpar-alteracoes' pedem que o frontend recarregue tudo.
+# Quem lê avança o 'since' até o maior seq visto, então os seq precisam ficar visíveis na ordem
+# em que foram gerados. No SQLite as escritas já são serializadas. No PostgreSQL, transações
+# concorrentes poderiam fazer commit fora de ordem (o seq 11 aparecer depois do 12, que o
+# leitor já passou): registrar_alteracoes toma um advisory lock até o fim da transação, então
+# quem gera um seq só o faz depois do commit de quem gerou o anterior.
+ALTERACOES_PADRAO = 500
+ALTERACOES_MAXIMO = 5000
+INTERVALO_ALTERACOES = float(os.environ.get('ALTERACOES_INTERVALO', 1)) # Segundos entre consultas do stream
+DURACAO_STREAM_ALTERACOES = float(os.environ.get('ALTERACOES_STREAM_SEGUNDOS', 300)) # Depois disso o EventSource reconecta
+BATIMENTO_STREAM = 15 # Segundos sem alterações até um comentário SSE, para proxies não fecharem a conexão
+RECONEXAO_SSE_MS = 2000
+CHAVE_TRAVA_ALTERACOES = 4021 # Chave do pg_advisory_xact_lock que ordena os seq no PostgreSQL
+
+def travar_sequencia_alteracoes():
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(db.text('SELECT pg_advisory_xact_lock(:chave)'), {'chave': CHAVE_TRAVA_ALTERACOES})
+
+def registrar_alteracoes(tabela, operacao, registros):
+    # registros: dicionários com 'id' ou, em 'removido', só os ids. Não faz commit.
+    if operacao == 'removido':
+        linhas = [{'tabela': tabela, 'registro_id': registro_id, 'operacao': operacao, 'dados': None}
+                  for registro_id in registros]
+    else:
+        codificar = current_app.json.dumps
+        linhas = [{'tabela': tabela, 'registro_id': registro['id'], 'operacao': operacao, 'dados': codificar(registro)}
+                  for registro in registros]
+    if linhas:
+        travar_sequencia_alteracoes()
+        db.session.execute(Alteracao.__table__.insert(), linhas) # executemany de Core, sem o caminho de bulk do ORM
+
+def registrar_pedidos(operacao, ids):
+    # Registra os pedidos como ficaram após a escrita (2 consultas por lote) e retorna os
+    # pedidos serializados. Não faz commit.
+    serializados = []
+    for inicio in range(0, len(ids), LOTE_BULK_PADRAO):
+        pedidos, itens_por_pedido = consultar_pedidos(Pedido.id.in_(ids[inicio:inicio + LOTE_BULK_PADRAO]))
+        serializados += [serializar_pedido(p, itens_por_pedido.get(p.id, [])) for p in pedidos]
+    registrar_alteracoes('pedido', operacao, serializados)
+    return serializados
+
+def registrar_recarga():
+    travar_sequencia_alteracoes()
+    db.session.add(Alteracao(operacao='recarga'))
+
+def consulta_alteracoes(desde, limite):
+    return db.select(Alteracao.seq, Alteracao.tabela, Alteracao.registro_id, Alteracao.operacao, Alteracao.dados).where(
+        Alteracao.seq > desde).order_by(Alteracao.seq).limit(limite)
+
+def consulta_limites_alteracoes():
+    return db.select(db.func.min(Alteracao.seq), db.func.max(Alteracao.seq))
+
+def alteracoes_descartadas(desde, menor, maior):
+    # As alterações logo após 'desde' não existem mais (limpeza) ou 'desde' é de outro banco
+    if maior is None:
+        return desde > 0
+    return desde > maior or desde < menor - 1
+
+def evento_alteracao(seq, tabela, registro_id, operacao, dados):
+    # JSON de uma alteração; 'dados' já está gravado em JSON e entra como está, sem decodificar
+    cabecalho = json.dumps({'seq': seq, 'tabela': tabela, 'id': registro_id, 'operacao': operacao},
+                           ensure_ascii=False, separators=(',', ':'))
+    return f'{cabecalho[:-1]},"dados":{dados or "null"}}}'
+
+def eventos_sse(linhas):
+    return ''.join(f'id: {linha[0]}\ndata: {evento_alteracao(*linha)}\n\n' for linha in linhas)
+
+def inicio_stream_alteracoes(desde, menor, maior):
+    # Retorna o seq de onde o stream parte e o texto inicial: o intervalo de reconexão e, se
+    # 'desde' já foi descartado, um evento 'recarga' (que também serve de novo Last-Event-ID)
+    atual = maior or 0
+    preambulo = f'retry: {RECONEXAO_SSE_MS}\n\n'
+    if desde is None:
+        return atual, preambulo
+    if alteracoes_descartadas(desde, menor, maior):
+        return atual, preambulo + eventos_sse([(atual, None, None, 'recarga', None)])
+    return desde, preambulo
+
+def ler_desde(ultimo_evento, args):
+    # Na reconexão do EventSource, o cabeçalho Last-Event-ID prevalece sobre o 'since' da URL
+    desde = ler_numero({'since': ultimo_evento or args.get('since')}, 'since', int)
+    if desde is not None and desde < 0:
+        raise ParametroInvalido("Parâmetro 'since' não pode ser negativo")
+    return desde
+
+@api.route('/api/changes', methods=['GET'])
+def get_alteracoes():
+    desde = ler_desde(None, request.args)
+    limite = ler_numero(request.args, 'limit', int)
+    if limite is None:
+        limite = ALTERACOES_PADRAO
+    elif limite <= 0:
+        raise ParametroInvalido("Parâmetro 'limit' deve ser positivo")
+    limite = min(limite, ALTERACOES_MAXIMO)
+
+    menor, maior = db.session.execute(consulta_limites_alteracoes()).one()
+    if desde is None:
+        return jsonify({'alteracoes': [], 'seq': maior or 0, 'mais': False})
+    if alteracoes_descartadas(desde, menor, maior):
+        return jsonify({"error": "Alterações desde esse seq não estão mais disponíveis; recarregue os dados",
+                        'seq': maior or 0}), 410
+    linhas = db.session.execute(consulta_alteracoes(desde, limite + 1)).all()
+    mais = len(linhas) > limite
+    linhas = linhas[:limite]
+    seq = linhas[-1].seq if linhas else desde
+    corpo = (f'{{"alteracoes":[{",".join(evento_alteracao(*linha) for linha in linhas)}],'
+             f'"seq":{seq},"mais":{"true" if mais else "false"}}}\n')
+    return Response(corpo, mimetype='application/json')
+
+# O stream só é servido no modo ASGI (asgi.py), onde cada conexão é uma tarefa no event loop.
+# No WSGI (gunicorn gthread, servidor de desenvolvimento) cada conexão prenderia uma thread por
+# minutos e poucas abas abertas bloqueariam a API; ali o frontend consulta GET /api/changes.
+@api.route('/api/changes/stream', methods=['GET'])
+def stream_alteracoes():
+    return jsonify({"error": "Stream de alterações disponível só no modo ASGI (uvicorn asgi:app); "
+                             "use GET /api/changes?since=<seq>"}), 501
+
+@api.cli.command('limpar-alteracoes')
+@click.option('--dias', type=int, default=7, show_default=True, help='Mantém as alterações dos últimos N dias.')
+def limpar_alteracoes(dias):
+    """Descarta as alterações antigas do change feed (quem estiver atrás delas recebe 410 e recarrega)."""
+    limite = datetime.utcnow().replace(microsecond=0) - timedelta(days=dias) # UTC, como o CURRENT_TIMESTAMP
+    ultima = db.session.query(db.func.max(Alteracao.seq)).scalar_subquery()
+    removidas = db.session.query(Alteracao).filter(Alteracao.momento < limite, Alteracao.seq < ultima).delete(
+        synchronize_session=False) # A última fica, para o 410 continuar detectável
+    db.session.commit()
+    print(f"Alterações removidas: {removidas}.")
+
 # --- Rotas de Relatórios ---
-@app.route('/api/relatorios/resumo-vendas', methods=['GET'])
-def resumo_vendas():
-    total_pedidos = db.session.query(Pedido.id).count() # Conta o total de pedidos
-    # Soma o valor_total de todos os pedidos. scalar() retorna um único valor.
-    # Use 'or 0.0' para garantir que seja 0.0 se não houver pedidos (evitar None)
-    valor_total_faturado = db.session.query(db.func.sum(Pedido.valor_total)).scalar() or 0.0 
-    
-    # Soma a quantidade de todos os produtos vendidos (somando a quantidade de cada ItemPedido)
-    quantidade_total_produtos = db.session.query(db.func.sum(ItemPedido.quantidade)).scalar() or 0
+# Relatórios somente leitura, definidos uma única vez: a definição recebe os parâmetros da URL
+# e retorna (consulta, montar), o SELECT a executar e a função que monta a resposta a partir
+# das linhas. A mesma definição atende a rota Flask (sessão síncrona) e o modo ASGI, que a
+# executa no engine assíncrono (ver asgi.py). Se montar retornar None, os dados derivados
+# ainda não existem: a rota Flask chama 'reconstruir' e consulta de novo.
+RELATORIOS = {} # caminho -> (tabelas do ETag, definição, reconstruir)
 
-    return jsonify({
-        "totalPedidos": total_pedidos,
-        "valorTotalFaturado": round(valor_total_faturado, 2), # Arredonda para 2 casas decimais
-        "quantidadeTotalProdutos": quantidade_total_produtos
-    })
+def relatorio(caminho, *tabelas, reconstruir=None):
+    def decorador(definicao):
+        def view():
+            consulta, montar = definicao(request.args)
+            resposta = montar(db.session.execute(consulta).all())
+            if resposta is None and reconstruir is not None:
+                reconstruir()
+                db.session.commit()
+                resposta = montar(db.session.execute(consulta).all())
+            return jsonify(resposta)
+        view.__name__ = definicao.__name__
+        api.add_url_rule(caminho, view_func=condicional(*tabelas, memorizar=True)(view), methods=['GET'])
+        RELATORIOS[caminho] = (tabelas, definicao, reconstruir)
+        return definicao
+    return decorador
 
-@app.route('/api/relatorios/pedidos-pendentes', methods=['GET'])
-def pedidos_pendentes():
-    # Filtra os pedidos com status "Em andamento"
-    pedidos = Pedido.query.filter_by(status="Em andamento").all()
-    pedidos_data = []
-    for p in pedidos:
-        cliente = Cliente.query.get(p.cliente_id)
-        pedidos_data.append({
-            'id': p.id,
-            'cliente_nome': cliente.nome if cliente else "Desconhecido",
-            'data_pedido': p.data_pedido.isoformat(),
-            'status': p.status,
-            'valor_total': round(p.valor_total, 2)
-        })
-    return jsonify(pedidos_data)
-
-@app.route('/api/relatorios/clientes-mais-ativos', methods=['GET'])
-def clientes_mais_ativos():
+@relatorio('/api/relatorios/resumo-vendas', 'pedido', reconstruir=recalcular_resumo_vendas)
+def resumo_vendas(args):
+    # Leitura O(1) da tabela de resumo mantida incrementalmente pelas rotas de pedidos.
+    # Banco antigo sem a linha do resumo: reconstrói uma única vez (ver 'reconstruir').
+    def montar(linhas):
+        if not linhas:
+            return None
+        resumo = linhas[0]
+        return {
+            "totalPedidos": resumo.total_pedidos,
+            "valorTotalFaturado": round(resumo.valor_total_faturado, 2), # Arredonda para 2 casas decimais
+            "quantidadeTotalProdutos": resumo.quantidade_total_produtos
+        }
+    consulta = db.select(ResumoVendas.total_pedidos, ResumoVendas.valor_total_faturado,
+                         ResumoVendas.quantidade_total_produtos).where(ResumoVendas.id == RESUMO_ID)
+    return consulta, montar
+
+@relatorio('/api/relatorios/pedidos-pendentes', 'pedido', 'cliente')
+def pedidos_pendentes(args):
+    # Pedidos com status "Em andamento" (uma única consulta, sem itens), via o mesmo construtor
+    # de filtros de GET /api/pedidos: aceita também cliente, produto, datas, valores e sort
+    args = args.to_dict()
+    args['status'] = "Em andamento"
+    campo, decrescente = ordenacao_pedidos(args)
+    ordem, _ = paginar_pedidos({}, campo, decrescente)
+    return selecao_pedidos(filtros_pedidos(args), ordem), lambda pedidos: [pedido_pendente_resposta(p) for p in pedidos]
+
+@relatorio('/api/relatorios/clientes-mais-ativos', 'pedido', 'cliente')
+def clientes_mais_ativos(args):
     # Agrupa os pedidos por cliente e conta quantos pedidos cada cliente fez
     # Ordena do cliente com mais pedidos para o com menos
-    clientes_ativos = db.session.query(
+    consulta = db.select(
         Cliente.nome,
         db.func.count(Pedido.id).label('total_pedidos_realizados')
-    ).join(Pedido).group_by(Cliente.id, Cliente.nome).order_by(db.desc('total_pedidos_realizados')).all()
+    ).join(Pedido).group_by(Cliente.id, Cliente.nome).order_by(db.desc('total_pedidos_realizados'))
+
+    return consulta, lambda clientes_ativos: [{'nome': c.nome, 'totalPedidosRealizados': c.total_pedidos_realizados} for c in clientes_ativos]
+
+# --- Séries temporais de vendas (a partir da tabela vendas_diarias) ---
+# GET /api/relatorios/series?granularidade=dia|semana|mes&data_de=&data_ate=&produto_id=&cliente_id=&por=produto|cliente
+# Semanas começam na segunda-feira e são identificadas pela data dessa segunda; meses por 'AAAA-MM'.
+GRANULARIDADES = {
+    'dia': lambda dia: dia.isoformat(),
+    'semana': lambda dia: (dia - timedelta(days=dia.weekday())).isoformat(),
+    'mes': lambda dia: dia.strftime('%Y-%m'),
+}
+DIMENSOES_SERIE = {'produto': VendasDiarias.produto_id, 'cliente': VendasDiarias.cliente_id}
+
+def filtros_vendas_diarias(args):
+    criterios = []
+    data_de, _ = ler_data(args, 'data_de')
+    if data_de is not None:
+        criterios.append(VendasDiarias.dia >= data_de.date())
+    data_ate, _ = ler_data(args, 'data_ate')
+    if data_ate is not None:
+        criterios.append(VendasDiarias.dia <= data_ate.date())
+    produto_id = ler_numero(args, 'produto_id', int)
+    if produto_id is not None:
+        criterios.append(VendasDiarias.produto_id == produto_id)
+    cliente_id = ler_numero(args, 'cliente_id', int)
+    if cliente_id is not None:
+        criterios.append(VendasDiarias.cliente_id == cliente_id)
+    return criterios
+
+@relatorio('/api/relatorios/series', 'pedido')
+def series_vendas(args):
+    granularidade = args.get('granularidade', 'dia')
+    if granularidade not in GRANULARIDADES:
+        raise ParametroInvalido(f"Granularidade inválida. Use: {', '.join(GRANULARIDADES)}")
+    por = args.get('por')
+    if por is not None and por not in DIMENSOES_SERIE:
+        raise ParametroInvalido(f"Parâmetro 'por' inválido. Use: {', '.join(DIMENSOES_SERIE)}")
+    dimensoes = [DIMENSOES_SERIE[por]] if por else []
 
-    return jsonify([{'nome': c.nome, 'totalPedidosRealizados': c.total_pedidos_realizados} for c in clientes_ativos])
+    # O banco agrega por dia (uma linha por dia e dimensão); semanas e meses são somados aqui
+    consulta = db.select(
+        VendasDiarias.dia, *dimensoes,
+        db.func.sum(VendasDiarias.receita), db.func.sum(VendasDiarias.quantidade)
+    ).where(*filtros_vendas_diarias(args)).group_by(VendasDiarias.dia, *dimensoes).having(
+        db.func.sum(VendasDiarias.quantidade) > 0).order_by(VendasDiarias.dia, *dimensoes)
+
+    def montar(linhas):
+        periodo_de = GRANULARIDADES[granularidade]
+        series = {}
+        for linha in linhas:
+            chave = (periodo_de(linha[0]),) + tuple(linha[1:-2])
+            receita, quantidade = series.get(chave, (0.0, 0))
+            series[chave] = (receita + linha[-2], quantidade + linha[-1])
+
+        resultado = []
+        for chave, (receita, quantidade) in sorted(series.items()):
+            ponto = {'periodo': chave[0], 'receita': round(receita, 2), 'quantidade': quantidade}
+            if por:
+                ponto[f'{por}_id'] = chave[1]
+            resultado.append(ponto)
+        return resultado
+    return consulta, montar
+
+@relatorio('/api/relatorios/produtos-mais-vendidos', 'pedido', 'produto')
+def produtos_mais_vendidos(args):
+    # Top-N produtos por receita no período (mesmos filtros de data/cliente das séries)
+    limite = ler_numero(args, 'limit', int) or 10
+    if limite <= 0:
+        raise ParametroInvalido("Parâmetro 'limit' deve ser positivo")
+    consulta = db.select(
+        VendasDiarias.produto_id,
+        Produto.nome,
+        db.func.sum(VendasDiarias.receita).label('receita'),
+        db.func.sum(VendasDiarias.quantidade).label('quantidade')
+    ).outerjoin(Produto, Produto.id == VendasDiarias.produto_id).where(*filtros_vendas_diarias(args)).group_by(
+        VendasDiarias.produto_id, Produto.nome).having(db.func.sum(VendasDiarias.quantidade) > 0).order_by(db.desc('receita')).limit(min(limite, PAGINA_MAXIMA))
+
+    return consulta, lambda produtos: [{
+        'produto_id': p.produto_id,
+        'nome': p.nome if p.nome is not None else "Desconhecido",
+        'receita': round(p.receita, 2),
+        'quantidade': p.quantidade
+    } for p in produtos]
 
 # --- Execução da Aplicação ---
+# Instância padrão (python app.py, flask --app app, gunicorn app:app). Em produção, prefira
+# gunicorn (gunicorn.conf.py) ou o modo ASGI (asgi.py); o servidor abaixo é só para desenvolvimento.
+# É criada no primeiro acesso a 'app' (PEP 562): importar o módulo só pelas rotas/modelos
+# (asgi.py, gunicorn 'app:create_app()', benchmarks) não monta um app a mais na inicialização.
+def app_padrao():
+    if 'app' not in globals():
+        globals()['app'] = create_app()
+    return globals()['app']
+
+def __getattr__(nome):
+    if nome == 'app':
+        return app_padrao()
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+
 if __name__ == '__main__':
     # Garante que as tabelas e dados de exemplo sejam criados
     # antes do servidor iniciar, no contexto correto da aplicação.
     initialize_database() 
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    # Modo debug só com FLASK_DEBUG=1 (recarregamento automático e depurador expostos)
+    app_padrao().run(debug=os.environ.get('FLASK_DEBUG') == '1', port=int(os.environ.get('PORT', 5000)))
\ No newline at end of file
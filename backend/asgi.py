@@ -0,0 +1,164 @@
+import os
+import asyncio
+from urllib.parse import parse_qsl
+from werkzeug.datastructures import MultiDict # type: ignore
+from sqlalchemy.ext.asyncio import create_async_engine # type: ignore
+from a2wsgi import WSGIMiddleware # type: ignore
+from app import (create_app, RELATORIOS, ParametroInvalido,
+                 consulta_versoes, versoes_de, gerar_etag, consulta_alteracoes, consulta_limites_alteracoes,
+                 inicio_stream_alteracoes, eventos_sse, ler_desde, ALTERACOES_MAXIMO, INTERVALO_ALTERACOES,
+                 DURACAO_STREAM_ALTERACOES, BATIMENTO_STREAM)
+from banco import opcoes_engine, registrar_pragmas
+
+# --- Modo ASGI (produção) ---
+# Uso (a partir de backend/):  uvicorn asgi:app --host 0.0.0.0 --port 8000 --workers 4
+# Dependências: pip install -r requirements-asgi.txt (e asyncpg no PostgreSQL)
+#
+# Os relatórios somente leitura (RELATORIOS em app.py) são atendidos direto no event loop,
+# com um engine assíncrono do SQLAlchemy (aiosqlite/asyncpg): enquanto uma consulta aguarda
+# o banco, o worker continua atendendo outras requisições. O ETag/304 e os corpos memorizados
+# seguem as mesmas regras (e o mesmo cache) das rotas Flask.
+# O stream de alterações (/api/changes/stream) só existe aqui, no event loop: cada cliente
+# conectado é uma tarefa esperando o próximo intervalo, não uma thread presa do pool (no app
+# Flask a rota responde 501 e o frontend consulta GET /api/changes).
+# As demais rotas vão para o app Flask (create_app) num pool de threads (a2wsgi), com
+# ASGI_THREADS threads por worker. Isso inclui GET /api/pedidos e /api/pedidos/<id>: a leitura
+# de pedidos (consultar_pedidos) é compartilhada com as rotas de escrita e com os filtros e o
+# cursor da listagem, e cada requisição faz no máximo duas consultas indexadas e limitadas,
+# então ela ocupa uma thread por pouco tempo; levá-la ao engine assíncrono duplicaria esse código.
+DRIVERS_ASSINCRONOS = {'sqlite': 'sqlite+aiosqlite', 'postgresql': 'postgresql+asyncpg'}
+THREADS_WSGI = int(os.environ.get('ASGI_THREADS', 10))
+
+def uri_assincrona(uri):
+    esquema, resto = uri.split(':', 1)
+    dialeto = esquema.split('+')[0]
+    if dialeto not in DRIVERS_ASSINCRONOS:
+        raise ValueError(f"Banco sem driver assíncrono configurado: {dialeto}")
+    return DRIVERS_ASSINCRONOS[dialeto] + ':' + resto
+
+def etags_aceitos(cabecalho):
+    # Valores de If-None-Match, sem aspas nem o prefixo W/
+    return {valor.strip().removeprefix('W/').strip('"') for valor in cabecalho.split(',') if valor.strip()}
+
+class AplicacaoASGI:
+    def __init__(self, app_flask=None):
+        self.flask = app_flask or create_app()
+        self.wsgi = WSGIMiddleware(self.flask, workers=THREADS_WSGI)
+        self.uri = uri_assincrona(self.flask.config['SQLALCHEMY_DATABASE_URI'])
+        self.engine = None
+
+    def iniciar_engine(self):
+        if self.engine is None:
+            self.engine = create_async_engine(self.uri, **opcoes_engine(self.uri))
+            registrar_pragmas(self.engine.sync_engine) # Mesmos PRAGMAs do engine síncrono
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.ciclo_de_vida(receive, send)
+        if scope['type'] == 'http' and scope['method'] in ('GET', 'HEAD') and scope['path'] in RELATORIOS:
+            return await self.relatorio(scope, receive, send)
+        if scope['type'] == 'http' and scope['method'] == 'GET' and scope['path'] == '/api/changes/stream':
+            return await self.alteracoes(scope, receive, send)
+        return await self.wsgi(scope, receive, send)
+
+    async def ciclo_de_vida(self, receive, send):
+        while True:
+            mensagem = await receive()
+            if mensagem['type'] == 'lifespan.startup':
+                self.iniciar_engine()
+                await send({'type': 'lifespan.startup.complete'})
+            elif mensagem['type'] == 'lifespan.shutdown':
+                if self.engine is not None:
+                    await self.engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def relatorio(self, scope, receive, send):
+        self.iniciar_engine()
+        tabelas, definicao, _reconstruir = RELATORIOS[scope['path']]
+        query_string = scope['query_string'].decode('latin-1')
+        args = MultiDict(parse_qsl(query_string, keep_blank_values=True))
+        cabecalhos = {nome.decode('latin-1').lower(): valor.decode('latin-1') for nome, valor in scope['headers']}
+
+        async with self.engine.connect() as conexao:
+            versoes = versoes_de((await conexao.execute(consulta_versoes(tabelas))).all(), tabelas)
+            etag = gerar_etag(f"{scope['path']}?{query_string}", versoes) # Mesmo formato de request.full_path
+            if etag in etags_aceitos(cabecalhos.get('if-none-match', '')):
+                return await self.responder(send, scope, 304, b'', etag, cabecalhos)
+
+            corpo = self.flask.extensions['respostas_memorizadas'].obter(etag)
+            if corpo is None:
+                try:
+                    consulta, montar = definicao(args)
+                except ParametroInvalido as e:
+                    return await self.responder(send, scope, 400, self.flask.json.codificar({"error": str(e)}) + b'\n', None, cabecalhos)
+                resposta = montar((await conexao.execute(consulta)).all())
+                if resposta is None: # Dados derivados ausentes: a rota Flask reconstrói (escrita)
+                    return await self.wsgi(scope, receive, send)
+                corpo = self.flask.json.codificar(resposta) + b'\n'
+                self.flask.extensions['respostas_memorizadas'].definir(etag, corpo)
+        return await self.responder(send, scope, 200, corpo, etag, cabecalhos)
+
+    async def alteracoes(self, scope, receive, send):
+        # Server-Sent Events com as consultas e o formato de GET /api/changes (ver app.py)
+        self.iniciar_engine()
+        args = MultiDict(parse_qsl(scope['query_string'].decode('latin-1'), keep_blank_values=True))
+        cabecalhos = {nome.decode('latin-1').lower(): valor.decode('latin-1') for nome, valor in scope['headers']}
+        try:
+            desde = ler_desde(cabecalhos.get('last-event-id'), args)
+        except ParametroInvalido as e:
+            return await self.responder(send, scope, 400, self.flask.json.codificar({"error": str(e)}) + b'\n', None, cabecalhos)
+
+        headers = [(b'content-type', b'text/event-stream; charset=utf-8'), (b'cache-control', b'no-cache'),
+                   (b'x-accel-buffering', b'no')]
+        if 'origin' in cabecalhos:
+            headers.append((b'access-control-allow-origin', b'*'))
+        await send({'type': 'http.response.start', 'status': 200, 'headers': headers})
+
+        desconectado = asyncio.Event()
+        async def aguardar_desconexao():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            desconectado.set()
+        vigia = asyncio.create_task(aguardar_desconexao())
+        relogio = asyncio.get_running_loop().time
+        try:
+            async with self.engine.connect() as conexao:
+                menor, maior = (await conexao.execute(consulta_limites_alteracoes())).one()
+            desde, preambulo = inicio_stream_alteracoes(desde, menor, maior)
+            await send({'type': 'http.response.body', 'body': preambulo.encode(), 'more_body': True})
+            fim = relogio() + DURACAO_STREAM_ALTERACOES
+            ultimo_envio = relogio()
+            while not desconectado.is_set() and relogio() < fim:
+                async with self.engine.connect() as conexao: # Conexão só durante a consulta
+                    linhas = (await conexao.execute(consulta_alteracoes(desde, ALTERACOES_MAXIMO))).all()
+                if linhas:
+                    desde = linhas[-1].seq
+                    await send({'type': 'http.response.body', 'body': eventos_sse(linhas).encode(), 'more_body': True})
+                    ultimo_envio = relogio()
+                    if len(linhas) == ALTERACOES_MAXIMO:
+                        continue # Ainda há alterações acumuladas
+                elif relogio() - ultimo_envio >= BATIMENTO_STREAM:
+                    await send({'type': 'http.response.body', 'body': b': batimento\n\n', 'more_body': True})
+                    ultimo_envio = relogio()
+                try:
+                    await asyncio.wait_for(desconectado.wait(), INTERVALO_ALTERACOES)
+                except asyncio.TimeoutError:
+                    pass
+            if not desconectado.is_set():
+                await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        finally:
+            vigia.cancel()
+
+    async def responder(self, send, scope, status, corpo, etag, cabecalhos):
+        headers = [(b'content-type', b'application/json')]
+        if status != 304:
+            headers.append((b'content-length', str(len(corpo)).encode()))
+        if etag is not None:
+            headers += [(b'etag', f'"{etag}"'.encode()), (b'cache-control', b'no-cache')]
+        if 'origin' in cabecalhos: # Mesmo CORS do app Flask (flask-cors com origem '*')
+            headers += [(b'access-control-allow-origin', b'*'), (b'access-control-expose-headers', b'ETag, X-Next-After')]
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': corpo if scope['method'] != 'HEAD' and status != 304 else b''})
+
+app = AplicacaoASGI()
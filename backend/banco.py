@@ -0,0 +1,82 @@
+import os
+import time
+import random
+import functools
+from sqlalchemy import event # type: ignore
+from sqlalchemy.exc import OperationalError # type: ignore
+
+# --- Perfil de configuração do banco de dados ---
+# Todos os valores podem ser sobrescritos por variáveis de ambiente.
+# DATABASE_URL aceita SQLite ou PostgreSQL sem mudanças no código: os PRAGMAs só são
+# aplicados quando o dialeto é SQLite e as opções de pool valem para ambos.
+PERFIL_BANCO = {
+    # PRAGMAs do SQLite (aplicados a cada nova conexão)
+    'journal_mode': os.environ.get('DB_JOURNAL_MODE', 'WAL'), # Leitores não bloqueiam escritores (e vice-versa)
+    'synchronous': os.environ.get('DB_SYNCHRONOUS', 'NORMAL'), # Seguro com WAL e bem mais rápido que FULL
+    'busy_timeout': int(os.environ.get('DB_BUSY_TIMEOUT_MS', 5000)), # Espera pelo lock em vez de falhar na hora
+    'mmap_size': int(os.environ.get('DB_MMAP_SIZE', 256 * 1024 * 1024)),
+    'cache_size': int(os.environ.get('DB_CACHE_SIZE', -64 * 1024)), # Negativo = KiB (64 MiB)
+    # Pool de conexões (dimensionar pelo número de threads por worker do gunicorn)
+    'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+    'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+    'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+    'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+    # Retentativa de escritas que falham com SQLITE_BUSY ("database is locked")
+    'tentativas_escrita': int(os.environ.get('DB_WRITE_RETRIES', 5)),
+    'espera_inicial_ms': int(os.environ.get('DB_RETRY_BACKOFF_MS', 50)),
+}
+
+def uri_banco(padrao):
+    uri = os.environ.get('DATABASE_URL', padrao)
+    # Provedores (ex.: Render/Heroku) usam o esquema antigo 'postgres://', que o SQLAlchemy não aceita
+    if uri.startswith('postgres://'):
+        uri = 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+def opcoes_engine(uri, perfil=PERFIL_BANCO):
+    if uri.startswith('sqlite') and (':memory:' in uri or uri.rstrip('/') == 'sqlite:'):
+        return {} # Banco em memória usa um pool próprio de conexão única
+    return {
+        'pool_size': perfil['pool_size'],
+        'max_overflow': perfil['max_overflow'],
+        'pool_timeout': perfil['pool_timeout'],
+        'pool_recycle': perfil['pool_recycle'],
+        'pool_pre_ping': True, # Descarta conexões mortas (ex.: após restart do PostgreSQL)
+    }
+
+def registrar_pragmas(engine, perfil=PERFIL_BANCO):
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def aplicar_pragmas(conexao_dbapi, _registro):
+        cursor = conexao_dbapi.cursor()
+        cursor.execute(f"PRAGMA journal_mode={perfil['journal_mode']}")
+        cursor.execute(f"PRAGMA synchronous={perfil['synchronous']}")
+        cursor.execute(f"PRAGMA busy_timeout={int(perfil['busy_timeout'])}")
+        cursor.execute(f"PRAGMA mmap_size={int(perfil['mmap_size'])}")
+        cursor.execute(f"PRAGMA cache_size={int(perfil['cache_size'])}")
+        cursor.close()
+
+def banco_ocupado(erro):
+    mensagem = str(getattr(erro, 'orig', erro)).lower()
+    return isinstance(erro, OperationalError) and ('database is locked' in mensagem or 'database is busy' in mensagem)
+
+def repetir_se_ocupado(sessao, perfil=PERFIL_BANCO):
+    # Decorador para rotas de escrita: se a transação falhar com SQLITE_BUSY, desfaz a transação
+    # e executa a rota de novo, com espera exponencial (com jitter) entre as tentativas.
+    def decorador(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            tentativas = max(1, perfil['tentativas_escrita'])
+            for tentativa in range(tentativas):
+                try:
+                    return view(*args, **kwargs)
+                except OperationalError as e:
+                    if not banco_ocupado(e) or tentativa == tentativas - 1:
+                        raise
+                    sessao.rollback()
+                    espera = perfil['espera_inicial_ms'] * (2 ** tentativa) * (0.5 + random.random())
+                    time.sleep(espera / 1000)
+        return wrapper
+    return decorador
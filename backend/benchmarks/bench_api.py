@@ -0,0 +1,333 @@
+"""Benchmark de carga da API de vendas: banco SQLite semeado + cargas de trabalho roteirizadas.
+
+Uso (a partir de backend/):
+    python benchmarks/bench_api.py
+    python benchmarks/bench_api.py --pedidos 10000,100000,1000000 --cargas misto,leitura --concorrencia 1,8,32 --saida atual.json
+    python benchmarks/bench_api.py --servidor gunicorn --pedidos 100000 --saida gunicorn.json
+    python benchmarks/bench_api.py --comparar base.json atual.json --tolerancia 10
+
+Para cada tamanho de banco, semeia (uma vez, com os dados sintéticos do 'flask seed') um
+banco em --dir-bancos e o reaproveita nas execuções seguintes. Cada carga de trabalho roda
+contra uma cópia nova desse banco, num servidor novo (dev server, gunicorn ou uvicorn),
+com METRICAS=1 para contar as consultas SQL de cada requisição (cabeçalho Server-Timing).
+Em cada nível de concorrência, clientes com conexão keep-alive sorteiam operações pelos
+pesos da carga (sequência reprodutível pela --semente) durante --duracao segundos.
+
+Reporta requisições por segundo, latências p50/p95/p99 e consultas por requisição (no total
+e por operação), além do pico de memória (RSS) do servidor. O JSON de --saida guarda os
+parâmetros e a versão (git) e pode ser comparado com outra execução por --comparar, que sai
+com código 1 se alguma combinação regrediu mais que a tolerância.
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import shutil
+import socket
+import sqlite3
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import http.client
+from datetime import datetime
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+from carga_http import percentil # noqa: E402
+
+# --- Operações e cargas de trabalho ---
+# Cada operação recebe (contexto, aleatorio) e retorna (método, caminho, corpo JSON ou None).
+# O contexto traz os maiores ids de clientes, produtos e pedidos do banco semeado.
+def criar_pedido(ctx, aleatorio):
+    itens = [{'produto_id': aleatorio.randint(1, ctx['produtos']), 'quantidade': aleatorio.randint(1, 5)}
+             for _ in range(aleatorio.randint(1, 5))]
+    return 'POST', '/api/pedidos', {'cliente_id': aleatorio.randint(1, ctx['clientes']), 'itens': itens}
+
+def listar_pedidos(ctx, aleatorio):
+    return 'GET', f"/api/pedidos?limit=50&after={aleatorio.randint(0, max(0, ctx['pedidos'] - 50))}", None
+
+def obter_pedido(ctx, aleatorio):
+    return 'GET', f"/api/pedidos/{aleatorio.randint(1, ctx['pedidos'])}", None
+
+def resumo_vendas(ctx, aleatorio):
+    return 'GET', '/api/relatorios/resumo-vendas', None
+
+def pedidos_pendentes(ctx, aleatorio):
+    return 'GET', '/api/relatorios/pedidos-pendentes', None
+
+def clientes_mais_ativos(ctx, aleatorio):
+    return 'GET', '/api/relatorios/clientes-mais-ativos', None
+
+OPERACOES = {funcao.__name__: funcao for funcao in (
+    criar_pedido, listar_pedidos, obter_pedido, resumo_vendas, pedidos_pendentes, clientes_mais_ativos)}
+
+# Pesos relativos das operações em cada carga
+CARGAS = {
+    'misto': {'criar_pedido': 10, 'listar_pedidos': 25, 'obter_pedido': 35,
+              'resumo_vendas': 10, 'pedidos_pendentes': 10, 'clientes_mais_ativos': 10},
+    'leitura': {'listar_pedidos': 35, 'obter_pedido': 35, 'resumo_vendas': 10, 'pedidos_pendentes': 10, 'clientes_mais_ativos': 10},
+    'escrita': {'criar_pedido': 1},
+    'relatorios': {'resumo_vendas': 1, 'pedidos_pendentes': 1, 'clientes_mais_ativos': 1},
+}
+
+# --- Bancos semeados ---
+def banco_semeado(diretorio, pedidos, semente):
+    # Caminho do banco com 'pedidos' pedidos sintéticos; semeia na primeira vez
+    clientes, produtos = max(100, pedidos // 100), 500
+    arquivo = os.path.join(diretorio, f'bench_{pedidos}_{semente}.db')
+    if not os.path.exists(arquivo):
+        os.makedirs(diretorio, exist_ok=True)
+        temporario = arquivo + '.tmp'
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        print(f"Semeando {pedidos} pedidos em {arquivo}...")
+        inicio = time.perf_counter()
+        from app import create_app, db, preparar_banco, gravar_carga, dados_sinteticos
+        app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + temporario})
+        with app.app_context():
+            preparar_banco()
+            gravar_carga(*dados_sinteticos(clientes, produtos, pedidos, semente=semente))
+            db.session.commit()
+            db.session.execute(db.text('PRAGMA wal_checkpoint(TRUNCATE)')) # Tudo no arquivo principal, para copiá-lo
+            db.session.commit()
+            db.engine.dispose()
+        os.replace(temporario, arquivo)
+        print(f"Banco semeado em {time.perf_counter() - inicio:.1f}s.")
+    return arquivo
+
+def contexto_banco(arquivo):
+    with sqlite3.connect(arquivo) as conexao:
+        return {chave: conexao.execute(f'SELECT coalesce(max(id), 0) FROM {tabela}').fetchone()[0]
+                for chave, tabela in (('clientes', 'cliente'), ('produtos', 'produto'), ('pedidos', 'pedido'))}
+
+# --- Servidor medido ---
+def comando_servidor(tipo, porta):
+    if tipo == 'dev':
+        return [sys.executable, 'app.py']
+    if tipo == 'gunicorn':
+        return [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{porta}', 'app:create_app()']
+    if tipo == 'uvicorn':
+        return [sys.executable, '-m', 'uvicorn', 'asgi:app', '--port', str(porta), '--log-level', 'warning']
+    raise SystemExit(f"Servidor desconhecido: {tipo}")
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def iniciar_servidor(tipo, banco, metricas, log):
+    porta = porta_livre()
+    ambiente = dict(os.environ, DATABASE_URL='sqlite:///' + banco, PORT=str(porta), METRICAS='1' if metricas else '0')
+    processo = subprocess.Popen(comando_servidor(tipo, porta), cwd=BACKEND, env=ambiente, stdout=log, stderr=subprocess.STDOUT)
+    limite = time.monotonic() + 60
+    while time.monotonic() < limite:
+        if processo.poll() is not None:
+            raise SystemExit(f"O servidor '{tipo}' terminou ao iniciar (ver {log.name})")
+        try:
+            conexao = http.client.HTTPConnection('127.0.0.1', porta, timeout=2)
+            conexao.request('GET', '/')
+            if conexao.getresponse().status == 200:
+                conexao.close()
+                return processo, porta
+        except OSError:
+            pass
+        time.sleep(0.2)
+    processo.kill()
+    raise SystemExit(f"O servidor '{tipo}' não respondeu em 60s (ver {log.name})")
+
+def processos_da_arvore(pid):
+    # pid e todos os descendentes (workers do gunicorn/uvicorn), lidos do /proc
+    pais = {}
+    for nome in os.listdir('/proc'):
+        if nome.isdigit():
+            try:
+                with open(f'/proc/{nome}/stat') as arquivo:
+                    pais.setdefault(int(arquivo.read().rsplit(')', 1)[1].split()[1]), []).append(int(nome))
+            except OSError:
+                pass
+    arvore, pendentes = [], [pid]
+    while pendentes:
+        atual = pendentes.pop()
+        arvore.append(atual)
+        pendentes += pais.get(atual, [])
+    return arvore
+
+def rss_pico_mb(pid):
+    # Soma dos picos de RSS (VmHWM) do servidor e seus workers; None fora do Linux
+    if not os.path.isdir('/proc'):
+        return None
+    total = 0
+    for processo in processos_da_arvore(pid):
+        try:
+            with open(f'/proc/{processo}/status') as arquivo:
+                total += next(int(linha.split()[1]) for linha in arquivo if linha.startswith('VmHWM:'))
+        except (OSError, StopIteration):
+            pass
+    return round(total / 1024, 1)
+
+# --- Geração de carga ---
+CONSULTAS_SERVER_TIMING = re.compile(r'(\d+) consultas')
+
+def cliente(porta, carga, ctx, fim, aquecimento_ate, semente, medidas):
+    aleatorio = random.Random(semente)
+    nomes = list(carga)
+    pesos = [carga[nome] for nome in nomes]
+    conexao = http.client.HTTPConnection('127.0.0.1', porta, timeout=60)
+    while time.perf_counter() < fim:
+        operacao = aleatorio.choices(nomes, pesos)[0]
+        metodo, caminho, corpo = OPERACOES[operacao](ctx, aleatorio)
+        inicio = time.perf_counter()
+        try:
+            if corpo is None:
+                conexao.request(metodo, caminho)
+            else:
+                conexao.request(metodo, caminho, json.dumps(corpo), {'Content-Type': 'application/json'})
+            resposta = conexao.getresponse()
+            resposta.read()
+        except (OSError, http.client.HTTPException):
+            conexao.close()
+            conexao = http.client.HTTPConnection('127.0.0.1', porta, timeout=60)
+            if inicio >= aquecimento_ate:
+                medidas.append((operacao, None, None, True))
+            continue
+        if inicio >= aquecimento_ate:
+            consultas = CONSULTAS_SERVER_TIMING.search(resposta.getheader('Server-Timing') or '')
+            medidas.append((operacao, time.perf_counter() - inicio, int(consultas.group(1)) if consultas else None,
+                            resposta.status >= 400))
+    conexao.close()
+
+def resumir(medidas, segundos):
+    latencias = sorted(m[1] for m in medidas if m[1] is not None)
+    consultas = [m[2] for m in medidas if m[2] is not None]
+    return {
+        'requisicoes': len(latencias),
+        'erros': sum(1 for m in medidas if m[3]),
+        'rps': round(len(latencias) / segundos, 1),
+        'p50_ms': round(percentil(latencias, 50) * 1000, 2),
+        'p95_ms': round(percentil(latencias, 95) * 1000, 2),
+        'p99_ms': round(percentil(latencias, 99) * 1000, 2),
+        'consultas_por_requisicao': round(sum(consultas) / len(consultas), 2) if consultas else None,
+    }
+
+def rodar_nivel(porta, carga, ctx, concorrencia, duracao, aquecimento, semente):
+    medidas = [] # list.append é thread-safe
+    inicio = time.perf_counter()
+    aquecimento_ate = inicio + aquecimento
+    fim = aquecimento_ate + duracao
+    threads = [threading.Thread(target=cliente, args=(porta, carga, ctx, fim, aquecimento_ate, semente * 1000 + n, medidas))
+               for n in range(concorrencia)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    segundos = time.perf_counter() - aquecimento_ate
+    resultado = resumir(medidas, segundos)
+    resultado['operacoes'] = {operacao: resumir([m for m in medidas if m[0] == operacao], segundos)
+                              for operacao in sorted({m[0] for m in medidas})}
+    return resultado
+
+# --- Comparação entre execuções ---
+def comparar(arquivo_base, arquivo_novo, tolerancia):
+    with open(arquivo_base, encoding='utf-8') as arquivo:
+        base = json.load(arquivo)
+    with open(arquivo_novo, encoding='utf-8') as arquivo:
+        novo = json.load(arquivo)
+    chave = lambda r: (r['pedidos'], r['carga'], r['concorrencia'])
+    anteriores = {chave(r): r for r in base['resultados']}
+    print(f"Base: {base['meta'].get('versao')}  Novo: {novo['meta'].get('versao')}  (tolerância {tolerancia:.0f}%)")
+    regressoes = 0
+    for resultado in novo['resultados']:
+        anterior = anteriores.get(chave(resultado))
+        if anterior is None:
+            continue
+        variacao_rps = (resultado['rps'] / anterior['rps'] - 1) * 100 if anterior['rps'] else 0.0
+        variacao_p95 = (resultado['p95_ms'] / anterior['p95_ms'] - 1) * 100 if anterior['p95_ms'] else 0.0
+        regrediu = variacao_rps < -tolerancia or variacao_p95 > tolerancia
+        regressoes += regrediu
+        pedidos, carga, concorrencia = chave(resultado)
+        print(f"{pedidos:>8} pedidos  {carga:<10} c={concorrencia:<4} rps {anterior['rps']:>8.1f} -> {resultado['rps']:>8.1f} "
+              f"({variacao_rps:+6.1f}%)  p95 {anterior['p95_ms']:>8.1f} -> {resultado['p95_ms']:>8.1f} ms ({variacao_p95:+6.1f}%)"
+              f"{'  REGRESSÃO' if regrediu else ''}")
+    print(f"{regressoes} regressões acima da tolerância.")
+    return regressoes
+
+def versao_codigo():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=BACKEND, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pedidos', default='10000', help='Tamanhos do banco (pedidos), separados por vírgula')
+    parser.add_argument('--cargas', default='misto', help=f"Cargas de trabalho: {', '.join(CARGAS)}")
+    parser.add_argument('--concorrencia', default='1,8,32')
+    parser.add_argument('--duracao', type=float, default=10, help='Segundos medidos por nível de concorrência')
+    parser.add_argument('--aquecimento', type=float, default=2, help='Segundos iniciais de cada nível, não medidos')
+    parser.add_argument('--servidor', default='dev', choices=['dev', 'gunicorn', 'uvicorn'])
+    parser.add_argument('--sem-metricas', action='store_true', help='Sem METRICAS=1 (sem contagem de consultas)')
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--dir-bancos', default=os.path.join(BACKEND, 'instance', 'bench'))
+    parser.add_argument('--saida', help='Arquivo JSON com os resultados')
+    parser.add_argument('--comparar', nargs=2, metavar=('BASE', 'NOVO'), help='Compara dois JSONs de --saida e sai')
+    parser.add_argument('--tolerancia', type=float, default=10, help='Variação aceita (%%) em rps e p95 no --comparar')
+    args = parser.parse_args()
+
+    if args.comparar:
+        sys.exit(1 if comparar(*args.comparar, args.tolerancia) else 0)
+    cargas = args.cargas.split(',')
+    for carga in cargas:
+        if carga not in CARGAS:
+            raise SystemExit(f"Carga desconhecida: {carga}")
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as diretorio:
+        for pedidos in (int(p) for p in args.pedidos.split(',')):
+            semeado = banco_semeado(args.dir_bancos, pedidos, args.semente)
+            ctx = contexto_banco(semeado)
+            for carga in cargas:
+                banco = os.path.join(diretorio, 'bench.db')
+                for sufixo in ('', '-wal', '-shm'):
+                    if os.path.exists(banco + sufixo):
+                        os.remove(banco + sufixo)
+                shutil.copyfile(semeado, banco) # Cópia nova: as escritas de uma carga não afetam as outras
+                with open(os.path.join(diretorio, 'servidor.log'), 'w') as log:
+                    processo, porta = iniciar_servidor(args.servidor, banco, not args.sem_metricas, log)
+                    try:
+                        for concorrencia in (int(c) for c in args.concorrencia.split(',')):
+                            resultado = rodar_nivel(porta, CARGAS[carga], ctx, concorrencia, args.duracao, args.aquecimento, args.semente)
+                            resultado.update(pedidos=pedidos, carga=carga, concorrencia=concorrencia)
+                            resultados.append(resultado)
+                            consultas = resultado['consultas_por_requisicao']
+                            print(f"{pedidos:>8} pedidos  {carga:<10} c={concorrencia:<4} {resultado['rps']:>8.1f} req/s"
+                                  f"  p50={resultado['p50_ms']:>7.1f} ms  p95={resultado['p95_ms']:>7.1f} ms"
+                                  f"  p99={resultado['p99_ms']:>7.1f} ms  consultas/req={consultas if consultas is not None else '-'}"
+                                  f"  erros={resultado['erros']}")
+                            for operacao, dados in resultado['operacoes'].items():
+                                print(f"{'':>28}{operacao:<22} {dados['requisicoes']:>7} req  p95={dados['p95_ms']:>7.1f} ms"
+                                      f"  consultas/req={dados['consultas_por_requisicao'] if dados['consultas_por_requisicao'] is not None else '-'}")
+                            sys.stdout.flush()
+                        rss = rss_pico_mb(processo.pid)
+                    finally:
+                        processo.terminate()
+                        processo.wait(timeout=30)
+                for resultado in resultados:
+                    if resultado['pedidos'] == pedidos and resultado['carga'] == carga:
+                        resultado['rss_pico_mb'] = rss
+                print(f"{'':>28}RSS de pico do servidor: {rss if rss is not None else '-'} MB")
+
+    if args.saida:
+        meta = {'versao': versao_codigo(), 'data': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(), 'plataforma': platform.platform(), 'cpus': os.cpu_count(),
+                'servidor': args.servidor, 'metricas': not args.sem_metricas, 'duracao': args.duracao,
+                'aquecimento': args.aquecimento, 'semente': args.semente}
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump({'meta': meta, 'resultados': resultados}, arquivo, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Benchmark da inicialização a frio do backend (importação, create_app, banco e primeira requisição).
+
+Uso (a partir de backend/):
+    python benchmarks/bench_inicializacao.py
+    python benchmarks/bench_inicializacao.py --repeticoes 10 --orcamento-ms 800 --saida resultado.json
+
+Cada repetição roda num processo Python novo (com -X importtime), contra um banco SQLite
+temporário, e mede as fases de um cold start de contêiner: importar o módulo app, montar o
+app com create_app(), preparar o banco vazio (o mesmo que 'flask init-db') e atender a
+primeira requisição. Reporta a mediana de cada fase e os módulos mais caros de importar.
+Sai com código 1 se a mediana do total passar do orçamento (ORCAMENTO_INICIALIZACAO_MS),
+para poder ser usado como verificação em CI/build da imagem.
+"""
+import os
+import re
+import sys
+import json
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ORCAMENTO_PADRAO_MS = float(os.environ.get('ORCAMENTO_INICIALIZACAO_MS', 1000))
+FASES = ('importacao', 'create_app', 'init_db', 'primeira_requisicao')
+
+# Executado no processo filho; imprime os tempos das fases (ms) como JSON na última linha
+CODIGO_FILHO = """
+import json, time
+inicio = time.perf_counter()
+import app as modulo
+marcas = [time.perf_counter()]
+aplicacao = modulo.create_app()
+marcas.append(time.perf_counter())
+with aplicacao.app_context():
+    modulo.preparar_banco()
+marcas.append(time.perf_counter())
+resposta = aplicacao.test_client().get('/api/pedidos?limit=1')
+assert resposta.status_code == 200, resposta.status_code
+marcas.append(time.perf_counter())
+anteriores = [inicio] + marcas[:-1]
+print(json.dumps([(fim - comeco) * 1000 for comeco, fim in zip(anteriores, marcas)]))
+"""
+
+LINHA_IMPORTTIME = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)')
+
+def medir(diretorio):
+    ambiente = dict(os.environ, DATABASE_URL='sqlite:///' + os.path.join(diretorio, 'inicializacao.db'))
+    for arquivo in os.listdir(diretorio): # Banco vazio a cada repetição
+        os.remove(os.path.join(diretorio, arquivo))
+    processo = subprocess.run([sys.executable, '-X', 'importtime', '-c', CODIGO_FILHO], cwd=BACKEND, env=ambiente,
+                              capture_output=True, text=True)
+    if processo.returncode != 0:
+        raise SystemExit(f"Falha no processo medido:\n{processo.stderr[-2000:]}")
+    tempos = dict(zip(FASES, json.loads(processo.stdout.strip().splitlines()[-1])))
+    importacoes = {}
+    for linha in processo.stderr.splitlines():
+        encontrado = LINHA_IMPORTTIME.match(linha)
+        if encontrado and len(encontrado.group(3)) == 2: # Importados diretamente pelo módulo app
+            importacoes[encontrado.group(4)] = int(encontrado.group(2)) / 1000
+    return tempos, importacoes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--orcamento-ms', type=float, default=ORCAMENTO_PADRAO_MS, help='Limite para a mediana do total')
+    parser.add_argument('--top', type=int, default=10, help='Quantos módulos mais caros listar')
+    parser.add_argument('--saida', help='Arquivo JSON com os resultados')
+    args = parser.parse_args()
+
+    execucoes, importacoes = [], {}
+    with tempfile.TemporaryDirectory() as diretorio:
+        for _ in range(args.repeticoes):
+            tempos, importacoes_execucao = medir(diretorio)
+            execucoes.append(tempos)
+            for modulo, ms in importacoes_execucao.items():
+                importacoes.setdefault(modulo, []).append(ms)
+
+    medianas = {fase: statistics.median(execucao[fase] for execucao in execucoes) for fase in FASES}
+    medianas['total'] = statistics.median(sum(execucao.values()) for execucao in execucoes)
+    for fase, ms in medianas.items():
+        print(f"{fase:<20} {ms:>8.1f} ms")
+    modulos = sorted(((statistics.median(valores), modulo) for modulo, valores in importacoes.items()), reverse=True)[:args.top]
+    print("\nImportações mais caras (acumulado, mediana):")
+    for ms, modulo in modulos:
+        print(f"  {modulo:<36} {ms:>8.1f} ms")
+
+    dentro = medianas['total'] <= args.orcamento_ms
+    print(f"\nOrçamento: {medianas['total']:.1f} ms de {args.orcamento_ms:.0f} ms -> {'OK' if dentro else 'ESTOURADO'}")
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump({'medianas_ms': medianas, 'orcamento_ms': args.orcamento_ms, 'execucoes': execucoes,
+                       'importacoes_ms': {modulo: ms for ms, modulo in modulos}}, arquivo, indent=2)
+    if not dentro:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Benchmark da serialização das listagens de pedidos (dicionários + jsonify vs esquemas + provedor rápido).
+
+Uso (a partir de backend/):
+    python benchmarks/bench_serializacao.py
+    python benchmarks/bench_serializacao.py --pedidos 100,1000,10000 --itens 3 --repeticoes 5 --saida resultado.json
+
+Para cada quantidade de pedidos, gera linhas sintéticas no formato das consultas de
+GET /api/pedidos e mede o tempo de montar a resposta JSON completa (objetos por linha +
+serialização) no caminho antigo (dicionários montados à mão + provedor padrão do Flask)
+e com os esquemas de esquemas.py em cada motor disponível de serializacao.py.
+Confere que todos os caminhos produzem o mesmo JSON (a menos da ordem das chaves).
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from flask import Flask # type: ignore # noqa: E402
+from flask.json.provider import DefaultJSONProvider # type: ignore # noqa: E402
+from serializacao import ProvedorJSON, MOTORES_JSON # noqa: E402
+from esquemas import pedido_resposta # noqa: E402
+
+def gerar_linhas(quantidade, itens_por_pedido, semente=42):
+    # Linhas com os mesmos atributos das consultas de consultar_pedidos
+    aleatorio = random.Random(semente)
+    inicio = datetime(2025, 1, 1)
+    pedidos = []
+    for id_pedido in range(1, quantidade + 1):
+        itens = [SimpleNamespace(id=id_pedido * 10 + i, produto_id=aleatorio.randint(1, 500),
+                                 produto_nome=f"Produto {aleatorio.randint(1, 500)}",
+                                 quantidade=aleatorio.randint(1, 9), preco_unitario=round(aleatorio.uniform(1, 5000), 2))
+                 for i in range(itens_por_pedido)]
+        pedido = SimpleNamespace(id=id_pedido, cliente_id=aleatorio.randint(1, 1000), cliente_nome=f"Cliente Ação {id_pedido}",
+                                 data_pedido=inicio + timedelta(seconds=aleatorio.randint(0, 30_000_000)),
+                                 status=aleatorio.choice(["Em andamento", "Finalizado", "Cancelado"]),
+                                 valor_total=sum(i.quantidade * i.preco_unitario for i in itens))
+        pedidos.append((pedido, itens))
+    return pedidos
+
+def serializar_dicionario(p, itens):
+    # Caminho anterior aos esquemas (dicionário montado à mão por linha)
+    return {
+        'id': p.id,
+        'cliente_id': p.cliente_id,
+        'cliente_nome': p.cliente_nome if p.cliente_nome is not None else "Cliente Desconhecido",
+        'data_pedido': p.data_pedido.isoformat(),
+        'status': p.status,
+        'valor_total': round(p.valor_total, 2),
+        'itens': [{
+            'id': item.id,
+            'produto_id': item.produto_id,
+            'produto_nome': item.produto_nome if item.produto_nome is not None else "Produto Desconhecido",
+            'quantidade': item.quantidade,
+            'preco_unitario': item.preco_unitario
+        } for item in itens]
+    }
+
+def caminhos():
+    app = Flask(__name__)
+    padrao = DefaultJSONProvider(app)
+    yield 'dict+flask', lambda linhas: padrao.response([serializar_dicionario(p, i) for p, i in linhas]).get_data()
+    for motor, disponivel in MOTORES_JSON.items():
+        if disponivel:
+            provedor = ProvedorJSON(app, motor)
+            yield f'esquema+{motor}', lambda linhas, provedor=provedor: provedor.response(
+                [pedido_resposta(p, i) for p, i in linhas]).get_data()
+
+def medir(funcao, linhas, repeticoes):
+    melhor = float('inf')
+    corpo = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        corpo = funcao(linhas)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return corpo, melhor
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pedidos', default='100,1000,10000,100000')
+    parser.add_argument('--itens', type=int, default=3, help='Itens por pedido')
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--saida', help='Arquivo JSON com os resultados')
+    args = parser.parse_args()
+
+    resultados = []
+    for quantidade in (int(q) for q in args.pedidos.split(',')):
+        linhas = gerar_linhas(quantidade, args.itens)
+        esperado = None
+        base = None
+        for nome, funcao in caminhos():
+            corpo, segundos = medir(funcao, linhas, args.repeticoes)
+            if esperado is None:
+                esperado = json.loads(corpo)
+                base = segundos
+            elif json.loads(corpo) != esperado:
+                raise SystemExit(f"Divergência em {quantidade} pedidos: {nome} gerou um JSON diferente")
+            pedidos_s = quantidade / segundos if segundos else float('inf')
+            resultados.append({'pedidos': quantidade, 'caminho': nome, 'segundos': segundos,
+                               'pedidos_s': pedidos_s, 'bytes': len(corpo), 'ganho': base / segundos if segundos else None})
+            print(f"{quantidade:>8} pedidos  {nome:<16} {segundos * 1000:>10.2f} ms  {pedidos_s:>12,.0f} pedidos/s"
+                  f"  {len(corpo) / 1024:>10.1f} KiB  {base / segundos:>5.1f}x")
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultados, arquivo, indent=2)
+
+if __name__ == '__main__':
+    main()
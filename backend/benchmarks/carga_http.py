@@ -0,0 +1,103 @@
+"""Teste de carga HTTP contra um servidor local (dev server, gunicorn ou uvicorn).
+
+Uso (com o servidor já rodando):
+    python benchmarks/carga_http.py --url http://127.0.0.1:5000 --concorrencia 1,8,32,64 --duracao 10
+    python benchmarks/carga_http.py --rotas /api/relatorios/series,/api/pedidos?limit=100 --saida resultado.json
+
+Cada cliente simulado é uma thread com conexão keep-alive própria, que percorre as rotas em
+ciclo durante o tempo pedido. Por nível de concorrência, reporta requisições por segundo,
+latências p50/p95/p99 e erros (status >= 400 ou falhas de conexão).
+"""
+import sys
+import json
+import time
+import argparse
+import threading
+import http.client
+from urllib.parse import urlsplit
+
+ROTAS_PADRAO = ','.join([
+    '/api/relatorios/resumo-vendas',
+    '/api/relatorios/clientes-mais-ativos',
+    '/api/relatorios/pedidos-pendentes',
+    '/api/relatorios/series?granularidade=semana',
+    '/api/relatorios/produtos-mais-vendidos',
+    '/api/pedidos?limit=50',
+])
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    indice = min(len(valores) - 1, int(round(p / 100 * (len(valores) - 1))))
+    return valores[indice]
+
+def cliente(host, porta, rotas, fim, latencias, erros, deslocamento):
+    conexao = http.client.HTTPConnection(host, porta, timeout=30)
+    i = deslocamento
+    while time.perf_counter() < fim:
+        rota = rotas[i % len(rotas)]
+        i += 1
+        inicio = time.perf_counter()
+        try:
+            conexao.request('GET', rota)
+            resposta = conexao.getresponse()
+            resposta.read()
+            if resposta.status >= 400:
+                erros.append(resposta.status)
+        except (OSError, http.client.HTTPException) as e:
+            erros.append(type(e).__name__)
+            conexao.close()
+            conexao = http.client.HTTPConnection(host, porta, timeout=30)
+            continue
+        latencias.append(time.perf_counter() - inicio)
+    conexao.close()
+
+def rodar(url, rotas, concorrencia, duracao):
+    partes = urlsplit(url)
+    latencias, erros = [], [] # list.append é thread-safe
+    fim = time.perf_counter() + duracao
+    threads = [threading.Thread(target=cliente, args=(partes.hostname, partes.port or 80, rotas, fim, latencias, erros, n))
+               for n in range(concorrencia)]
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    decorrido = time.perf_counter() - inicio
+    latencias.sort()
+    return {
+        'concorrencia': concorrencia,
+        'requisicoes': len(latencias),
+        'erros': len(erros),
+        'rps': len(latencias) / decorrido,
+        'p50_ms': percentil(latencias, 50) * 1000,
+        'p95_ms': percentil(latencias, 95) * 1000,
+        'p99_ms': percentil(latencias, 99) * 1000,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--rotas', default=ROTAS_PADRAO, help='Caminhos separados por vírgula')
+    parser.add_argument('--concorrencia', default='1,8,32,64')
+    parser.add_argument('--duracao', type=float, default=10, help='Segundos por nível de concorrência')
+    parser.add_argument('--rotulo', default='', help='Identificação do servidor testado (vai para a saída)')
+    parser.add_argument('--saida', help='Arquivo JSON com os resultados')
+    args = parser.parse_args()
+
+    rotas = [r.strip() for r in args.rotas.split(',') if r.strip()]
+    resultados = []
+    for concorrencia in (int(c) for c in args.concorrencia.split(',')):
+        resultado = rodar(args.url, rotas, concorrencia, args.duracao)
+        resultado['rotulo'] = args.rotulo
+        resultados.append(resultado)
+        print(f"{args.rotulo:<12} c={concorrencia:<4} {resultado['rps']:>9.1f} req/s  p50={resultado['p50_ms']:>7.1f} ms"
+              f"  p95={resultado['p95_ms']:>7.1f} ms  p99={resultado['p99_ms']:>7.1f} ms  erros={resultado['erros']}")
+        sys.stdout.flush()
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultados, arquivo, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+# --- Cache de leitura (read-through) para registros pequenos e pouco alterados ---
+# Os valores guardados são dicionários simples (nunca objetos do ORM), para poderem ser
+# compartilhados entre requisições/threads e serializados pelo backend compartilhado.
+# Ambos os backends expõem: obter(chave), definir(chave, valor), remover(chave), limpar()
+# e estatisticas() com os contadores de acertos, faltas e remoções por capacidade.
+
+class CacheLRU:
+    # Cache em memória do processo: LRU limitado por capacidade e com expiração (TTL)
+    def __init__(self, capacidade=1024, ttl=300):
+        self.capacidade = capacidade
+        self.ttl = ttl
+        self._dados = OrderedDict() # chave -> (expira_em, valor)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def obter(self, chave):
+        with self._lock:
+            entrada = self._dados.get(chave)
+            if entrada is None or entrada[0] < time.monotonic():
+                if entrada is not None:
+                    del self._dados[chave] # Expirado
+                self.misses += 1
+                return None
+            self._dados.move_to_end(chave) # Mais recentemente usado
+            self.hits += 1
+            return entrada[1]
+
+    def definir(self, chave, valor):
+        with self._lock:
+            self._dados[chave] = (time.monotonic() + self.ttl, valor)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.capacidade:
+                self._dados.popitem(last=False) # Remove o menos recentemente usado
+                self.evictions += 1
+
+    def remover(self, chave):
+        with self._lock:
+            self._dados.pop(chave, None)
+
+    def limpar(self):
+        with self._lock:
+            self._dados.clear()
+
+    def estatisticas(self):
+        with self._lock:
+            return {'backend': 'memoria', 'capacidade': self.capacidade, 'ttl': self.ttl, 'tamanho': len(self._dados),
+                    'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+class CacheSQLite:
+    # Cache compartilhado entre processos (ex.: vários workers do gunicorn na mesma máquina),
+    # guardado num arquivo SQLite local. Serve como substituto local de um Redis/Memcached:
+    # a invalidação feita por um worker vale para todos. Os contadores são do processo atual.
+    def __init__(self, arquivo, capacidade=1024, ttl=300):
+        self.arquivo = arquivo
+        self.capacidade = capacidade
+        self.ttl = ttl
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._conexao().execute(
+            "CREATE TABLE IF NOT EXISTS cache (chave TEXT PRIMARY KEY, valor TEXT NOT NULL, "
+            "expira_em REAL NOT NULL, acessado_em REAL NOT NULL)"
+        )
+
+    def _conexao(self):
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is None:
+            conexao = sqlite3.connect(self.arquivo, timeout=5, isolation_level=None) # autocommit
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexao = conexao
+        return conexao
+
+    def _contar(self, campo, n=1):
+        with self._lock:
+            setattr(self, campo, getattr(self, campo) + n)
+
+    def obter(self, chave):
+        agora = time.time()
+        linha = self._conexao().execute("SELECT valor, expira_em FROM cache WHERE chave = ?", (chave,)).fetchone()
+        if linha is None or linha[1] < agora:
+            self._contar('misses')
+            return None
+        self._conexao().execute("UPDATE cache SET acessado_em = ? WHERE chave = ?", (agora, chave))
+        self._contar('hits')
+        return json.loads(linha[0])
+
+    def definir(self, chave, valor):
+        agora = time.time()
+        conexao = self._conexao()
+        conexao.execute("INSERT OR REPLACE INTO cache (chave, valor, expira_em, acessado_em) VALUES (?, ?, ?, ?)",
+                        (chave, json.dumps(valor), agora + self.ttl, agora))
+        excesso = conexao.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.capacidade
+        if excesso > 0:
+            # Remove os expirados e, se ainda faltar espaço, os menos recentemente usados
+            conexao.execute("DELETE FROM cache WHERE chave IN (SELECT chave FROM cache ORDER BY expira_em < ? DESC, acessado_em LIMIT ?)",
+                            (agora, excesso))
+            self._contar('evictions', excesso)
+
+    def remover(self, chave):
+        self._conexao().execute("DELETE FROM cache WHERE chave = ?", (chave,))
+
+    def limpar(self):
+        self._conexao().execute("DELETE FROM cache")
+
+    def estatisticas(self):
+        tamanho = self._conexao().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        with self._lock:
+            return {'backend': 'sqlite', 'capacidade': self.capacidade, 'ttl': self.ttl, 'tamanho': tamanho,
+                    'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+def criar_cache(diretorio_instancia):
+    # Escolhe o backend pelas variáveis de ambiente CACHE_BACKEND (memoria|sqlite),
+    # CACHE_CAPACIDADE, CACHE_TTL (segundos) e CACHE_ARQUIVO (backend sqlite)
+    capacidade = int(os.environ.get('CACHE_CAPACIDADE', 1024))
+    ttl = int(os.environ.get('CACHE_TTL', 300))
+    if os.environ.get('CACHE_BACKEND', 'memoria') == 'sqlite':
+        arquivo = os.environ.get('CACHE_ARQUIVO', os.path.join(diretorio_instancia, 'cache.db'))
+        os.makedirs(os.path.dirname(os.path.abspath(arquivo)), exist_ok=True)
+        return CacheSQLite(arquivo, capacidade, ttl)
+    return CacheLRU(capacidade, ttl)
@@ -0,0 +1,66 @@
+from typing import List, TypedDict
+
+# --- Esquemas das respostas de pedidos ---
+# Um único lugar monta cada formato de resposta (antes repetido em cada rota).
+# São TypedDicts: tipados para o editor/mypy, mas dicionários comuns em tempo de execução,
+# que é o que o orjson serializa mais rápido (dataclasses, com ou sem __slots__, medem
+# bem mais lentas no benchmarks/bench_serializacao.py) e mantém o fallback stdlib igual.
+
+class ItemPedidoResposta(TypedDict):
+    id: int
+    produto_id: int
+    produto_nome: str
+    quantidade: int
+    preco_unitario: float
+
+class PedidoResposta(TypedDict):
+    id: int
+    cliente_id: int
+    cliente_nome: str
+    data_pedido: str # ISO 8601
+    status: str
+    valor_total: float
+    itens: List[ItemPedidoResposta]
+
+class PedidoPendenteResposta(TypedDict):
+    id: int
+    cliente_nome: str
+    data_pedido: str
+    status: str
+    valor_total: float
+
+def item_pedido_resposta(item) -> ItemPedidoResposta:
+    return {
+        'id': item.id,
+        'produto_id': item.produto_id,
+        'produto_nome': item.produto_nome if item.produto_nome is not None else "Produto Desconhecido",
+        'quantidade': item.quantidade,
+        'preco_unitario': item.preco_unitario
+    }
+
+def pedido_resposta(p, itens) -> PedidoResposta:
+    # p: linha de consultar_pedidos/iterar_pedidos (com cliente_nome); itens: linhas com produto_nome
+    return {
+        'id': p.id,
+        'cliente_id': p.cliente_id,
+        'cliente_nome': p.cliente_nome if p.cliente_nome is not None else "Cliente Desconhecido",
+        'data_pedido': p.data_pedido.isoformat(), # Formata a data para ISO 8601
+        'status': p.status,
+        'valor_total': round(p.valor_total, 2), # Arredonda para 2 casas decimais
+        'itens': [item_pedido_resposta(item) for item in itens]
+    }
+
+def pedido_pendente_resposta(p) -> PedidoPendenteResposta:
+    return {
+        'id': p.id,
+        'cliente_nome': p.cliente_nome if p.cliente_nome is not None else "Desconhecido",
+        'data_pedido': p.data_pedido.isoformat(),
+        'status': p.status,
+        'valor_total': round(p.valor_total, 2)
+    }
+
+def projetar(resposta, campos):
+    # Resposta só com os campos pedidos (?fields=); com todos os campos, devolve a própria resposta
+    if len(campos) == len(resposta):
+        return resposta
+    return {campo: resposta[campo] for campo in campos}
@@ -0,0 +1,21 @@
+import os
+import multiprocessing
+
+# --- Configuração do gunicorn (modo WSGI de produção) ---
+# Uso (a partir de backend/):  gunicorn 'app:create_app()'
+# O gunicorn lê este arquivo automaticamente; flags da linha de comando têm prioridade
+# (ex.: gunicorn -w 8 --threads 2 'app:create_app()').
+#   WEB_CONCURRENCY: processos (padrão: 2 x CPUs + 1)
+#   WEB_THREADS: threads por processo (padrão: 4)
+#   PORT: porta (padrão: 5000)
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('WEB_THREADS', 4))
+worker_class = 'gthread'
+timeout = int(os.environ.get('WEB_TIMEOUT', 60))
+keepalive = 5
+
+def on_starting(server):
+    # Uma conexão do pool por thread (ver DB_POOL_SIZE em banco.py), se não configurado.
+    # Aqui já valem as flags da linha de comando; os workers importam o app depois do fork.
+    os.environ.setdefault('DB_POOL_SIZE', str(server.cfg.threads))
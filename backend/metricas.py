@@ -0,0 +1,244 @@
+import os
+import re
+import time
+import random
+import cProfile
+import threading
+from flask import g, request, has_request_context, Response # type: ignore
+from sqlalchemy import event # type: ignore
+from sqlalchemy.orm import Session # type: ignore
+try:
+    from pyinstrument import Profiler # type: ignore
+except ImportError: # pyinstrument é opcional: sem ele, os perfis usam o cProfile
+    Profiler = None
+
+# --- Instrumentação por requisição (opcional) ---
+# Ativada com METRICAS=1. Para cada requisição registra: tempo total, número e tempo das
+# consultas SQL (eventos do engine), linhas lidas, tempo de serialização JSON e tamanho
+# da resposta. Os valores vão para o cabeçalho Server-Timing e são agregados por rota em
+# GET /metrics, no formato texto do Prometheus (com histogramas de latência).
+# Com METRICAS_AMOSTRAGEM > 0, essa fração das requisições roda sob um profiler e as que
+# passarem de METRICAS_LENTO_MS têm o perfil gravado em METRICAS_DIR_PERFIS.
+CONFIG_METRICAS = {
+    'ativas': os.environ.get('METRICAS', '0') == '1',
+    'amostragem': float(os.environ.get('METRICAS_AMOSTRAGEM', 0)), # 0 = sem profiler; 1 = todas
+    'lento_ms': float(os.environ.get('METRICAS_LENTO_MS', 500)),
+    'profiler': os.environ.get('METRICAS_PROFILER', 'cprofile'), # 'cprofile' ou 'pyinstrument'
+    'dir_perfis': os.environ.get('METRICAS_DIR_PERFIS'), # Padrão: instance/perfis
+}
+
+# Limites (em segundos) dos buckets do histograma de latência
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class MetricasRotas:
+    # Agregados por (método, rota), compartilhados entre as threads do processo
+    def __init__(self, buckets=BUCKETS_LATENCIA):
+        self.buckets = buckets
+        self._rotas = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, metodo, rota, status, duracao, medidas):
+        with self._lock:
+            dados = self._rotas.get((metodo, rota))
+            if dados is None:
+                dados = self._rotas[(metodo, rota)] = {
+                    'buckets': [0] * len(self.buckets), 'soma': 0.0, 'contagem': 0, 'status': {},
+                    'sql': 0, 'sql_segundos': 0.0, 'linhas': 0, 'serializacao_segundos': 0.0, 'bytes': 0,
+                }
+            for i, limite in enumerate(self.buckets):
+                if duracao <= limite:
+                    dados['buckets'][i] += 1
+            dados['soma'] += duracao
+            dados['contagem'] += 1
+            dados['status'][status] = dados['status'].get(status, 0) + 1
+            dados['sql'] += medidas['sql']
+            dados['sql_segundos'] += medidas['sql_segundos']
+            dados['linhas'] += medidas['linhas']
+            dados['serializacao_segundos'] += medidas['serializacao_segundos']
+            dados['bytes'] += medidas['bytes']
+
+    def exportar(self):
+        # Texto no formato de exposição do Prometheus (versão 0.0.4)
+        with self._lock:
+            rotas = {chave: dict(dados, buckets=list(dados['buckets']), status=dict(dados['status']))
+                     for chave, dados in self._rotas.items()}
+        linhas = [
+            '# HELP http_request_duration_seconds Tempo total de processamento da requisição.',
+            '# TYPE http_request_duration_seconds histogram',
+        ]
+        for (metodo, rota), dados in sorted(rotas.items()):
+            rotulos = f'method="{metodo}",route="{rota}"'
+            for limite, acumulado in zip(self.buckets, dados['buckets']):
+                linhas.append(f'http_request_duration_seconds_bucket{{{rotulos},le="{limite}"}} {acumulado}')
+            linhas.append(f'http_request_duration_seconds_bucket{{{rotulos},le="+Inf"}} {dados["contagem"]}')
+            linhas.append(f'http_request_duration_seconds_sum{{{rotulos}}} {dados["soma"]}')
+            linhas.append(f'http_request_duration_seconds_count{{{rotulos}}} {dados["contagem"]}')
+
+        contadores = [
+            ('http_requests_total', 'Requisições atendidas, por código de status.', None),
+            ('db_statements_total', 'Comandos SQL executados.', 'sql'),
+            ('db_statement_duration_seconds_total', 'Tempo gasto em comandos SQL.', 'sql_segundos'),
+            ('db_rows_fetched_total', 'Linhas lidas pelas consultas do ORM.', 'linhas'),
+            ('serialization_duration_seconds_total', 'Tempo gasto serializando JSON.', 'serializacao_segundos'),
+            ('response_size_bytes_total', 'Bytes enviados no corpo das respostas (exceto streaming).', 'bytes'),
+        ]
+        for nome, descricao, campo in contadores:
+            linhas.append(f'# HELP {nome} {descricao}')
+            linhas.append(f'# TYPE {nome} counter')
+            for (metodo, rota), dados in sorted(rotas.items()):
+                rotulos = f'method="{metodo}",route="{rota}"'
+                if campo is None:
+                    for status, total in sorted(dados['status'].items()):
+                        linhas.append(f'{nome}{{{rotulos},status="{status}"}} {total}')
+                else:
+                    linhas.append(f'{nome}{{{rotulos}}} {dados[campo]}')
+        return '\n'.join(linhas) + '\n'
+
+def medidas_atuais():
+    # Medidas da requisição em andamento (None fora de requisições ou com as métricas desligadas)
+    if not has_request_context():
+        return None
+    return g.get('metricas')
+
+def registrar_eventos_banco(engine):
+    @event.listens_for(engine, 'before_cursor_execute')
+    def inicio_sql(conexao, _cursor, _sql, _parametros, _contexto, _executemany):
+        conexao.info.setdefault('inicio_sql', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def fim_sql(conexao, _cursor, _sql, _parametros, _contexto, _executemany):
+        duracao = time.perf_counter() - conexao.info['inicio_sql'].pop()
+        medidas = medidas_atuais()
+        if medidas is not None:
+            medidas['sql'] += 1
+            medidas['sql_segundos'] += duracao
+
+    if not event.contains(Session, 'do_orm_execute', contar_linhas): # Vale para todas as sessões: registra uma vez
+        event.listen(Session, 'do_orm_execute', contar_linhas)
+
+def contar_linhas(estado):
+    # Linhas lidas: o resultado das consultas é "congelado" para ser contado e depois reemitido.
+    # Consultas em streaming (yield_per/stream_results) seguem intactas e não são contadas.
+    medidas = medidas_atuais()
+    if medidas is None or not estado.is_select:
+        return None
+    opcoes = estado.execution_options
+    if opcoes.get('yield_per') or opcoes.get('stream_results'):
+        return None
+    congelado = estado.invoke_statement().freeze()
+    medidas['linhas'] += len(congelado.data)
+    return congelado()
+
+def cronometrar_serializacao(provedor):
+    # Mede o tempo do jsonify (serialização pelo provedor JSON do app e montagem da resposta)
+    response_original = provedor.response
+
+    def response(*args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return response_original(*args, **kwargs)
+        finally:
+            medidas = medidas_atuais()
+            if medidas is not None:
+                medidas['serializacao_segundos'] += time.perf_counter() - inicio
+
+    provedor.response = response
+
+# Um perfil ativo por processo: no Python 3.12+ o cProfile usa o sys.monitoring, que é global,
+# e um segundo enable() (em outra thread) levanta ValueError. Requisições sorteadas enquanto
+# outra está sob o profiler seguem sem perfil.
+perfil_ativo = threading.Lock()
+
+def iniciar_perfil(config):
+    # Retorna o profiler iniciado, ou None se já houver outro ativo
+    if not perfil_ativo.acquire(blocking=False):
+        return None
+    try:
+        if config['profiler'] == 'pyinstrument' and Profiler is not None:
+            perfil = Profiler()
+            perfil.start()
+        else:
+            perfil = cProfile.Profile()
+            perfil.enable()
+    except ValueError: # Profiler ligado fora deste módulo (ex.: python -m cProfile)
+        perfil_ativo.release()
+        return None
+    return perfil
+
+def parar_perfil(perfil):
+    try:
+        if isinstance(perfil, cProfile.Profile):
+            perfil.disable()
+        else:
+            perfil.stop()
+    finally:
+        perfil_ativo.release()
+
+def gravar_perfil(perfil, diretorio, nome, lento):
+    # Para o profiler e, se a requisição foi lenta, grava o perfil (.prof do cProfile ou .html do pyinstrument)
+    parar_perfil(perfil)
+    extensao = 'prof' if isinstance(perfil, cProfile.Profile) else 'html'
+    if not lento:
+        return None
+    os.makedirs(diretorio, exist_ok=True)
+    instante = f"{time.strftime('%Y%m%d-%H%M%S')}-{time.time_ns() % 10**9:09d}"
+    caminho = os.path.join(diretorio, f"{instante}-{os.getpid()}-{nome}.{extensao}")
+    if extensao == 'prof':
+        perfil.dump_stats(caminho) # Abrir com: python -m pstats <arquivo> (ou snakeviz)
+    else:
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(perfil.output_html())
+    return caminho
+
+def registrar_metricas(app, engine, config=CONFIG_METRICAS):
+    # Liga a instrumentação no app, se ativada na configuração. Retorna o agregador (ou None).
+    if not config['ativas']:
+        return None
+    metricas = MetricasRotas()
+    diretorio = config['dir_perfis'] or os.path.join(app.instance_path, 'perfis')
+    registrar_eventos_banco(engine)
+    cronometrar_serializacao(app.json)
+
+    @app.before_request
+    def iniciar_medidas():
+        g.metricas = {'inicio': time.perf_counter(), 'sql': 0, 'sql_segundos': 0.0, 'linhas': 0,
+                      'serializacao_segundos': 0.0, 'bytes': 0}
+        if config['amostragem'] > 0 and random.random() < config['amostragem']:
+            perfil = iniciar_perfil(config)
+            if perfil is not None:
+                g.perfil = perfil
+
+    @app.after_request
+    def finalizar_medidas(resposta):
+        medidas = g.pop('metricas', None)
+        if medidas is None:
+            return resposta
+        duracao = time.perf_counter() - medidas['inicio']
+        rota = request.url_rule.rule if request.url_rule is not None else '<sem rota>'
+        if not resposta.is_streamed:
+            medidas['bytes'] = resposta.calculate_content_length() or 0
+        metricas.registrar(request.method, rota, resposta.status_code, duracao, medidas)
+        resposta.headers['Server-Timing'] = (
+            f'db;dur={medidas["sql_segundos"] * 1000:.2f};desc="{medidas["sql"]} consultas, {medidas["linhas"]} linhas", '
+            f'ser;dur={medidas["serializacao_segundos"] * 1000:.2f}, total;dur={duracao * 1000:.2f}')
+
+        perfil = g.pop('perfil', None)
+        if perfil is not None:
+            nome = re.sub(r'[^A-Za-z0-9]+', '_', f"{request.method}{rota}").strip('_')
+            caminho = gravar_perfil(perfil, diretorio, nome, duracao * 1000 >= config['lento_ms'])
+            if caminho:
+                app.logger.warning("Requisição lenta (%.0f ms): %s %s -> %s", duracao * 1000, request.method, request.path, caminho)
+        return resposta
+
+    @app.teardown_request
+    def descartar_perfil(_erro):
+        # Requisição que terminou sem passar pelo after_request: libera o profiler mesmo assim
+        perfil = g.pop('perfil', None)
+        if perfil is not None:
+            parar_perfil(perfil)
+
+    @app.route('/metrics', methods=['GET'])
+    def exportar_metricas():
+        return Response(metricas.exportar(), mimetype='text/plain; version=0.0.4')
+
+    return metricas
@@ -0,0 +1,93 @@
+from sqlalchemy import text # type: ignore
+from sqlalchemy.exc import OperationalError # type: ignore
+
+# --- Migrações versionadas do schema ---
+# O db.create_all() só cria tabelas que ainda não existem: ele não adiciona índices
+# (nem colunas) a tabelas já criadas em bancos existentes (ex.: instance/database.db).
+# Cada migração tem uma versão crescente e uma lista de comandos SQL idempotentes;
+# as versões já aplicadas ficam registradas na tabela 'versao_schema'. Um quarto elemento
+# opcional é uma condição (função da conexão): quando ela é falsa, a migração só é registrada.
+
+def indice_busca(tabela, colunas, sufixo, opcoes):
+    # Índice FTS5 de conteúdo externo sobre 'tabela', mantido pelo próprio banco com triggers:
+    # toda escrita (ORM, executemany, outro processo) atualiza o índice na mesma transação.
+    indice = f"busca_{tabela}{sufixo}"
+    lista = ', '.join(colunas)
+    novos = ', '.join(f"new.{c}" for c in colunas)
+    antigos = ', '.join(f"old.{c}" for c in colunas)
+    remover = f"INSERT INTO {indice}({indice}, rowid, {lista}) VALUES ('delete', old.id, {antigos});"
+    inserir = f"INSERT INTO {indice}(rowid, {lista}) VALUES (new.id, {novos});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {indice} USING fts5({lista}, content='{tabela}', content_rowid='id', {opcoes})",
+        f"CREATE TRIGGER IF NOT EXISTS {indice}_ai AFTER INSERT ON {tabela} BEGIN {inserir} END",
+        f"CREATE TRIGGER IF NOT EXISTS {indice}_ad AFTER DELETE ON {tabela} BEGIN {remover} END",
+        f"CREATE TRIGGER IF NOT EXISTS {indice}_au AFTER UPDATE OF {lista} ON {tabela} BEGIN {remover} {inserir} END",
+        f"INSERT INTO {indice}({indice}) VALUES ('rebuild')", # Indexa os registros existentes
+    ]
+
+def suporta_busca_fts5(conexao):
+    # SQLite compilado com FTS5 e com o tokenizador trigram (3.34+). Testa criando uma tabela
+    # temporária, o que também cobre o FTS5 carregado como extensão (fora do pragma_compile_options).
+    if conexao.dialect.name != 'sqlite':
+        return False
+    try:
+        conexao.execute(text("CREATE VIRTUAL TABLE temp.teste_busca_fts5 USING fts5(texto, tokenize='trigram')"))
+    except OperationalError:
+        return False
+    conexao.execute(text("DROP TABLE temp.teste_busca_fts5"))
+    return True
+
+# Busca por prefixo (palavras, sem acentos) e aproximada (trigramas) de clientes e produtos
+INDICES_BUSCA = {'cliente': ('nome', 'email'), 'produto': ('nome',)}
+OPCOES_BUSCA = {'': "tokenize='unicode61 remove_diacritics 2', prefix='2 3'", '_trigrama': "tokenize='trigram'"}
+
+MIGRACOES = [
+    (1, "Índices das colunas de filtro e junção de pedidos e itens", [
+        "CREATE INDEX IF NOT EXISTS ix_pedido_cliente_id ON pedido (cliente_id)",
+        "CREATE INDEX IF NOT EXISTS ix_pedido_data_pedido ON pedido (data_pedido)",
+        "CREATE INDEX IF NOT EXISTS ix_pedido_status_data_pedido ON pedido (status, data_pedido)",
+        "CREATE INDEX IF NOT EXISTS ix_item_pedido_pedido_id ON item_pedido (pedido_id)",
+        "CREATE INDEX IF NOT EXISTS ix_item_pedido_produto_id ON item_pedido (produto_id)",
+    ]),
+    (2, "Índice de valor_total para filtros e ordenação por valor", [
+        "CREATE INDEX IF NOT EXISTS ix_pedido_valor_total ON pedido (valor_total)",
+    ]),
+    # A tabela vendas_diarias é criada pelo create_all; aqui ela é preenchida em bancos existentes
+    (3, "Carga inicial das vendas diárias (séries temporais)", [
+        "DELETE FROM vendas_diarias",
+        "INSERT INTO vendas_diarias (dia, produto_id, cliente_id, receita, quantidade) "
+        "SELECT date(pedido.data_pedido), item_pedido.produto_id, pedido.cliente_id, "
+        "SUM(item_pedido.quantidade * item_pedido.preco_unitario), SUM(item_pedido.quantidade) "
+        "FROM item_pedido JOIN pedido ON pedido.id = item_pedido.pedido_id "
+        "GROUP BY date(pedido.data_pedido), item_pedido.produto_id, pedido.cliente_id",
+    ]),
+    # Sem FTS5/trigram (outros bancos ou SQLite antigo), a busca usa só o prefixo com LIKE
+    (4, "Índices FTS5 de busca de clientes e produtos", [
+        comando for tabela, colunas in INDICES_BUSCA.items() for sufixo, opcoes in OPCOES_BUSCA.items()
+        for comando in indice_busca(tabela, colunas, sufixo, opcoes)
+    ], suporta_busca_fts5),
+]
+
+def versao_atual(conexao):
+    conexao.execute(text(
+        "CREATE TABLE IF NOT EXISTS versao_schema ("
+        "versao INTEGER PRIMARY KEY, descricao VARCHAR(200) NOT NULL, "
+        "aplicada_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    ))
+    return conexao.execute(text("SELECT MAX(versao) FROM versao_schema")).scalar() or 0
+
+def aplicar_migracoes(engine):
+    # Aplica, em ordem, as migrações com versão maior que a atual. Retorna as versões aplicadas.
+    aplicadas = []
+    with engine.begin() as conexao:
+        atual = versao_atual(conexao)
+        for versao, descricao, comandos, *condicao in MIGRACOES:
+            if versao <= atual:
+                continue
+            if not condicao or condicao[0](conexao):
+                for comando in comandos:
+                    conexao.execute(text(comando))
+            conexao.execute(text("INSERT INTO versao_schema (versao, descricao) VALUES (:versao, :descricao)"),
+                            {'versao': versao, 'descricao': descricao})
+            aplicadas.append(versao)
+    return aplicadas
@@ -0,0 +1,77 @@
+import os
+import json
+from datetime import date
+from flask.json.provider import DefaultJSONProvider # type: ignore
+try:
+    import orjson # type: ignore
+except ImportError: # orjson é opcional
+    orjson = None
+try:
+    import msgspec # type: ignore
+except ImportError: # msgspec é opcional
+    msgspec = None
+
+# --- Provedor JSON do app ---
+# Usa o codificador mais rápido instalado: orjson, msgspec ou, sem nenhum deles, o json da
+# biblioteca padrão. JSON_MOTOR=auto|orjson|msgspec|json força um motor (se instalado).
+# Em todos os motores datas/datetimes saem em ISO 8601. Com orjson/msgspec as chaves não são
+# ordenadas nem escapadas para ASCII (UTF-8 direto) e o corpo da resposta é gerado já em bytes,
+# sem a volta por str. Comparação dos caminhos: benchmarks/bench_serializacao.py.
+MOTORES_JSON = {
+    'orjson': orjson is not None,
+    'msgspec': msgspec is not None,
+    'json': True,
+}
+
+def escolher_motor(preferido=None):
+    preferido = preferido or os.environ.get('JSON_MOTOR', 'auto')
+    if preferido != 'auto':
+        if not MOTORES_JSON.get(preferido):
+            raise ValueError(f"Motor JSON indisponível: {preferido}")
+        return preferido
+    return next(motor for motor, disponivel in MOTORES_JSON.items() if disponivel)
+
+def converter(obj):
+    # Tipos que o json/msgspec não conhecem (o orjson só chama para os que ele também não conhece)
+    if isinstance(obj, date): # Inclui datetime
+        return obj.isoformat()
+    return DefaultJSONProvider.default(obj) # dataclasses, UUID, Markup...
+
+class ProvedorJSON(DefaultJSONProvider):
+    default = staticmethod(converter)
+
+    def __init__(self, app, motor=None):
+        super().__init__(app)
+        self.motor = escolher_motor(motor)
+        if self.motor == 'msgspec':
+            self._codificador = msgspec.json.Encoder(enc_hook=converter)
+
+    def codificar(self, obj):
+        # Serializa em bytes UTF-8
+        if self.motor == 'orjson':
+            return orjson.dumps(obj, default=converter, option=orjson.OPT_NON_STR_KEYS)
+        if self.motor == 'msgspec':
+            return self._codificador.encode(obj)
+        return json.dumps(obj, default=converter, ensure_ascii=self.ensure_ascii,
+                          sort_keys=self.sort_keys, separators=(',', ':')).encode()
+
+    def dumps(self, obj, **kwargs):
+        if kwargs or self.motor == 'json': # Opções do json (ex.: indent) só existem no fallback
+            return super().dumps(obj, **kwargs)
+        return self.codificar(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs or self.motor == 'json':
+            return super().loads(s, **kwargs)
+        if self.motor == 'orjson':
+            return orjson.loads(s)
+        try:
+            return msgspec.json.decode(s)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e # O Flask trata ValueError como JSON inválido (400)
+
+    def response(self, *args, **kwargs):
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs) # Saída indentada para depuração
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.codificar(obj) + b'\n', mimetype=self.mimetype)
@@ -0,0 +1,71 @@
+import os
+import sys
+import pytest # type: ignore
+from sqlalchemy import event # type: ignore
+
+# Os testes importam os módulos do backend direto (rode a partir de backend/: python -m pytest)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db, preparar_banco, gravar_carga, dados_sinteticos # noqa: E402
+
+def pytest_addoption(parser):
+    parser.addoption('--analisador-tamanhos', default='1K,64K,1M',
+                     help='Tamanhos das entradas do benchmark do analisador (ex.: 1K,1M,100M)')
+
+def pytest_collection_modifyitems(config, items):
+    # Sem o pytest-benchmark, os testes de desempenho são pulados (os de concordância continuam)
+    if config.pluginmanager.hasplugin('benchmark'):
+        return
+    pular = pytest.mark.skip(reason='pytest-benchmark não instalado')
+    for item in items:
+        if 'benchmark' in getattr(item, 'fixturenames', ()):
+            item.add_marker(pular)
+
+@pytest.fixture
+def criar_app(tmp_path):
+    # Fábrica de apps, cada um com seu banco SQLite em tmp_path (sem tocar em instance/)
+    apps = []
+
+    def criar(nome='teste.db'):
+        aplicacao = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / nome)})
+        apps.append(aplicacao)
+        return aplicacao
+
+    yield criar
+    for aplicacao in apps:
+        with aplicacao.app_context():
+            db.engine.dispose()
+
+@pytest.fixture
+def app(criar_app):
+    aplicacao = criar_app()
+    with aplicacao.app_context():
+        preparar_banco()
+    return aplicacao
+
+def semear(aplicacao, pedidos, clientes=20, produtos=30, itens=3):
+    # Dados sintéticos reprodutíveis (os mesmos do 'flask seed'); retorna as quantidades gravadas
+    with aplicacao.app_context():
+        totais = gravar_carga(*dados_sinteticos(clientes, produtos, pedidos, itens))
+        db.session.commit()
+    return totais
+
+class Consultas:
+    # Registra os comandos SQL enviados ao banco pelo engine do app enquanto estiver ativo
+    def __init__(self, aplicacao):
+        with aplicacao.app_context():
+            self.engine = db.engine
+        self.comandos = []
+
+    def registrar(self, conexao, cursor, comando, parametros, contexto, executemany):
+        self.comandos.append((comando, parametros))
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self.registrar)
+        return self
+
+    def __exit__(self, *erro):
+        event.remove(self.engine, 'before_cursor_execute', self.registrar)
+
+    def __len__(self):
+        return len(self.comandos)
@@ -0,0 +1,63 @@
+"""Benchmark dos motores do analisador de vogal (Tarefa 1), com pytest-benchmark.
+
+Uso (a partir de backend/):
+    python -m pytest tests/test_bench_analisador.py
+    python -m pytest tests/test_bench_analisador.py --analisador-tamanhos 1K,1M,100M --benchmark-columns min,mean,rounds
+
+Para cada tamanho, gera uma entrada determinística, confere que todos os motores concordam
+com o motor de referência (a implementação original) e mede cada um; a vazão em MB/s vai no
+extra_info do relatório (--benchmark-json). Sem o pytest-benchmark, só a concordância é testada.
+"""
+import random
+import functools
+import pytest # type: ignore
+from analisador import MOTORES, analisar_texto
+
+UNIDADES = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+LIMITE_REFERENCIA = 16 * 1024 ** 2 # Acima disso o motor de referência é lento demais para rodar sempre
+RODADAS = 3
+
+def ler_tamanho(texto):
+    texto = texto.strip().upper()
+    if texto[-1] in UNIDADES:
+        return int(float(texto[:-1]) * UNIDADES[texto[-1]])
+    return int(texto)
+
+@functools.lru_cache(maxsize=1) # Os casos vêm agrupados por tamanho: só a entrada atual fica em memória
+def gerar_entrada(tamanho, semente=42):
+    # Texto de "log" com muitas vogais repetidas e uma vogal única perto do fim,
+    # para que nenhum motor consiga terminar cedo.
+    aleatorio = random.Random(semente)
+    bloco = ''.join(aleatorio.choice('aAiIoObcdfgBCD xyz-0123') for _ in range(4096))
+    texto = (bloco * (tamanho // len(bloco) + 1))[:max(0, tamanho - 3)]
+    return texto + 'atu'[:min(3, tamanho)]
+
+@functools.lru_cache(maxsize=None)
+def vogal_esperada(tamanho):
+    motor = 'referencia' if tamanho <= LIMITE_REFERENCIA else 'streaming'
+    return analisar_texto(gerar_entrada(tamanho), motor)
+
+def motores_para(tamanho):
+    return [motor for motor in MOTORES if motor != 'referencia' or tamanho <= LIMITE_REFERENCIA]
+
+def pytest_generate_tests(metafunc):
+    if 'tamanho' in metafunc.fixturenames:
+        tamanhos = [ler_tamanho(t) for t in metafunc.config.getoption('analisador_tamanhos').split(',')]
+        metafunc.parametrize('tamanho, motor', [(tamanho, motor) for tamanho in tamanhos for motor in motores_para(tamanho)],
+                             ids=lambda valor: str(valor))
+
+@pytest.mark.parametrize('motor', list(MOTORES))
+@pytest.mark.parametrize('texto, esperado', [('aAbBABacafe', 'e'), ('', ''), ('aeiou', ''), ('aba', ''), ('xa-be', '')])
+def test_casos_fixos(motor, texto, esperado):
+    assert analisar_texto(texto, motor) == esperado == analisar_texto(texto, 'referencia')
+
+def test_motores_concordam(tamanho, motor):
+    assert analisar_texto(gerar_entrada(tamanho), motor) == vogal_esperada(tamanho)
+
+def test_desempenho(benchmark, tamanho, motor):
+    texto = gerar_entrada(tamanho)
+    benchmark.group = f'{tamanho} bytes'
+    vogal = benchmark.pedantic(analisar_texto, args=(texto, motor), rounds=RODADAS, iterations=1)
+    assert vogal == vogal_esperada(tamanho)
+    if benchmark.stats: # Sem estatísticas com --benchmark-disable
+        benchmark.extra_info['mb_s'] = tamanho / (1024 ** 2) / benchmark.stats.stats.min
@@ -0,0 +1,40 @@
+from conftest import semear
+
+# Dois apps no mesmo banco, cada um com o seu cache 'memoria', fazem o papel de dois workers:
+# a escrita feita por um deles não pode deixar o outro com clientes/produtos desatualizados.
+
+def test_outro_worker_nao_le_produto_desatualizado(app, criar_app):
+    semear(app, pedidos=0, clientes=2, produtos=2)
+    outro = criar_app() # Mesmo arquivo de banco, cache próprio
+    cliente_a, cliente_b = app.test_client(), outro.test_client()
+    assert cliente_b.get('/api/produtos/1').status_code == 200 # Guarda o produto no cache de B
+
+    assert cliente_a.put('/api/produtos/1', json={'preco': 123.0}).status_code == 200
+    assert cliente_b.get('/api/produtos/1').get_json()['preco'] == 123.0
+
+    resposta = cliente_b.post('/api/pedidos', json={'cliente_id': 1, 'itens': [{'produto_id': 1, 'quantidade': 2}]})
+    assert resposta.status_code == 201, resposta.get_data(as_text=True)
+    pedido = cliente_b.get(f"/api/pedidos/{resposta.get_json()['id']}").get_json()
+    assert pedido['valor_total'] == 246.0
+
+def test_outro_worker_nao_aceita_cliente_removido(app, criar_app):
+    semear(app, pedidos=0, clientes=2, produtos=2)
+    outro = criar_app()
+    cliente_a, cliente_b = app.test_client(), outro.test_client()
+    assert cliente_b.get('/api/clientes/2').status_code == 200
+
+    assert cliente_a.delete('/api/clientes/2').status_code == 200
+    assert cliente_b.get('/api/clientes/2').status_code == 404
+    resposta = cliente_b.post('/api/pedidos', json={'cliente_id': 2, 'itens': [{'produto_id': 1, 'quantidade': 1}]})
+    assert resposta.status_code == 404
+
+def test_escrita_de_pedidos_usa_o_cache(app):
+    semear(app, pedidos=0, clientes=2, produtos=3)
+    cliente = app.test_client()
+    pedido = {'cliente_id': 1, 'itens': [{'produto_id': 1, 'quantidade': 1}, {'produto_id': 3, 'quantidade': 2}]}
+    assert cliente.post('/api/pedidos', json=pedido).status_code == 201
+    antes = cliente.get('/api/cache/estatisticas').get_json()
+    assert cliente.post('/api/pedidos/bulk', json=[pedido, pedido]).status_code in (200, 201)
+    depois = cliente.get('/api/cache/estatisticas').get_json()
+    assert depois['hits'] - antes['hits'] == 3 # Cliente 1 e produtos 1 e 3
+    assert depois['misses'] == antes['misses']
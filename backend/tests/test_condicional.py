@@ -0,0 +1,28 @@
+from app import preparar_banco
+from conftest import semear
+
+# ETags e corpos memorizados (ver condicional): as versões das tabelas recomeçam em cada banco,
+# então o ETag precisa identificar também o banco.
+ROTA = '/api/relatorios/clientes-mais-ativos'
+
+def preparar(aplicacao, pedidos):
+    with aplicacao.app_context():
+        preparar_banco()
+    semear(aplicacao, pedidos, clientes=5, produtos=5)
+    return aplicacao.test_client()
+
+def test_bancos_com_as_mesmas_versoes_nao_compartilham_etag(criar_app):
+    # Mesma carga em quantidade diferente: as versões das tabelas ficam iguais nos dois bancos
+    primeiro = preparar(criar_app('primeiro.db'), 10).get(ROTA)
+    segundo = preparar(criar_app('segundo.db'), 40).get(ROTA)
+    assert primeiro.headers['ETag'] != segundo.headers['ETag']
+    assert primeiro.get_json() != segundo.get_json()
+
+def test_banco_recriado_nao_aceita_etag_antigo(criar_app, tmp_path):
+    antigo = preparar(criar_app('banco.db'), 10).get(ROTA)
+    for arquivo in tmp_path.glob('banco.db*'):
+        arquivo.unlink()
+    cliente = preparar(criar_app('banco.db'), 40)
+    resposta = cliente.get(ROTA, headers={'If-None-Match': antigo.headers['ETag']})
+    assert resposta.status_code == 200
+    assert resposta.get_json() != antigo.get_json()
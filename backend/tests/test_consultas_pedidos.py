@@ -0,0 +1,53 @@
+import pytest # type: ignore
+from app import db, preparar_banco, ItemPedido
+from conftest import Consultas, semear
+
+# Leitura de pedidos com número fixo de consultas (sem N+1): o total de comandos SQL de cada
+# rota não pode depender de quantos pedidos, itens, clientes ou produtos o banco tem.
+ROTAS = [
+    '/api/pedidos?limit=1000',
+    '/api/pedidos?limit=1000&fields=id,cliente_nome,itens',
+    '/api/pedidos?limit=1000&status=Em%20andamento&sort=-data_pedido',
+    '/api/pedidos/{maior_pedido}',
+    '/api/relatorios/pedidos-pendentes',
+]
+
+# (pedidos, clientes, produtos, itens em média por pedido)
+TAMANHOS = {'pequeno': (10, 3, 4, 1), 'grande': (300, 40, 60, 6)}
+
+def maior_pedido(aplicacao):
+    # Pedido com mais itens do banco
+    with aplicacao.app_context():
+        return db.session.query(ItemPedido.pedido_id).group_by(ItemPedido.pedido_id).order_by(
+            db.func.count().desc()).limit(1).scalar()
+
+def contar_consultas(aplicacao, rota):
+    rota = rota.format(maior_pedido=maior_pedido(aplicacao))
+    cliente = aplicacao.test_client()
+    with Consultas(aplicacao) as consultas:
+        resposta = cliente.get(rota)
+    assert resposta.status_code == 200, resposta.get_data(as_text=True)
+    return len(consultas), resposta.get_json()
+
+@pytest.fixture
+def apps_por_tamanho(criar_app):
+    aplicacoes = {}
+    for nome, (pedidos, clientes, produtos, itens) in TAMANHOS.items():
+        aplicacao = criar_app(f'{nome}.db')
+        with aplicacao.app_context():
+            preparar_banco()
+        semear(aplicacao, pedidos, clientes, produtos, itens)
+        aplicacoes[nome] = aplicacao
+    return aplicacoes
+
+@pytest.mark.parametrize('rota', ROTAS)
+def test_numero_de_consultas_nao_cresce_com_os_dados(apps_por_tamanho, rota):
+    pequeno, dados_pequeno = contar_consultas(apps_por_tamanho['pequeno'], rota)
+    grande, dados_grande = contar_consultas(apps_por_tamanho['grande'], rota)
+    assert pequeno == grande
+    assert pequeno <= 3 # Versões (ETag), pedidos e itens
+    # A comparação só vale se a carga grande de fato devolveu mais dados
+    if isinstance(dados_grande, dict) and 'itens' in dados_grande:
+        assert len(dados_grande['itens']) > len(dados_pequeno['itens'])
+    else:
+        assert len(dados_grande) > len(dados_pequeno)
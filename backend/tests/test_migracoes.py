@@ -0,0 +1,87 @@
+import re
+import sqlite3
+import pytest # type: ignore
+from app import db
+from migracoes import aplicar_migracoes, MIGRACOES
+from conftest import Consultas
+
+# Banco no schema original (antes das migrações e dos índices), como um instance/database.db
+# antigo, com as datas no formato gravado pelo SQLAlchemy na época (com microssegundos)
+ESQUEMA_ANTIGO = """
+CREATE TABLE cliente (
+    id INTEGER NOT NULL, nome VARCHAR(100) NOT NULL, email VARCHAR(100) NOT NULL,
+    PRIMARY KEY (id), UNIQUE (email)
+);
+CREATE TABLE produto (
+    id INTEGER NOT NULL, nome VARCHAR(100) NOT NULL, preco FLOAT NOT NULL,
+    PRIMARY KEY (id)
+);
+CREATE TABLE pedido (
+    id INTEGER NOT NULL, cliente_id INTEGER NOT NULL, data_pedido DATETIME, status VARCHAR(50) NOT NULL,
+    valor_total FLOAT NOT NULL,
+    PRIMARY KEY (id), FOREIGN KEY(cliente_id) REFERENCES cliente (id)
+);
+CREATE TABLE item_pedido (
+    id INTEGER NOT NULL, pedido_id INTEGER NOT NULL, produto_id INTEGER NOT NULL, quantidade INTEGER NOT NULL,
+    preco_unitario FLOAT NOT NULL,
+    PRIMARY KEY (id), FOREIGN KEY(pedido_id) REFERENCES pedido (id), FOREIGN KEY(produto_id) REFERENCES produto (id)
+);
+INSERT INTO cliente VALUES (1, 'Maria Silva', 'maria@example.com'), (2, 'João Souza', 'joao@example.com');
+INSERT INTO produto VALUES (1, 'Notebook Super', 4500.0), (2, 'Mouse Gamer', 150.0), (3, 'Teclado Mecânico', 300.0);
+INSERT INTO pedido VALUES
+    (1, 1, '2025-06-01 10:00:00.000000', 'Em andamento', 4800.0),
+    (2, 2, '2025-06-02 11:30:00.000000', 'Finalizado', 300.0),
+    (3, 1, '2025-06-03 09:15:00.000000', 'Em andamento', 150.0);
+INSERT INTO item_pedido VALUES (1, 1, 1, 1, 4500.0), (2, 1, 2, 2, 150.0), (3, 2, 3, 1, 300.0), (4, 3, 2, 1, 150.0);
+"""
+
+INDICES = ['ix_pedido_cliente_id', 'ix_pedido_data_pedido', 'ix_pedido_status_data_pedido',
+           'ix_item_pedido_pedido_id', 'ix_item_pedido_produto_id', 'ix_pedido_valor_total']
+
+# Consultas quentes: (método, rota, índice que o plano de alguma consulta da rota deve usar)
+CONSULTAS_QUENTES = [
+    ('get', '/api/relatorios/pedidos-pendentes', 'ix_pedido_status_data_pedido'),
+    ('get', '/api/relatorios/clientes-mais-ativos', 'ix_pedido_cliente_id'),
+    ('delete', '/api/produtos/2', 'ix_item_pedido_produto_id'), # Produto com itens: a verificação barra a remoção
+    ('get', '/api/pedidos/1', 'ix_item_pedido_pedido_id'),
+]
+
+def criar_app_antigo(criar_app, caminho):
+    conexao = sqlite3.connect(caminho)
+    conexao.executescript(ESQUEMA_ANTIGO)
+    conexao.close()
+    aplicacao = criar_app(caminho.name)
+    with aplicacao.app_context():
+        db.create_all() # Como no 'flask migrar': cria as tabelas novas, mas não altera as existentes
+    return aplicacao
+
+@pytest.fixture
+def app_antigo(criar_app, tmp_path):
+    aplicacao = criar_app_antigo(criar_app, tmp_path / 'antigo.db')
+    with aplicacao.app_context():
+        aplicar_migracoes(db.engine)
+    return aplicacao
+
+def planos(aplicacao, comandos):
+    # Linhas do EXPLAIN QUERY PLAN de cada comando registrado
+    with aplicacao.app_context():
+        conexao = db.session.connection()
+        return [linha[-1] for comando, parametros in comandos
+                for linha in conexao.exec_driver_sql('EXPLAIN QUERY PLAN ' + comando, parametros).all()]
+
+def test_migracoes_atualizam_banco_antigo(criar_app, tmp_path):
+    aplicacao = criar_app_antigo(criar_app, tmp_path / 'antigo.db')
+    with aplicacao.app_context():
+        assert aplicar_migracoes(db.engine) == [versao for versao, *_ in MIGRACOES]
+        nomes = {nome for (nome,) in db.session.execute(db.text("SELECT name FROM sqlite_master WHERE type = 'index'"))}
+        assert set(INDICES) <= nomes
+        assert db.session.execute(db.text("SELECT COUNT(*) FROM item_pedido")).scalar() == 4 # Dados preservados
+        assert aplicar_migracoes(db.engine) == [] # Já atualizado: nada a aplicar
+
+@pytest.mark.parametrize('metodo, rota, indice', CONSULTAS_QUENTES)
+def test_consultas_quentes_usam_indice(app_antigo, metodo, rota, indice):
+    with Consultas(app_antigo) as consultas:
+        resposta = getattr(app_antigo.test_client(), metodo)(rota)
+    assert resposta.status_code in (200, 400)
+    plano = planos(app_antigo, consultas.comandos)
+    assert any(re.search(rf'USING (COVERING )?INDEX {indice}\b', linha) for linha in plano), plano
@@ -0,0 +1,89 @@
+import React, { useState, useEffect, useRef } from 'react';
+
+const SEARCH_DELAY_MS = 200; // Espera o usuário parar de digitar antes de consultar a API
+const SEARCH_LIMIT = 10;
+
+// Campo de busca com sugestões (type-ahead) para os endpoints /search da API.
+// Cada busca cancela a anterior, para que uma resposta atrasada não sobrescreva a mais recente.
+// Props: url (ex.: .../api/produtos/search), placeholder, renderItem(item) -> texto da sugestão,
+// onSelect(item) ao escolher uma sugestão (onSelect(null) quando o texto é alterado depois disso).
+function SearchInput({ url, placeholder, renderItem, onSelect }) {
+  const [query, setQuery] = useState('');
+  const [results, setResults] = useState([]);
+  const [open, setOpen] = useState(false);
+  const selected = useRef(false);
+
+  useEffect(() => {
+    const text = query.trim();
+    if (!text || selected.current) {
+      setResults([]);
+      return undefined;
+    }
+    const controller = new AbortController();
+    const timer = setTimeout(async () => {
+      try {
+        const params = new URLSearchParams({ q: text, limit: SEARCH_LIMIT });
+        const response = await fetch(`${url}?${params.toString()}`, { signal: controller.signal });
+        if (response.ok) {
+          setResults(await response.json());
+          setOpen(true);
+        }
+      } catch (e) {
+        if (e.name !== 'AbortError') {
+          setResults([]);
+        }
+      }
+    }, SEARCH_DELAY_MS);
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
+  }, [query, url]);
+
+  const handleChange = (e) => {
+    if (selected.current) {
+      selected.current = false;
+      onSelect(null);
+    }
+    setQuery(e.target.value);
+  };
+
+  const handleSelect = (item) => {
+    selected.current = true;
+    setQuery(renderItem(item));
+    setResults([]);
+    setOpen(false);
+    onSelect(item);
+  };
+
+  return (
+    <span style={{ position: 'relative', display: 'inline-block', marginRight: '5px' }}>
+      <input
+        type="text"
+        value={query}
+        onChange={handleChange}
+        onFocus={() => setOpen(true)}
+        onBlur={() => setTimeout(() => setOpen(false), 150)} // Deixa o clique na sugestão acontecer antes
+        placeholder={placeholder}
+        autoComplete="off"
+      />
+      {open && results.length > 0 && (
+        <ul style={{ position: 'absolute', zIndex: 10, left: 0, right: 0, margin: 0, padding: 0, listStyle: 'none',
+                     background: '#fff', border: '1px solid #ddd', borderRadius: '4px', maxHeight: '240px', overflowY: 'auto' }}>
+          {results.map((item) => (
+            <li
+              key={item.id}
+              onMouseDown={(e) => e.preventDefault()}
+              onClick={() => handleSelect(item)}
+              style={{ padding: '6px 8px', cursor: 'pointer' }}
+            >
+              {renderItem(item)}
+            </li>
+          ))}
+        </ul>
+      )}
+    </span>
+  );
+}
+
+export default SearchInput;
@@ -1,7 +1,9 @@
 import React, { useState, useEffect } from 'react';
+import { fetchPage } from '../utils/pagination';
 
 function ClientManagement() {
   const [clientes, setClientes] = useState([]);
+  const [nextAfter, setNextAfter] = useState(null); // Cursor da próxima página (null = não há mais)
   const [newClientName, setNewClientName] = useState('');
   const [newClientEmail, setNewClientEmail] = useState(''); 
   const [editClientId, setEditClientId] = useState(null); 
@@ -14,18 +16,15 @@ function ClientManagement() {
 
   // --- Funções de Comunicação com a API ---
 
-  // Função para carregar clientes (READ)
-  const fetchClientes = async () => {
+  // Função para carregar clientes (READ), uma página por vez.
+  // Sem cursor recarrega a partir da primeira página; com cursor adiciona a próxima página à lista.
+  const fetchClientes = async (after = 0) => {
     setLoading(true);
     setError(null);
     try {
-      const response = await fetch(API_URL);
-      if (!response.ok) {
-        throw new Error(`HTTP error! status: ${response.status}`);
-      }
-      const data = await response.json();
-     
-      setClientes(data.value || data); 
+      const page = await fetchPage(API_URL, { after });
+      setClientes(after ? (prev) => [...prev, ...page.items] : page.items);
+      setNextAfter(page.nextAfter);
     } catch (e) {
       setError(`Erro ao carregar clientes: ${e.message}`);
     } finally {
@@ -210,6 +209,9 @@ function ClientManagement() {
           )}
         </tbody>
       </table>
+      {nextAfter && (
+        <button onClick={() => fetchClientes(nextAfter)} disabled={loading} style={{ marginTop: '10px' }}>Carregar mais</button>
+      )}
     </div>
   );
 }
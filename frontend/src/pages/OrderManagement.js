@@ -1,14 +1,50 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
+import { fetchPage } from '../utils/pagination';
+import { fetchChangesCursor, subscribeChanges } from '../utils/changes';
+import SearchInput from '../components/SearchInput';
+
+// Chave estável de cada item do formulário: ao remover um item do meio, os campos de busca
+// dos demais não trocam de linha
+let nextItemKey = 0;
+const newItem = () => ({ key: nextItemKey++, productId: '', quantity: 1 });
+
+// Aplica uma alteração do feed (/api/changes) à lista de pedidos carregada. É idempotente: o
+// stream pode repetir alterações que a carga inicial já trouxe.
+const applyChange = (pedidos, change, loadedAll) => {
+  const { tabela, id, operacao, dados } = change;
+  if (tabela === 'pedido') {
+    if (operacao === 'removido') {
+      return pedidos.filter((p) => p.id !== id);
+    }
+    if (pedidos.some((p) => p.id === id)) {
+      return pedidos.map((p) => (p.id === id ? dados : p));
+    }
+    // Pedidos novos vão para o fim da lista (ordem por id); se ainda há páginas, chegam com elas
+    return loadedAll ? [...pedidos, dados] : pedidos;
+  }
+  // Os pedidos trazem os nomes do momento da escrita: renomeações chegam como alteração do cliente/produto
+  if (tabela === 'cliente' && operacao === 'alterado') {
+    return pedidos.map((p) => (p.cliente_id === id ? { ...p, cliente_nome: dados.nome } : p));
+  }
+  if (tabela === 'produto' && operacao === 'alterado') {
+    return pedidos.map((p) => (p.itens.some((item) => item.produto_id === id)
+      ? { ...p, itens: p.itens.map((item) => (item.produto_id === id ? { ...item, produto_nome: dados.nome } : item)) }
+      : p));
+  }
+  return pedidos;
+};
 
 function OrderManagement() {
   const [pedidos, setPedidos] = useState([]);
-  const [clientes, setClientes] = useState([]); 
-  const [produtos, setProdutos] = useState([]); 
+  const [nextAfter, setNextAfter] = useState(null); // Cursor da próxima página de pedidos
+  const nextAfterRef = useRef(null); // O mesmo cursor, lido pelo stream de alterações
+  const [changesSince, setChangesSince] = useState(null); // Seq do feed de alterações na última carga
+  const [formKey, setFormKey] = useState(0); // Muda a cada pedido criado, para limpar os campos de busca
   
   // Estado para novo pedido
   const [newOrderClientId, setNewOrderClientId] = useState('');
   const [newOrderStatus, setNewOrderStatus] = useState('Em andamento');
-  const [newOrderItems, setNewOrderItems] = useState([{ productId: '', quantity: 1 }]);
+  const [newOrderItems, setNewOrderItems] = useState(() => [newItem()]);
 
 
   const [editOrderId, setEditOrderId] = useState(null);
@@ -20,35 +56,23 @@ function OrderManagement() {
   const API_PEDIDOS_URL = 'https://logap-desafio-dev-junior-murilo-silva.onrender.com/api/pedidos';
   const API_CLIENTES_URL = 'https://logap-desafio-dev-junior-murilo-silva.onrender.com/api/clientes';
   const API_PRODUTOS_URL = 'https://logap-desafio-dev-junior-murilo-silva.onrender.com/api/produtos';
+  const API_CHANGES_URL = 'https://logap-desafio-dev-junior-murilo-silva.onrender.com/api/changes';
 
   // --- Funções de Comunicação com a API ---
 
-  // Função para carregar TODOS os dados necessários (pedidos, clientes, produtos)
+  // Função para carregar a primeira página de pedidos. Clientes e produtos não são mais
+  // carregados inteiros: o formulário os busca sob demanda em /search (type-ahead).
+  // Depois da carga, a lista é mantida pelo stream de alterações (ver useEffect abaixo),
+  // sem recarregar a cada escrita.
   const fetchAllData = async () => {
     setLoading(true);
     setError(null);
     try {
-      // Faz todas as requisições em paralelo para otimizar
-      const [pedidosRes, clientesRes, produtosRes] = await Promise.all([
-        fetch(API_PEDIDOS_URL),
-        fetch(API_CLIENTES_URL),
-        fetch(API_PRODUTOS_URL)
-      ]);
-
-      // Verifica se todas as respostas HTTP foram bem-sucedidas
-      if (!pedidosRes.ok || !clientesRes.ok || !produtosRes.ok) {
-        throw new Error(`HTTP error! Status: ${pedidosRes.status}/${clientesRes.status}/${produtosRes.status}`);
-      }
-
-      // Converte as respostas para JSON
-      const pedidosData = await pedidosRes.json();
-      const clientesData = await clientesRes.json();
-      const produtosData = await produtosRes.json();
-
-      // Atualiza os estados. Lida com a propriedade 'value' do Invoke-RestMethod 
-      setPedidos(pedidosData.value || pedidosData);
-      setClientes(clientesData.value || clientesData);
-      setProdutos(produtosData.value || produtosData);
+      const since = await fetchChangesCursor(API_CHANGES_URL); // Lido antes dos pedidos: nada se perde entre os dois
+      const pedidosPage = await fetchPage(API_PEDIDOS_URL);
+      setPedidos(pedidosPage.items);
+      setNextAfter(pedidosPage.nextAfter);
+      setChangesSince(since);
 
     } catch (e) {
       setError(`Erro ao carregar dados: ${e.message}`);
@@ -57,6 +81,21 @@ function OrderManagement() {
     }
   };
 
+  // Função para carregar a próxima página de pedidos (usa o cursor X-Next-After)
+  const fetchMorePedidos = async () => {
+    setLoading(true);
+    setError(null);
+    try {
+      const page = await fetchPage(API_PEDIDOS_URL, { after: nextAfter });
+      setPedidos((prev) => [...prev, ...page.items]);
+      setNextAfter(page.nextAfter);
+    } catch (e) {
+      setError(`Erro ao carregar pedidos: ${e.message}`);
+    } finally {
+      setLoading(false);
+    }
+  };
+
   // Função para adicionar um novo pedido (CREATE)
   const handleAddPedido = async () => {
     setLoading(true);
@@ -91,8 +130,8 @@ function OrderManagement() {
       // Limpa o formulário após sucesso
       setNewOrderClientId('');
       setNewOrderStatus('Em andamento');
-      setNewOrderItems([{ productId: '', quantity: 1 }]);
-      fetchAllData(); 
+      setNewOrderItems([newItem()]);
+      setFormKey((key) => key + 1);
     } catch (e) {
       setError(`Erro ao adicionar pedido: ${e.message}`);
     } finally {
@@ -115,7 +154,6 @@ function OrderManagement() {
         throw new Error(errorData.error || `HTTP error! status: ${response.status}`);
       }
       cancelEdit(); 
-      fetchAllData(); 
     } catch (e) {
       setError(`Erro ao atualizar pedido: ${e.message}`);
     } finally {
@@ -136,7 +174,6 @@ function OrderManagement() {
         const errorData = await response.json();
         throw new Error(errorData.error || `HTTP error! status: ${response.status}`);
       }
-      fetchAllData(); // Recarrega todos os dados
     } catch (e) {
       setError(`Erro ao deletar pedido: ${e.message}`);
     } finally {
@@ -146,7 +183,7 @@ function OrderManagement() {
 
   // --- Funções de Manipulação de Itens do Pedido (para o formulário de NOVO PEDIDO) ---
   const handleAddItem = () => {
-    setNewOrderItems([...newOrderItems, { productId: '', quantity: 1 }]);
+    setNewOrderItems([...newOrderItems, newItem()]);
   };
 
   const handleRemoveItem = (index) => {
@@ -177,9 +214,25 @@ function OrderManagement() {
 
   // --- Efeito para Carregar Dados ao Montar o Componente ---
   useEffect(() => {
-    fetchAllData(); // Carrega os dados (pedidos, clientes, produtos) quando o componente é montado
+    fetchAllData(); // Carrega os pedidos quando o componente é montado
   }, []); // Array vazio para rodar apenas uma vez na montagem
 
+  useEffect(() => {
+    nextAfterRef.current = nextAfter;
+  }, [nextAfter]);
+
+  // --- Efeito para Acompanhar as Alterações (inclusive as feitas nesta tela) ---
+  useEffect(() => {
+    if (changesSince === null) return undefined;
+    return subscribeChanges(API_CHANGES_URL, changesSince, (change) => {
+      if (change.operacao === 'recarga') {
+        fetchAllData(); // Carga em massa ou alterações já descartadas no servidor
+        return;
+      }
+      setPedidos((prev) => applyChange(prev, change, nextAfterRef.current === null));
+    });
+  }, [changesSince]);
+
   // --- Renderização do Componente ---
   return (
     <div>
@@ -193,16 +246,13 @@ function OrderManagement() {
       <div style={{ marginBottom: '20px', border: '1px solid #eee', padding: '15px', borderRadius: '8px' }}>
         <div style={{ marginBottom: '10px' }}>
             <label style={{ marginRight: '10px' }}>Cliente:</label>
-            <select
-                value={newOrderClientId}
-                onChange={(e) => setNewOrderClientId(e.target.value)}
-                required
-            >
-                <option value="">Selecione um Cliente</option>
-                {clientes.map((cliente) => (
-                    <option key={cliente.id} value={cliente.id}>{cliente.nome}</option>
-                ))}
-            </select>
+            <SearchInput
+                key={`cliente-${formKey}`}
+                url={`${API_CLIENTES_URL}/search`}
+                placeholder="Buscar cliente por nome ou e-mail"
+                renderItem={(cliente) => `${cliente.nome} (${cliente.email})`}
+                onSelect={(cliente) => setNewOrderClientId(cliente ? String(cliente.id) : '')}
+            />
         </div>
         <div style={{ marginBottom: '10px' }}>
             <label style={{ marginRight: '10px' }}>Status:</label>
@@ -219,19 +269,14 @@ function OrderManagement() {
         
         <h4>Itens do Pedido:</h4>
         {newOrderItems.map((item, index) => (
-          <div key={index} style={{ marginBottom: '10px', padding: '8px', border: '1px dashed #ddd', borderRadius: '4px' }}>
+          <div key={item.key} style={{ marginBottom: '10px', padding: '8px', border: '1px dashed #ddd', borderRadius: '4px' }}>
             <label style={{ marginRight: '10px' }}>Produto:</label>
-            <select
-              value={item.productId}
-              onChange={(e) => handleItemChange(index, 'productId', e.target.value)}
-              required
-              style={{ marginRight: '5px' }}
-            >
-              <option value="">Selecione um Produto</option>
-              {produtos.map((produto) => (
-                <option key={produto.id} value={produto.id}>{produto.nome} (R$ {produto.preco.toFixed(2)})</option>
-              ))}
-            </select>
+            <SearchInput
+              url={`${API_PRODUTOS_URL}/search`}
+              placeholder="Buscar produto"
+              renderItem={(produto) => `${produto.nome} (R$ ${produto.preco.toFixed(2)})`}
+              onSelect={(produto) => handleItemChange(index, 'productId', produto ? String(produto.id) : '')}
+            />
             <label style={{ marginRight: '5px' }}>Quantidade:</label>
             <input
               type="number"
@@ -318,6 +363,9 @@ function OrderManagement() {
           )}
         </tbody>
       </table>
+      {nextAfter && (
+        <button onClick={fetchMorePedidos} disabled={loading} style={{ marginTop: '10px' }}>Carregar mais</button>
+      )}
     </div>
   );
 }
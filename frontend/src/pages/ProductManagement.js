@@ -1,7 +1,9 @@
 import React, { useState, useEffect } from 'react';
+import { fetchPage } from '../utils/pagination';
 
 function ProductManagement() {
   const [produtos, setProdutos] = useState([]);
+  const [nextAfter, setNextAfter] = useState(null); // Cursor da próxima página (null = não há mais)
   const [newProductName, setNewProductName] = useState('');
   const [newProductPrice, setNewProductPrice] = useState('');
   const [editProductId, setEditProductId] = useState(null);
@@ -14,16 +16,14 @@ function ProductManagement() {
 
   // --- Funções de Comunicação com a API ---
 
-  const fetchProdutos = async () => {
+  // Carrega uma página de produtos; com cursor, adiciona a próxima página à lista
+  const fetchProdutos = async (after = 0) => {
     setLoading(true);
     setError(null);
     try {
-      const response = await fetch(API_URL);
-      if (!response.ok) {
-        throw new Error(`HTTP error! status: ${response.status}`);
-      }
-      const data = await response.json();
-      setProdutos(data.value || data);
+      const page = await fetchPage(API_URL, { after });
+      setProdutos(after ? (prev) => [...prev, ...page.items] : page.items);
+      setNextAfter(page.nextAfter);
     } catch (e) {
       setError(`Erro ao carregar produtos: ${e.message}`);
     } finally {
@@ -199,6 +199,9 @@ function ProductManagement() {
           ))}
         </tbody>
       </table>
+      {nextAfter && (
+        <button onClick={() => fetchProdutos(nextAfter)} disabled={loading} style={{ marginTop: '10px' }}>Carregar mais</button>
+      )}
     </div>
   );
 }
@@ -1,4 +1,7 @@
 import React, { useState, useEffect } from 'react';
+import { subscribeChanges } from '../utils/changes';
+
+const REFRESH_DELAY_MS = 1000; // Agrupa rajadas de alterações numa única atualização
 
 function Reports() {
   const [resumo, setResumo] = useState(null);
@@ -8,6 +11,7 @@ function Reports() {
   const [error, setError] = useState(null);
 
   const API_BASE_URL = 'https://logap-desafio-dev-junior-murilo-silva.onrender.com/api/relatorios';
+  const API_CHANGES_URL = 'https://logap-desafio-dev-junior-murilo-silva.onrender.com/api/changes';
 
   const fetchReports = async () => {
     setLoading(true);
@@ -42,6 +46,21 @@ function Reports() {
     fetchReports();
   }, []);
 
+  // Atualiza os relatórios só quando pedidos ou clientes mudam (sem polling). Os relatórios
+  // respondem com ETag, então o que não mudou volta como 304, sem corpo.
+  useEffect(() => {
+    let timer = null;
+    const unsubscribe = subscribeChanges(API_CHANGES_URL, null, (change) => {
+      if (change.tabela === 'produto') return; // Não entra nos relatórios desta página
+      clearTimeout(timer);
+      timer = setTimeout(fetchReports, REFRESH_DELAY_MS);
+    });
+    return () => {
+      clearTimeout(timer);
+      unsubscribe();
+    };
+  }, []);
+
   return (
     <div>
       <h2>Relatórios de Vendas</h2>
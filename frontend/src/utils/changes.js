@@ -0,0 +1,82 @@
+// Funções auxiliares para o feed de alterações da API (/api/changes).
+// Cada alteração: { seq, tabela, id, operacao, dados }, com operacao 'criado', 'alterado',
+// 'removido' ou 'recarga' (recarregar tudo) e 'dados' no formato da rota GET do registro.
+
+// Seq atual do feed: carregue os dados depois de lê-lo e acompanhe as alterações a partir dele,
+// para não perder nenhuma escrita feita entre a carga e a abertura do stream.
+export const fetchChangesCursor = async (url) => {
+  const response = await fetch(url);
+  if (!response.ok) {
+    throw new Error(`HTTP error! status: ${response.status}`);
+  }
+  return (await response.json()).seq;
+};
+
+export const POLL_INTERVAL_MS = 5000; // Intervalo das consultas quando o servidor não tem o stream
+
+// Acompanha as alterações a partir de 'since' (ou, sem ele, do momento atual) e chama onChange
+// a cada uma. Usa o stream SSE (modo ASGI), que o EventSource reconecta sozinho, continuando do
+// último seq recebido. Se o servidor não tiver o stream (modo WSGI, que responde 501), passa a
+// consultar GET /api/changes?since=<seq> a cada POLL_INTERVAL_MS. Um 410 (alterações já
+// descartadas no servidor) vira uma alteração 'recarga'. Retorna a função que encerra tudo.
+export const subscribeChanges = (url, since, onChange) => {
+  let lastSeq = since !== undefined ? since : null;
+  let closed = false;
+  let timer = null;
+
+  const poll = async () => {
+    try {
+      if (lastSeq === null) {
+        lastSeq = await fetchChangesCursor(url);
+      }
+      let more = true;
+      while (more && !closed) {
+        const response = await fetch(`${url}?since=${lastSeq}`);
+        const data = await response.json();
+        if (closed) {
+          return; // Encerrado durante a consulta
+        }
+        if (response.status === 410) {
+          lastSeq = data.seq;
+          onChange({ seq: data.seq, tabela: null, id: null, operacao: 'recarga', dados: null });
+          break;
+        }
+        if (!response.ok) {
+          throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        data.alteracoes.forEach(onChange);
+        lastSeq = data.seq;
+        more = data.mais;
+      }
+    } catch (e) {
+      // Falha temporária: tenta de novo no próximo intervalo
+    }
+    if (!closed) {
+      timer = setTimeout(poll, POLL_INTERVAL_MS);
+    }
+  };
+
+  const params = lastSeq !== null ? `?since=${lastSeq}` : '';
+  let source = new EventSource(`${url}/stream${params}`);
+  source.onmessage = (event) => {
+    const change = JSON.parse(event.data);
+    lastSeq = change.seq;
+    onChange(change);
+  };
+  source.onerror = () => {
+    // Queda de conexão: o EventSource reconecta (CONNECTING). Resposta que não é um stream
+    // (ex.: o 501 do modo WSGI): ele desiste (CLOSED) e seguimos por consultas.
+    if (source && source.readyState === EventSource.CLOSED && !closed) {
+      source = null;
+      poll();
+    }
+  };
+
+  return () => {
+    closed = true;
+    clearTimeout(timer);
+    if (source) {
+      source.close();
+    }
+  };
+};
@@ -0,0 +1,19 @@
+// Funções auxiliares para as listagens paginadas por cursor da API
+// (?after=<id>&limit=<n>&fields=a,b,c). O cursor da próxima página vem no cabeçalho X-Next-After.
+
+export const PAGE_SIZE = 100;
+
+// Busca uma única página. Retorna os itens e o cursor da próxima página (null quando não há mais registros).
+export const fetchPage = async (url, { after = 0, limit = PAGE_SIZE, fields } = {}) => {
+  const params = new URLSearchParams({ after, limit });
+  if (fields) {
+    params.set('fields', fields);
+  }
+  const response = await fetch(`${url}?${params.toString()}`);
+  if (!response.ok) {
+    throw new Error(`HTTP error! status: ${response.status}`);
+  }
+  const data = await response.json();
+  return { items: data.value || data, nextAfter: response.headers.get('X-Next-After') };
+};
+